@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 # --- CONFIGURAÇÃO PERSONALIZADA ---
+import re
 import sys
 import os
 
@@ -17,6 +18,7 @@ sys.path.append(os.getcwd())
 from app.core.config import settings
 from app.db.base import Base
 from app.models.habit import Habit  # Importante: Carrega o modelo Habit
+from app.models import ai  # Tabelas auxiliares da IA
 
 config = context.config
 
@@ -26,6 +28,14 @@ if config.config_file_name is not None:
 # Aponta para os metadados dos nossos modelos
 target_metadata = Base.metadata
 
+# Partições de habit_logs são criadas em runtime (manutenção), não pelos modelos
+PARTITION_TABLE = re.compile(r"^habit_logs_(p\d{4}|default)$")
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and compare_to is None and PARTITION_TABLE.match(name):
+        return False
+    return True
+
 # --- FUNÇÕES DE MIGRAÇÃO ---
 
 def run_migrations_offline() -> None:
@@ -35,6 +45,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -42,7 +53,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,51 @@
+"""criar tabela habit_changes
+
+Revision ID: 2d398b7bbfc7
+Revises: 400b520416da
+Create Date: 2026-10-18 14:43:34.229327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d398b7bbfc7'
+down_revision: Union[str, Sequence[str], None] = '400b520416da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('habit_changes',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('revision', sa.BigInteger(), nullable=False),
+    sa.Column('entity', sa.String(length=10), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_habit_changes_revision'), 'habit_changes', ['revision'], unique=False)
+    # Dados existentes entram no feed na versão atual (cliente com since=0 recebe tudo)
+    op.execute(
+        """
+        INSERT INTO habit_changes (revision, entity, entity_id, habit_id, op)
+        SELECT v.version, 'habit', h.id, h.id, 'upsert'
+        FROM habits h, table_versions v
+        WHERE v.name = 'habits' AND h.is_active
+        UNION ALL
+        SELECT v.version, 'log', l.id, l.habit_id, 'upsert'
+        FROM habit_logs l JOIN habits h ON h.id = l.habit_id, table_versions v
+        WHERE v.name = 'habits' AND h.is_active
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_habit_changes_revision'), table_name='habit_changes')
+    op.drop_table('habit_changes')
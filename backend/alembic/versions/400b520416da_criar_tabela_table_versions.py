@@ -0,0 +1,34 @@
+"""criar tabela table_versions
+
+Revision ID: 400b520416da
+Revises: 8154ec841f56
+Create Date: 2026-10-18 14:42:09.216424
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '400b520416da'
+down_revision: Union[str, Sequence[str], None] = '8154ec841f56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('table_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO table_versions (name, version) VALUES ('habits', 1)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_versions')
@@ -0,0 +1,110 @@
+"""particionar habit_logs por ano
+
+Revision ID: 43cbff023222
+Revises: 2d398b7bbfc7
+Create Date: 2026-10-18 14:51:11.465967
+
+"""
+from typing import Sequence, Union
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '43cbff023222'
+down_revision: Union[str, Sequence[str], None] = '2d398b7bbfc7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_year_partition(year: int) -> None:
+    op.execute(
+        f"CREATE TABLE habit_logs_p{year} PARTITION OF habit_logs "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A tabela antiga sai do caminho (com seus índices/constraints) e é copiada no fim
+    op.rename_table('habit_logs', 'habit_logs_old')
+    op.execute("ALTER INDEX habit_logs_pkey RENAME TO habit_logs_old_pkey")
+    op.execute("ALTER INDEX ix_habit_logs_habit_id_completed_date RENAME TO ix_habit_logs_old_habit_day")
+    op.execute("ALTER INDEX ix_habit_logs_id RENAME TO ix_habit_logs_old_id")
+    op.execute("ALTER TABLE habit_logs_old RENAME CONSTRAINT habit_logs_habit_id_fkey TO habit_logs_old_habit_id_fkey")
+
+    # Tabela particionada por ano em completed_date. A chave de partição precisa
+    # fazer parte da PK e dos índices únicos.
+    op.create_table('habit_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('habit_logs_id_seq')"), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('completed_date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], name='habit_logs_habit_id_fkey'),
+    sa.PrimaryKeyConstraint('id', 'completed_date', name='habit_logs_pkey'),
+    postgresql_partition_by='RANGE (completed_date)'
+    )
+    op.create_index('ix_habit_logs_habit_id_completed_date', 'habit_logs', ['habit_id', 'completed_date'], unique=True)
+    op.create_index(op.f('ix_habit_logs_id'), 'habit_logs', ['id'], unique=False)
+
+    # Uma partição por ano com dados, mais o ano atual e o próximo; a DEFAULT
+    # recebe datas fora dessas faixas até a manutenção criar a partição do ano
+    bind = op.get_bind()
+    years = set(bind.execute(sa.text(
+        "SELECT DISTINCT extract(year FROM completed_date)::int FROM habit_logs_old"
+    )).scalars())
+    current = date.today().year
+    years.update({current, current + 1})
+    for year in sorted(years):
+        _create_year_partition(year)
+    op.execute("CREATE TABLE habit_logs_default PARTITION OF habit_logs DEFAULT")
+
+    op.execute("INSERT INTO habit_logs (id, habit_id, completed_date) SELECT id, habit_id, completed_date FROM habit_logs_old")
+    op.execute("ALTER SEQUENCE habit_logs_id_seq OWNED BY habit_logs.id")
+    op.drop_table('habit_logs_old')
+
+    # Arquivo compacto para a retenção: um registro por hábito por ano (dias do ano)
+    op.create_table('habit_logs_archive',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.SmallInteger(), nullable=False),
+    sa.Column('days', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ),
+    sa.PrimaryKeyConstraint('habit_id', 'year')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('habit_logs', 'habit_logs_partitioned')
+    op.execute("ALTER INDEX habit_logs_pkey RENAME TO habit_logs_partitioned_pkey")
+    op.execute("ALTER INDEX ix_habit_logs_habit_id_completed_date RENAME TO ix_habit_logs_partitioned_habit_day")
+    op.execute("ALTER INDEX ix_habit_logs_id RENAME TO ix_habit_logs_partitioned_id")
+    op.execute("ALTER TABLE habit_logs_partitioned RENAME CONSTRAINT habit_logs_habit_id_fkey TO habit_logs_partitioned_habit_id_fkey")
+
+    op.create_table('habit_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('habit_logs_id_seq')"), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('completed_date', sa.Date(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_habit_logs_habit_id_completed_date', 'habit_logs', ['habit_id', 'completed_date'], unique=True)
+    op.create_index(op.f('ix_habit_logs_id'), 'habit_logs', ['id'], unique=False)
+
+    op.execute("INSERT INTO habit_logs (id, habit_id, completed_date) SELECT id, habit_id, completed_date FROM habit_logs_partitioned")
+    # Dias arquivados voltam como logs (com novos ids)
+    op.execute(
+        """
+        INSERT INTO habit_logs (habit_id, completed_date)
+        SELECT a.habit_id, make_date(a.year, 1, 1) + (d.day - 1)
+        FROM habit_logs_archive a, unnest(a.days) AS d(day)
+        ON CONFLICT (habit_id, completed_date) DO NOTHING
+        """
+    )
+    op.execute("ALTER SEQUENCE habit_logs_id_seq OWNED BY habit_logs.id")
+    op.drop_table('habit_logs_archive')
+    op.drop_table('habit_logs_partitioned') # Remove também as partições
+    # FK criada só agora: as partições usavam o mesmo nome de constraint
+    op.create_foreign_key('habit_logs_habit_id_fkey', 'habit_logs', 'habits', ['habit_id'], ['id'])
@@ -0,0 +1,43 @@
+"""indice unico habit_logs por dia
+
+Revision ID: 55d1902c5012
+Revises: 89f76abd888a
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55d1902c5012'
+down_revision: Union[str, Sequence[str], None] = '89f76abd888a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove duplicatas geradas por toggles concorrentes antes de criar o índice único
+    op.execute(
+        """
+        DELETE FROM habit_logs a
+        USING habit_logs b
+        WHERE a.habit_id = b.habit_id
+          AND a.completed_date = b.completed_date
+          AND a.id > b.id
+        """
+    )
+    op.create_index(
+        'ix_habit_logs_habit_id_completed_date',
+        'habit_logs',
+        ['habit_id', 'completed_date'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habit_logs_habit_id_completed_date', table_name='habit_logs')
@@ -0,0 +1,47 @@
+"""criar tabela ai_jobs
+
+Revision ID: 8154ec841f56
+Revises: bc41e386b904
+Create Date: 2026-10-18 12:31:19.570442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8154ec841f56'
+down_revision: Union[str, Sequence[str], None] = 'bc41e386b904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ai_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+    sa.Column('priority', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_jobs_id'), 'ai_jobs', ['id'], unique=False)
+    op.create_index('ix_ai_jobs_queue', 'ai_jobs', ['status', 'priority', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ai_jobs_queue', table_name='ai_jobs')
+    op.drop_index(op.f('ix_ai_jobs_id'), table_name='ai_jobs')
+    op.drop_table('ai_jobs')
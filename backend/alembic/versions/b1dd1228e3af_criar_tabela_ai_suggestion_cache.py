@@ -0,0 +1,34 @@
+"""criar tabela ai_suggestion_cache
+
+Revision ID: b1dd1228e3af
+Revises: 55d1902c5012
+Create Date: 2026-10-18 11:02:47.918233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1dd1228e3af'
+down_revision: Union[str, Sequence[str], None] = '55d1902c5012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ai_suggestion_cache',
+    sa.Column('key', sa.String(length=500), nullable=False),
+    sa.Column('goal', sa.Text(), nullable=False),
+    sa.Column('habits', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ai_suggestion_cache')
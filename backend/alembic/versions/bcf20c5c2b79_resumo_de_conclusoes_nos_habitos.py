@@ -0,0 +1,62 @@
+"""resumo de conclusoes nos habitos
+
+Revision ID: bcf20c5c2b79
+Revises: ea3efed37ac1
+Create Date: 2026-10-18 15:19:11.005716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bcf20c5c2b79'
+down_revision: Union[str, Sequence[str], None] = 'ea3efed37ac1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('habits', sa.Column('last_completed_date', sa.Date(), nullable=True))
+    op.add_column('habits', sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('total_completions', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('recent_days', sa.SmallInteger(), server_default='0', nullable=False))
+    # Resumo inicial a partir dos logs (e dos anos já arquivados): numa sequência de dias
+    # consecutivos, day - row_number() é constante; a sequência atual é a do último dia
+    op.execute(
+        """
+        WITH days AS (
+            SELECT habit_id, completed_date AS day FROM habit_logs
+            UNION
+            SELECT habit_id, make_date(year, 1, 1) + unnest(days) - 1 FROM habit_logs_archive
+        ), runs AS (
+            SELECT habit_id, day,
+                   day - CAST(row_number() OVER (PARTITION BY habit_id ORDER BY day) AS int) AS island,
+                   max(day) OVER (PARTITION BY habit_id) AS last_day,
+                   CAST(count(*) OVER (PARTITION BY habit_id) AS int) AS total
+            FROM days
+        ), summaries AS (
+            SELECT habit_id, max(last_day) AS last_day, max(total) AS total,
+                   count(*) FILTER (WHERE island = last_day - total) AS streak,
+                   coalesce(sum(1 << (last_day - day)) FILTER (WHERE last_day - day < 7), 0) AS recent
+            FROM runs
+            GROUP BY habit_id
+        )
+        UPDATE habits
+        SET last_completed_date = s.last_day, current_streak = s.streak,
+            total_completions = s.total, recent_days = s.recent
+        FROM summaries s
+        WHERE habits.id = s.habit_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('habits', 'recent_days')
+    op.drop_column('habits', 'total_completions')
+    op.drop_column('habits', 'current_streak')
+    op.drop_column('habits', 'last_completed_date')
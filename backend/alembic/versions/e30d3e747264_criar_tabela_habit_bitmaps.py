@@ -0,0 +1,57 @@
+"""criar tabela habit_bitmaps
+
+Revision ID: e30d3e747264
+Revises: 43cbff023222
+Create Date: 2026-10-18 14:53:39.236367
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e30d3e747264'
+down_revision: Union[str, Sequence[str], None] = '43cbff023222'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('habit_bitmaps',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.SmallInteger(), nullable=False),
+    sa.Column('bits', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('habit_id', 'year')
+    )
+    # Bitmaps iniciais a partir dos logs (e dos anos já arquivados): cada byte é a soma
+    # dos bits dos seus 8 dias, na ordem do set_bit (bit menos significativo primeiro)
+    op.execute(
+        """
+        WITH days AS (
+            SELECT habit_id, extract(year FROM completed_date)::int AS year,
+                   extract(doy FROM completed_date)::int - 1 AS bit
+            FROM habit_logs
+            UNION
+            SELECT habit_id, year, unnest(days) - 1 FROM habit_logs_archive
+        ), bytes AS (
+            SELECT k.habit_id, k.year, i, coalesce(sum(DISTINCT 1 << (d.bit % 8)), 0) AS v
+            FROM (SELECT DISTINCT habit_id, year FROM days) k
+            CROSS JOIN generate_series(0, 45) i
+            LEFT JOIN days d ON d.habit_id = k.habit_id AND d.year = k.year AND d.bit / 8 = i
+            GROUP BY k.habit_id, k.year, i
+        )
+        INSERT INTO habit_bitmaps (habit_id, year, bits)
+        SELECT habit_id, year, decode(string_agg(lpad(to_hex(v), 2, '0'), '' ORDER BY i), 'hex')
+        FROM bytes
+        GROUP BY habit_id, year
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('habit_bitmaps')
@@ -0,0 +1,51 @@
+"""criar tabelas de importacao de habitos
+
+Revision ID: ea3efed37ac1
+Revises: f95e64e58655
+Create Date: 2026-10-18 14:59:44.198150
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ea3efed37ac1'
+down_revision: Union[str, Sequence[str], None] = 'f95e64e58655'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('habit_imports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('records_done', sa.BigInteger(), nullable=False),
+    sa.Column('habits_imported', sa.Integer(), nullable=False),
+    sa.Column('logs_imported', sa.BigInteger(), nullable=False),
+    sa.Column('skipped', sa.BigInteger(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_habit_imports_id'), 'habit_imports', ['id'], unique=False)
+    op.create_table('habit_import_ids',
+    sa.Column('import_id', sa.Integer(), nullable=False),
+    sa.Column('source_id', sa.Integer(), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['import_id'], ['habit_imports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('import_id', 'source_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('habit_import_ids')
+    op.drop_index(op.f('ix_habit_imports_id'), table_name='habit_imports')
+    op.drop_table('habit_imports')
@@ -0,0 +1,38 @@
+"""cascade nos logs e soft delete de habitos
+
+Revision ID: f95e64e58655
+Revises: e30d3e747264
+Create Date: 2026-10-18 14:57:30.163678
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f95e64e58655'
+down_revision: Union[str, Sequence[str], None] = 'e30d3e747264'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ON DELETE CASCADE: apagar um hábito vira um único DELETE, sem carregar os logs.
+    # Em habit_logs (particionada) a troca vale para todas as partições.
+    op.drop_constraint(op.f('habit_logs_habit_id_fkey'), 'habit_logs', type_='foreignkey')
+    op.create_foreign_key(op.f('habit_logs_habit_id_fkey'), 'habit_logs', 'habits', ['habit_id'], ['id'], ondelete='CASCADE')
+    op.drop_constraint(op.f('habit_logs_archive_habit_id_fkey'), 'habit_logs_archive', type_='foreignkey')
+    op.create_foreign_key(op.f('habit_logs_archive_habit_id_fkey'), 'habit_logs_archive', 'habits', ['habit_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_habits_archived_updated_at', 'habits', ['updated_at'], unique=False, postgresql_where=sa.text('is_active = false'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habits_archived_updated_at', table_name='habits', postgresql_where=sa.text('is_active = false'))
+    op.drop_constraint(op.f('habit_logs_archive_habit_id_fkey'), 'habit_logs_archive', type_='foreignkey')
+    op.create_foreign_key(op.f('habit_logs_archive_habit_id_fkey'), 'habit_logs_archive', 'habits', ['habit_id'], ['id'])
+    op.drop_constraint(op.f('habit_logs_habit_id_fkey'), 'habit_logs', type_='foreignkey')
+    op.create_foreign_key(op.f('habit_logs_habit_id_fkey'), 'habit_logs', 'habits', ['habit_id'], ['id'])
@@ -1,25 +1,194 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.ai import AIRequest, AIResponse, ChatRequest, ChatResponse
+import json
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.db.query_budget import QueryBudget
+from app.schemas.ai import (
+    AIRequest, AIResponse, AIBatchRequest, AIBatchItem, AIBatchResponse,
+    ChatRequest, ChatResponse,
+    ChatSessionMessage, ChatSessionRead, ChatSessionReply,
+    AIJobCreated, AIJobRead
+)
 from app.services.ai_service import AIService
+from app.services.chat_context import ChatContextManager
+from app.services.chat_session_service import ChatSessionService
+from app.services.job_queue import QueueFullError
+from app.services.llm_client import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/suggest", response_model=AIResponse)
-async def suggest_habits(request: AIRequest):
+# Factory function: reaproveita o cliente de IA criado no lifespan da aplicação
+def get_ai_service(request: Request) -> AIService:
+    return request.app.state.ai_service
+
+# O serviço de sessões abre as próprias transações curtas (nada de conexão presa durante o LLM)
+def get_chat_session_service(request: Request) -> ChatSessionService:
+    context = ChatContextManager(
+        max_messages=settings.CHAT_CONTEXT_MAX_MESSAGES,
+        token_budget=settings.CHAT_CONTEXT_TOKEN_BUDGET
+    )
+    return ChatSessionService(get_ai_service(request), context)
+
+@router.post("/suggest", response_model=AIResponse, responses={202: {"model": AIJobCreated}})
+async def suggest_habits(
+    request: AIRequest,
+    http_request: Request,
+    use_cache: bool = True,
+    run_async: bool = Query(False, alias="async"),
+    priority: int = 0,
+    service: AIService = Depends(get_ai_service)
+):
+    """
+    Gera hábitos para uma meta. Com ?async=true devolve 202 com o id do job
+    imediatamente; o resultado é consultado em GET /api/ai/jobs/{id}.
+    Com a fila desligada (AI_JOBS_ENABLED=false) nenhum worker processaria o job:
+    o pedido é atendido de forma síncrona (200), como sem ?async.
+    """
     if not request.goal:
         raise HTTPException(status_code=400, detail="A meta é obrigatória")
+
+    if run_async and settings.AI_JOBS_ENABLED:
+        try:
+            job = await http_request.app.state.job_queue.submit(
+                "suggest", {"goal": request.goal, "use_cache": use_cache}, priority
+            )
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        created = AIJobCreated(job_id=job.id, status=job.status)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=created.model_dump())
     
-    service = AIService()
     try:
-        return await service.generate_habits_from_goal(request.goal)
+        return await service.generate_habits_from_goal(request.goal, use_cache)
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Erro na IA: {e}")
+        logger.exception("Erro na IA")
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.post("/suggest/batch", response_model=AIBatchResponse)
+async def suggest_habits_batch(
+    request: AIBatchRequest,
+    use_cache: bool = True,
+    service: AIService = Depends(get_ai_service)
+):
+    """
+    Gera hábitos para várias metas com o mínimo de chamadas ao LLM.
+    Falhas são reportadas por meta, sem derrubar o lote inteiro.
+    """
+    goals = [goal for goal in request.goals if goal.strip()]
+    if not goals:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma meta")
+
+    results = await service.generate_habits_batch(goals, use_cache)
+    items = []
+    for goal, result in zip(goals, results):
+        if isinstance(result, Exception):
+            logger.error("Erro na IA (lote) para a meta %r", goal, exc_info=result)
+            items.append(AIBatchItem(goal=goal, error=str(result) or "Erro ao gerar hábitos"))
+        else:
+            items.append(AIBatchItem(goal=goal, habits=result.habits))
+    return AIBatchResponse(results=items)
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(request: ChatRequest):
-    service = AIService()
+async def chat_with_ai(request: ChatRequest, service: AIService = Depends(get_ai_service)):
     try:
         return await service.run_chat(request)
-    except Exception as e:
-        return ChatResponse(response="Desculpe, estou com dificuldades de conexão no momento.")
\ No newline at end of file
+    except Exception:
+        logger.exception("Erro na IA (chat)")
+        return ChatResponse(response="Desculpe, estou com dificuldades de conexão no momento.")
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _sse_events(request: Request, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    # aclosing garante que o stream do LLM é fechado (e a vaga liberada) ao desconectar
+    try:
+        async with aclosing(tokens):
+            async for token in tokens:
+                if await request.is_disconnected():
+                    break
+                yield _sse({"token": token})
+            else:
+                yield _sse({}, event="done")
+    except LLMUnavailableError as e:
+        yield _sse({"detail": str(e)}, event="error")
+    except Exception:
+        logger.exception("Erro na IA (stream)")
+        yield _sse({"detail": "Desculpe, estou com dificuldades de conexão no momento."}, event="error")
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: Request,
+    chat_request: ChatRequest,
+    service: AIService = Depends(get_ai_service)
+):
+    """
+    Chat em streaming (Server-Sent Events): cada token é enviado assim que chega.
+    Se o cliente desconectar, a geração é interrompida.
+    """
+    return _sse_response(_sse_events(request, service.stream_chat(chat_request)))
+
+@router.post("/chat/sessions", response_model=ChatSessionRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(QueryBudget(1))])
+async def create_chat_session(service: ChatSessionService = Depends(get_chat_session_service)):
+    """ Cria uma sessão de chat persistida no servidor. """
+    return await service.create_session()
+
+@router.get("/chat/sessions/{session_id}", response_model=ChatSessionRead)
+async def read_chat_session(session_id: int, service: ChatSessionService = Depends(get_chat_session_service)):
+    """ Resumo atual e contabilidade de tokens da sessão. """
+    return await service.get_session(session_id)
+
+@router.post("/chat/sessions/{session_id}/messages", response_model=ChatSessionReply)
+async def send_chat_session_message(
+    session_id: int,
+    message: ChatSessionMessage,
+    service: ChatSessionService = Depends(get_chat_session_service)
+):
+    """ Envia apenas a nova mensagem; o histórico fica no servidor. """
+    try:
+        return await service.send_message(session_id, message.content)
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.post("/chat/sessions/{session_id}/messages/stream")
+async def stream_chat_session_message(
+    request: Request,
+    session_id: int,
+    message: ChatSessionMessage,
+    service: ChatSessionService = Depends(get_chat_session_service)
+):
+    """ Versão em streaming (SSE) do envio de mensagem numa sessão. """
+    # Valida a sessão antes de abrir o stream (404 normal em vez de evento de erro)
+    await service.get_session(session_id)
+    return _sse_response(_sse_events(request, service.stream_message(session_id, message.content)))
+
+@router.get("/jobs/metrics")
+async def ai_jobs_metrics(request: Request):
+    """ Profundidade da fila e contadores dos workers deste processo. """
+    return await request.app.state.job_queue.metrics()
+
+@router.get("/jobs/{job_id}", response_model=AIJobRead)
+async def read_ai_job(job_id: int, request: Request):
+    """ Estado (e resultado, quando pronto) de um job assíncrono. """
+    job = await request.app.state.job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+@router.get("/cache/stats")
+async def suggestion_cache_stats(request: Request):
+    """ Contadores do cache de sugestões (hits, misses, coalescidas). """
+    return request.app.state.suggestion_cache.stats()
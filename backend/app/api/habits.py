@@ -1,20 +1,58 @@
-from fastapi import APIRouter, Depends, status
+import asyncio
+from fastapi import APIRouter, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional, Union
+from datetime import date
 
-from app.db.session import get_db
-from app.schemas.habit import HabitCreate, HabitRead
+from app.db.session import get_db, get_read_db
+from app.db.query_budget import QueryBudget
+from app.core.conditional import build_validators, not_modified
+from app.core.config import settings
+from app.schemas.habit import (
+    HabitCreate, HabitRead, HabitToggleRead,
+    HabitBulkCreate, HabitBulkIds, HabitBulkToggle,
+    HabitBulkToggleResult, HabitBulkDeleteResult, HabitChangeFeed, HabitImportRead
+)
+from app.schemas.analytics import HabitStats, HabitHeatmap, HabitInsights
 from app.repositories.habit_repository import HabitRepository
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.bitmap_repository import BitmapRepository
 from app.services.habit_service import HabitService
+from app.services.analytics_service import AnalyticsService
+from app.services.habit_transfer import EXPORT_FORMATS, export_stream
 
 router = APIRouter()
 
+# QueryBudget(n): máximo de comandos SQL da rota, conferido com QUERY_BUDGET_MODE ligado.
+# Os valores são os do caminho sem cache; um N+1 que volte estoura o orçamento nos testes
+
 # Factory function para instanciar o Service com suas dependências
-def get_habit_service(db: AsyncSession = Depends(get_db)) -> HabitService:
+def get_habit_service(request: Request, db: AsyncSession = Depends(get_db)) -> HabitService:
     repository = HabitRepository(db)
-    return HabitService(repository)
+    state = request.app.state
+    return HabitService(
+        repository,
+        getattr(state, "broadcaster", None),
+        getattr(state, "habit_cache", None),
+        bitmaps_enabled=settings.HABIT_BITMAPS_ENABLED,
+        soft_delete=settings.HABIT_SOFT_DELETE,
+    )
+
+def get_analytics_service(db: AsyncSession = Depends(get_db)) -> AnalyticsService:
+    repository = AnalyticsRepository(db)
+    bitmaps = BitmapRepository(db) if settings.HABIT_BITMAPS_ENABLED else None
+    return AnalyticsService(repository, bitmaps)
+
+# Versões somente leitura: sessão da réplica (DB_REPLICA_URL), ou do primário se não houver
+def get_habit_reader(request: Request, db: AsyncSession = Depends(get_read_db)) -> HabitService:
+    return HabitService(HabitRepository(db), cache=getattr(request.app.state, "habit_cache", None))
 
-@router.post("/", response_model=HabitRead, status_code=status.HTTP_201_CREATED)
+def get_analytics_reader(db: AsyncSession = Depends(get_read_db)) -> AnalyticsService:
+    bitmaps = BitmapRepository(db) if settings.HABIT_BITMAPS_ENABLED else None
+    return AnalyticsService(AnalyticsRepository(db), bitmaps)
+
+@router.post("/", response_model=HabitRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(QueryBudget(2))])
 async def create_habit(
     habit_in: HabitCreate,
     service: HabitService = Depends(get_habit_service)
@@ -24,29 +62,332 @@ async def create_habit(
     """
     return await service.create_new_habit(habit_in)
 
-@router.get("/", response_model=List[HabitRead])
+@router.post("/bulk", response_model=List[HabitRead], status_code=status.HTTP_201_CREATED, dependencies=[Depends(QueryBudget(2))])
+async def create_habits_bulk(
+    payload: HabitBulkCreate,
+    service: HabitService = Depends(get_habit_service)
+):
+    """
+    Cria vários hábitos de uma vez (um único INSERT), ex: sugestões da IA.
+    """
+    return await service.create_habits_bulk(payload.habits)
+
+@router.post("/bulk/toggle", response_model=HabitBulkToggleResult, dependencies=[Depends(QueryBudget(3))])
+async def toggle_habits_bulk(
+    payload: HabitBulkToggle,
+    service: HabitService = Depends(get_habit_service)
+):
+    """ Marca/desmarca vários hábitos na mesma data em um único comando. """
+    return await service.toggle_habits_bulk(payload.habit_ids, payload.completed_date)
+
+@router.post("/bulk/delete", response_model=HabitBulkDeleteResult, dependencies=[Depends(QueryBudget(2))])
+async def remove_habits_bulk(
+    payload: HabitBulkIds,
+    hard: bool = False,
+    service: HabitService = Depends(get_habit_service)
+):
+    """
+    Apaga vários hábitos (e seus logs) em um único comando.
+    Com HABIT_SOFT_DELETE ligado eles são arquivados; use ?hard=true para apagar de vez.
+    """
+    return await service.delete_habits_bulk(payload.habit_ids, hard)
+
+@router.get("/", response_model=List[HabitRead], dependencies=[Depends(QueryBudget(3))])
 async def read_habits(
+    request: Request,
     skip: int = 0,
-    limit: int = 100,
-    service: HabitService = Depends(get_habit_service)
+    limit: int = Query(100, ge=1, le=500),
+    after_id: Optional[int] = None,
+    logs_since: Optional[date] = None,
+    logs_until: Optional[date] = None,
+    fields: Optional[str] = None,
+    service: HabitService = Depends(get_habit_reader)
 ):
     """
     Lista todos os hábitos ativos.
+
+    - after_id: cursor (keyset) — devolve hábitos com id maior que o informado.
+      O próximo cursor vem no header X-Next-Cursor.
+    - logs_since / logs_until: carrega apenas os logs dentro da janela de datas.
+    - fields: lista separada por vírgulas (ex: "id,name"). Sem "logs", nenhum log é consultado.
+      O resumo (completed_today, current_streak, completions_last_7_days...) vem do próprio hábito.
+
+    Responde com ETag/Last-Modified; com If-None-Match igual, devolve 304 sem consultar os hábitos.
+    O header X-Change-Cursor traz o cursor para sincronizar depois via /changes.
+    """
+    version, updated_at = await service.get_version()
+    validators = build_validators(request, version, updated_at, date.today()) # O resumo depende do dia
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+    headers = {**validators.headers, "X-Change-Cursor": str(version)}
+
+    # Corpo já serializado (e cacheado) pelo service: devolvido sem revalidar no response_model
+    if fields is not None:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+        body, next_cursor = await service.list_habit_fields_json(field_list, skip, limit, after_id, logs_since, logs_until, version)
+    else:
+        body, next_cursor = await service.list_habits_json(skip, limit, after_id, logs_since, logs_until, version)
+
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/changes", response_model=HabitChangeFeed, dependencies=[Depends(QueryBudget(4))])
+async def read_habit_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    service: HabitService = Depends(get_habit_service)
+):
+    """
+    Delta-sync: hábitos e logs criados, alterados ou apagados (tombstones) depois do cursor.
+    Use o 'cursor' da resposta (ou o header X-Change-Cursor da listagem) como 'since'
+    na próxima chamada; enquanto has_more for true, ainda há mudanças a buscar.
+    """
+    return await service.get_changes(since, limit)
+
+@router.websocket("/events")
+async def habit_events(websocket: WebSocket):
+    """
+    Eventos em tempo real (habit.created, habit.toggled, habit.deleted) em JSON.
+    Clientes que não acompanham o ritmo são desconectados (código 1013) e devem
+    reconectar e sincronizar via /changes.
+    """
+    broadcaster = websocket.app.state.broadcaster
+    await websocket.accept()
+    subscription = broadcaster.subscribe()
+
+    async def watch_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for message in subscription:
+            await asyncio.wait_for(websocket.send_text(message), settings.EVENTS_SEND_TIMEOUT_SECONDS)
+        if subscription.dropped:
+            await websocket.close(code=1013, reason="Consumidor lento")
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        broadcaster.unsubscribe(subscription)
+
+@router.get("/cache/stats")
+async def habit_cache_stats(request: Request):
+    """ Hit ratio e invalidações do cache de leituras de hábitos. """
+    return request.app.state.habit_cache.stats()
+
+@router.get("/events/stats")
+async def habit_events_stats(request: Request):
+    """ Assinantes conectados neste worker e contadores de eventos. """
+    return request.app.state.broadcaster.stats()
+
+@router.post("/bitmaps/rebuild")
+async def rebuild_habit_bitmaps(
+    body: Optional[HabitBulkIds] = None,
+    service: AnalyticsService = Depends(get_analytics_service)
+):
+    """ Recalcula os bitmaps de conclusão a partir dos logs (todos, ou só os ids enviados). """
+    rebuilt = await service.rebuild_bitmaps(body.habit_ids if body else None)
+    return {"rebuilt": rebuilt}
+
+@router.post("/summaries/repair")
+async def repair_habit_summaries(
+    request: Request,
+    body: Optional[HabitBulkIds] = None,
+    service: HabitService = Depends(get_habit_service)
+):
+    """
+    Recalcula o resumo de conclusões (last_completed_date, current_streak, total...) a partir
+    dos logs e corrige o que divergiu: só os ids enviados, ou todos os hábitos em lotes.
+    """
+    if body is not None:
+        checked, fixed = await service.repair_summaries(body.habit_ids)
+        return {"checked": len(checked), "fixed": len(fixed), "batches": 1}
+    return await request.app.state.summary_repair.run_once()
+
+@router.get("/export")
+async def export_habits(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Backup de todos os hábitos e logs em NDJSON ou CSV, enviado em streaming
+    (cursor no servidor, memória constante). O arquivo volta em POST /import.
+    """
+    return StreamingResponse(
+        export_stream(format, settings.HABIT_EXPORT_CHUNK_SIZE),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="habits.{format}"'},
+    )
+
+@router.post("/import", response_model=HabitImportRead)
+async def import_habits(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    import_id: Optional[int] = None,
+):
+    """
+    Importa um arquivo do export (corpo cru, lido em streaming) em lotes.
+    O formato vem de ?format= ou do Content-Type. Se falhar no meio, a resposta (422)
+    traz o id da importação: reenvie o mesmo arquivo com ?import_id= para retomar.
+    """
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    return await request.app.state.habit_importer.run(request.stream(), format, import_id)
+
+@router.get("/import/{import_id}", response_model=HabitImportRead)
+async def read_habit_import(import_id: int, request: Request):
+    """ Progresso e estado de uma importação. """
+    return await request.app.state.habit_importer.get(import_id)
+
+@router.get("/stats", response_model=List[HabitStats], dependencies=[Depends(QueryBudget(3))])
+async def read_habits_stats(
+    request: Request,
+    response: Response,
+    days: int = Query(30, ge=1, le=366),
+    weeks: int = Query(12, ge=1, le=104),
+    months: int = Query(12, ge=1, le=36),
+    service: AnalyticsService = Depends(get_analytics_reader),
+    habits: HabitService = Depends(get_habit_reader)
+):
+    """
+    Estatísticas (streaks, taxa de conclusão e contagens por semana/mês)
+    de todos os hábitos ativos, calculadas no banco.
+    """
+    # As janelas são relativas a hoje: a data entra no ETag
+    validators = build_validators(request, *await habits.get_version(), date.today())
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    stats = await service.list_stats(days, weeks, months)
+    response.headers.update(validators.headers)
+    return stats
+
+@router.get("/{habit_id}/stats", response_model=HabitStats, dependencies=[Depends(QueryBudget(3))])
+async def read_habit_stats(
+    request: Request,
+    response: Response,
+    habit_id: int,
+    days: int = Query(30, ge=1, le=366),
+    weeks: int = Query(12, ge=1, le=104),
+    months: int = Query(12, ge=1, le=36),
+    service: AnalyticsService = Depends(get_analytics_reader),
+    habits: HabitService = Depends(get_habit_reader)
+):
+    """ Estatísticas de um único hábito. """
+    validators = build_validators(request, *await habits.get_version(), date.today())
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    stats = await service.get_stats(habit_id, days, weeks, months)
+    response.headers.update(validators.headers)
+    return stats
+
+@router.get("/{habit_id}/heatmap", response_model=HabitHeatmap, dependencies=[Depends(QueryBudget(3))])
+async def read_habit_heatmap(
+    request: Request,
+    response: Response,
+    habit_id: int,
+    year: Optional[int] = Query(None, ge=1970, le=9999),
+    service: AnalyticsService = Depends(get_analytics_reader),
+    habits: HabitService = Depends(get_habit_reader)
+):
+    """
+    Dias concluídos no ano (padrão: ano atual) como bitmap base64 de 46 bytes,
+    para o cliente desenhar o heatmap sem receber a lista de logs.
     """
-    return await service.list_habits(skip, limit)
+    year = year or date.today().year
+    validators = build_validators(request, *await habits.get_version(), year) # Cada ano tem o seu ETag
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
 
-@router.post("/{habit_id}/toggle", response_model=HabitRead)
+    heatmap = await service.get_heatmap(habit_id, year)
+    response.headers.update(validators.headers)
+    return heatmap
+
+@router.get("/{habit_id}/insights", response_model=HabitInsights, dependencies=[Depends(QueryBudget(3))])
+async def read_habit_insights(
+    request: Request,
+    response: Response,
+    habit_id: int,
+    window: int = Query(30, ge=1, le=366),
+    service: AnalyticsService = Depends(get_analytics_reader),
+    habits: HabitService = Depends(get_habit_reader)
+):
+    """ Streaks, taxa de conclusão móvel e histograma por dia da semana sobre todo o histórico. """
+    validators = build_validators(request, *await habits.get_version(), date.today())
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    insights = await service.get_insights(habit_id, window)
+    response.headers.update(validators.headers)
+    return insights
+
+@router.get("/{habit_id}", response_model=HabitRead, dependencies=[Depends(QueryBudget(3))])
+async def read_habit(
+    request: Request,
+    habit_id: int,
+    logs_since: Optional[date] = None,
+    logs_until: Optional[date] = None,
+    service: HabitService = Depends(get_habit_reader)
+):
+    """ Busca um hábito, opcionalmente com os logs restritos a uma janela de datas. """
+    version, updated_at = await service.get_version()
+    validators = build_validators(request, version, updated_at, date.today()) # O resumo depende do dia
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    body = await service.get_habit_json(habit_id, logs_since, logs_until, version)
+    return Response(content=body, media_type="application/json", headers=validators.headers)
+
+@router.post("/{habit_id}/toggle", response_model=Union[HabitToggleRead, HabitRead], dependencies=[Depends(QueryBudget(5))])
 async def toggle_habit_status(
     habit_id: int,
+    full: bool = False,
     service: HabitService = Depends(get_habit_service)
 ):
-    """ Marca ou desmarca hábito feito hoje. """
-    return await service.toggle_habit(habit_id)
+    """
+    Marca ou desmarca hábito feito hoje.
+    Por padrão devolve apenas o novo estado do dia; use ?full=true para o hábito completo.
+    """
+    result = await service.toggle_habit(habit_id, full)
+    if full:
+        return HabitRead.model_validate(result)
+    return result
 
-@router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.post("/{habit_id}/archive", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(QueryBudget(2))])
+async def archive_habit(
+    habit_id: int,
+    service: HabitService = Depends(get_habit_service)
+):
+    """ Arquiva o hábito (soft delete): sai das listas e é apagado pelo purge depois do prazo. """
+    await service.archive_habit(habit_id)
+
+@router.post("/{habit_id}/restore", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(QueryBudget(3))])
+async def restore_habit(
+    habit_id: int,
+    service: HabitService = Depends(get_habit_service)
+):
+    """ Desarquiva um hábito ainda não purgado, com todo o histórico. """
+    await service.restore_habit(habit_id)
+
+@router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(QueryBudget(2))])
 async def remove_habit(
     habit_id: int,
+    hard: bool = False,
     service: HabitService = Depends(get_habit_service)
 ):
-    """Apaga um hábito permanentemente."""
-    await service.delete_habit(habit_id)
\ No newline at end of file
+    """
+    Apaga um hábito e todo o seu histórico (um único DELETE com cascade no banco).
+    Com HABIT_SOFT_DELETE ligado ele é arquivado; use ?hard=true para apagar de vez.
+    """
+    await service.delete_habit(habit_id, hard)
\ No newline at end of file
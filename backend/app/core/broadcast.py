@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import run_after_commit
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """
+    Assinante de eventos com fila limitada. Se a fila enche (consumidor lento
+    ou socket travado), a assinatura é encerrada em vez de acumular memória.
+    """
+
+    def __init__(self, maxsize: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+        self.dropped = False
+
+    def offer(self, message: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # Descarta o que está pendente e acorda o consumidor
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        message = await self._queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+class MemoryBackend:
+    """ Backend in-process: entrega direto aos assinantes deste worker. """
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, message: str) -> None:
+        if self._deliver is not None:
+            self._deliver(message)
+
+class PostgresBackend:
+    """
+    Backend via Postgres LISTEN/NOTIFY: todos os workers (uvicorn --workers N)
+    escutam o mesmo canal, inclusive quem publicou. Usa uma conexão asyncpg dedicada,
+    fora do pool do SQLAlchemy, e reconecta se ela cair.
+    """
+
+    def __init__(self, dsn: str, channel: str = "habit_events", reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._conn: Any = None
+        self._lock = asyncio.Lock() # asyncpg não aceita comandos simultâneos na mesma conexão
+        self._deliver: Optional[Callable[[str], None]] = None
+        self._reconnect: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+        await self._connect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+        self._conn = await asyncpg.connect(self.dsn)
+        self._conn.add_termination_listener(self._on_terminated)
+        await self._conn.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        if self._deliver is not None:
+            self._deliver(payload)
+
+    def _on_terminated(self, conn: Any) -> None:
+        if self._deliver is not None and self._reconnect is None:
+            self._reconnect = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        try:
+            while self._deliver is not None:
+                try:
+                    await self._connect()
+                    return
+                except Exception:
+                    logger.exception("Erro ao reconectar LISTEN/NOTIFY")
+                    await asyncio.sleep(self.reconnect_delay)
+        finally:
+            self._reconnect = None
+
+    async def stop(self) -> None:
+        self._deliver = None
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def publish(self, message: str) -> None:
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, message)
+
+class Broadcaster:
+    """
+    Fan-out de eventos para assinantes (ex: WebSockets) com backend plugável.
+    A mensagem é serializada uma única vez e entregue sem bloquear quem publica;
+    assinantes lentos são desconectados (backpressure).
+    """
+
+    def __init__(self, backend: Any = None, queue_size: int = 100):
+        self.backend = backend or MemoryBackend()
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        subscription.close()
+
+    async def publish(self, event_data: Dict[str, Any]) -> None:
+        self.published += 1
+        await self.backend.publish(json.dumps(event_data, default=str, separators=(",", ":")))
+
+    def publish_after_commit(self, db: AsyncSession, event_data: Dict[str, Any]) -> None:
+        """
+        Agenda o evento para depois do commit da sessão; em rollback ele é descartado.
+        """
+        run_after_commit(db, lambda: self.publish(event_data))
+
+    def _deliver(self, message: str) -> None:
+        for subscription in list(self._subscribers):
+            if subscription.offer(message):
+                self.delivered += 1
+            elif subscription.dropped:
+                self.dropped += 1
+                self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
+
+def create_broadcaster() -> Broadcaster:
+    """ Backend escolhido em EVENTS_BACKEND ("memory" ou "postgres"). """
+    backend: Any = MemoryBackend()
+    if settings.EVENTS_BACKEND == "postgres":
+        dsn = settings.SQLALCHEMY_DATABASE_URI.replace("postgresql+asyncpg://", "postgresql://")
+        backend = PostgresBackend(dsn, channel=settings.EVENTS_CHANNEL)
+    return Broadcaster(backend, queue_size=settings.EVENTS_QUEUE_SIZE)
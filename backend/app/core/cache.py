@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """
+    Cache em memória com limite de tamanho (LRU) e expiração por TTL.
+    Não é thread-safe: feito para ser usado dentro do event loop.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SingleFlight:
+    """
+    Coalescência de requisições: chamadas concorrentes com a mesma chave
+    aguardam a mesma execução em vez de disparar N execuções.
+    A execução roda numa task própria: cancelar quem a iniciou (ex: cliente
+    desconectou) só interrompe a espera dele, não a dos outros.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def is_inflight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evita "exception was never retrieved" quando ninguém mais esperava
+        if not task.cancelled():
+            task.exception()
+
+class MemoryCacheBackend:
+    """
+    Backend local (por processo) com a mesma interface assíncrona do Redis
+    usada pelos caches: get / set(ex=) / delete / incr.
+    Os contadores (incr) ficam fora do LRU para nunca serem despejados.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[float] = None) -> None:
+        self._entries.set(key, value, ttl=ex)
+
+    async def delete(self, key: str) -> None:
+        self._entries.delete(key)
+        self._counters.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class FakeRedis:
+    """
+    Substituto local do cliente redis.asyncio (subconjunto get/set/delete/incr),
+    para exercitar o caminho do backend Redis sem um servidor.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._alive(key)
+
+    async def set(self, key: str, value: Any, ex: Optional[float] = None) -> None:
+        data = value if isinstance(value, bytes) else str(value).encode()
+        self._data[key] = (data, time.monotonic() + ex if ex else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._alive(key) or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class RedisCacheBackend:
+    """ Backend compartilhado entre processos sobre um cliente compatível com redis.asyncio. """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[float] = None) -> None:
+        await self.client.set(key, value, ex=max(1, int(ex)) if ex else None)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    async def aclose(self) -> None:
+        # Fecha o pool de conexões do cliente (redis.asyncio >= 5: aclose)
+        close = getattr(self.client, "aclose", None)
+        if close is not None:
+            await close()
@@ -0,0 +1,37 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+@dataclass
+class Validators:
+    etag: str
+    last_modified: str
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        # no-cache: o navegador guarda a resposta, mas sempre revalida (If-None-Match)
+        return {"ETag": self.etag, "Last-Modified": self.last_modified, "Cache-Control": "no-cache"}
+
+def build_validators(request: Request, version: int, updated_at: datetime, *extra: Any) -> Validators:
+    """
+    ETag forte derivado da versão dos dados + URL pedida (path e query),
+    então cada representação (paginação, janela de logs, fields) tem o seu.
+    'extra' entra na chave quando a resposta depende de algo além dos dados (ex: a data de hoje).
+    """
+    key = ":".join(str(part) for part in (version, request.url.path, request.url.query, *extra))
+    digest = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+    return Validators(etag=f'"{version}-{digest}"', last_modified=format_datetime(updated_at.astimezone(timezone.utc), usegmt=True))
+
+def not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """ Devolve um 304 se o cliente já tem a representação atual (If-None-Match). """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in candidates or validators.etag in candidates:
+        return Response(status_code=304, headers=validators.headers)
+    return None
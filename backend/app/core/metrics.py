@@ -0,0 +1,290 @@
+"""
+Métricas no formato texto do Prometheus (GET /metrics), sem dependência externa:
+contadores e histogramas com labels, coletados em memória por processo.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.pool import CHECKOUT_BUCKETS, MonitoredPool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+slow_request_logger = logging.getLogger("app.slow_requests")
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [(name, _escape(value)) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Por combinação de labels: [contagem por bucket (não cumulativa) + acima do último, soma]
+        self._values: Dict[Tuple, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        counts, total = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._values[key][1] = total + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._values.items()):
+            lines += _histogram_lines(self.name, self.labels, key, self.buckets, counts, total)
+        return lines
+
+def _histogram_lines(name: str, label_names: Sequence[str], key: Sequence[Any], buckets: Sequence[float], counts: Sequence[int], total: float) -> List[str]:
+    lines = []
+    cumulative = 0
+    for limit, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(label_names, key, ('le', _number(limit)))} {cumulative}")
+    cumulative += counts[-1]
+    lines.append(f"{name}_bucket{_labels(label_names, key, ('le', '+Inf'))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(label_names, key)} {_number(total)}")
+    lines.append(f"{name}_count{_labels(label_names, key)} {cumulative}")
+    return lines
+
+class Registry:
+    def __init__(self):
+        self._collectors: List[Any] = []
+
+    def register(self, collector: Any) -> Any:
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for collector in self._collectors:
+            lines += collector.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requisições HTTP por rota e status.", ["method", "route", "status"]))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.", ["method", "route"]))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "Comandos SQL executados, pela rota que os disparou.", ["route"]))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Duração de cada comando SQL, pela rota que o disparou.", ["route"], QUERY_BUCKETS))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_queries_per_request", "Comandos SQL por requisição.", ["route"], COUNT_BUCKETS))
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls_total", "Chamadas ao LLM por tipo e resultado.", ["call", "outcome"]))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "llm_call_duration_seconds", "Duração das chamadas ao LLM (stream: até o último chunk).", ["call"], LLM_BUCKETS))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Tokens informados pelo provedor.", ["kind"]))
+AI_ERRORS = REGISTRY.register(Counter(
+    "ai_errors_total", "Falhas tratadas no AIService (JSON inválido, resposta sem hábitos, erro do provedor).", ["kind"]))
+
+class RequestMetrics:
+    """ Custo de uma requisição (SQL e LLM), acumulado enquanto ela roda. """
+
+    def __init__(self, keep_statements: bool = False):
+        self.keep_statements = keep_statements
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.sql_durations: List[float] = []
+        self.statements: List[Tuple[float, str]] = []
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record_sql(self, seconds: float, statement: str) -> None:
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        self.sql_durations.append(seconds)
+        if self.keep_statements:
+            self.statements.append((seconds, statement))
+
+    def record_llm(self, seconds: float) -> None:
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+class PoolCollector:
+    """ Gauges e contadores dos pools de conexão, lidos na hora do scrape. """
+
+    def __init__(self):
+        self._engines: Dict[str, AsyncEngine] = {}
+
+    def add(self, name: str, engine: AsyncEngine) -> None:
+        self._engines[name] = engine
+
+    def render(self) -> List[str]:
+        gauges = {
+            "db_pool_size": ("Conexões fixas do pool.", lambda p: p.size()),
+            "db_pool_max_overflow": ("Conexões extras permitidas.", lambda p: p._max_overflow),
+            "db_pool_checked_out": ("Conexões em uso.", lambda p: p.checkedout()),
+            "db_pool_peak_checked_out": ("Maior número de conexões em uso ao mesmo tempo.", lambda p: p.stats.peak_checked_out),
+        }
+        counters = {
+            "db_pool_checkouts_total": ("Checkouts de conexão.", lambda p: p.stats.checkouts),
+            "db_pool_timeouts_total": ("Checkouts que estouraram DB_POOL_TIMEOUT_SECONDS.", lambda p: p.stats.timeouts),
+        }
+        pools = {name: engine.sync_engine.pool for name, engine in self._engines.items()}
+        pools = {name: pool for name, pool in pools.items() if isinstance(pool, MonitoredPool)}
+
+        lines: List[str] = []
+        for kind, metrics in (("gauge", gauges), ("counter", counters)):
+            for metric, (help, read) in metrics.items():
+                lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+                lines += [f'{metric}{{pool="{name}"}} {_number(read(pool))}' for name, pool in pools.items()]
+
+        wait = "db_pool_checkout_wait_seconds"
+        lines += [f"# HELP {wait} Espera no checkout de conexão.", f"# TYPE {wait} histogram"]
+        for name, pool in pools.items():
+            lines += _histogram_lines(wait, ["pool"], [name], CHECKOUT_BUCKETS, pool.stats.buckets, pool.stats.wait_seconds)
+        return lines
+
+POOLS = REGISTRY.register(PoolCollector())
+
+def instrument_engine(engine: AsyncEngine, pool_name: str) -> None:
+    """
+    Mede cada comando SQL do engine e atribui à requisição corrente (ou a
+    'background': workers, purge, jobs) e expõe o pool dele em /metrics.
+    """
+    POOLS.add(pool_name, engine)
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        _finish(conn, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context: Any) -> None:
+        if context.connection is not None:
+            _finish(context.connection, context.statement or "")
+
+def _finish(conn: Any, statement: str) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    request = current_request.get()
+    if request is not None:
+        request.record_sql(seconds, statement)
+    else:
+        DB_QUERIES.inc(route="background")
+        DB_QUERY_LATENCY.observe(seconds, route="background")
+
+def record_llm_call(call: str, outcome: str, seconds: float, usage: Optional[Dict[str, Any]] = None) -> None:
+    LLM_CALLS.inc(call=call, outcome=outcome)
+    LLM_LATENCY.observe(seconds, call=call)
+    for kind in ("input_tokens", "output_tokens"):
+        if usage and usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], kind=kind.removesuffix("_tokens"))
+    request = current_request.get()
+    if request is not None:
+        request.record_llm(seconds)
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """
+    Path da rota com o prefixo do router (ex: /api/habits/{habit_id}). Routers
+    incluídos guardam o path completo no contexto efetivo da rota; sem rota
+    casada, "unmatched" (nunca o path cru: cardinalidade dos labels).
+    """
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(effective, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latência e status por rota (o template, ex: /api/habits/{habit_id}),
+    custo em SQL/LLM da requisição e, opcionalmente, log das requisições lentas.
+    """
+
+    def __init__(self, app: Any, slow_threshold: Optional[float] = None, excluded: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.slow_threshold = slow_threshold # Segundos; None = sem log de lentas
+        self.excluded = set(excluded)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded:
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(keep_statements=self.slow_threshold is not None)
+        token = current_request.set(request)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            self._observe(scope, request, status, time.perf_counter() - start)
+
+    def _observe(self, scope: Dict[str, Any], request: RequestMetrics, status: int, seconds: float) -> None:
+        route = _route_template(scope)
+        method = scope["method"]
+        HTTP_REQUESTS.inc(method=method, route=route, status=status)
+        HTTP_LATENCY.observe(seconds, method=method, route=route)
+        DB_QUERIES.inc(request.sql_count, route=route)
+        DB_QUERIES_PER_REQUEST.observe(request.sql_count, route=route)
+        for duration in request.sql_durations:
+            DB_QUERY_LATENCY.observe(duration, route=route)
+
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            slowest = sorted(request.statements, reverse=True)[:5]
+            slow_request_logger.warning(
+                "Requisição lenta: %s %s (%s) status=%s total=%.1fms sql=%d/%.1fms llm=%d/%.1fms%s",
+                method, scope["path"], route, status, seconds * 1000,
+                request.sql_count, request.sql_seconds * 1000,
+                request.llm_calls, request.llm_seconds * 1000,
+                "".join(f"\n  {s * 1000:.1f}ms {' '.join(sql.split())[:200]}" for s, sql in slowest),
+            )
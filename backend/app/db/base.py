@@ -2,6 +2,9 @@ from sqlalchemy.orm import DeclarativeBase
 
 class Base(DeclarativeBase):
     """Classe base para todos os modelos ORM do SQLAlchemy"""
-    pass
+
+    # Valores gerados no banco (server_default, onupdate=func.now()) voltam no
+    # RETURNING do próprio INSERT/UPDATE: nada de refresh() ou SELECT extra depois do flush
+    __mapper_args__ = {"eager_defaults": True}
 
 # Importaremos os modelos aqui depois (ex: from app.models.habit import Habit)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Limites (segundos) do histograma de espera no checkout
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolStats:
+    """ Contadores de checkout de um pool (sobrevivem ao recreate/dispose do pool). """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_checked_out = 0
+        self.buckets: List[int] = [0] * (len(CHECKOUT_BUCKETS) + 1)
+
+    def record(self, wait: float, checked_out: int) -> None:
+        self.checkouts += 1
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        for i, limit in enumerate(CHECKOUT_BUCKETS):
+            if wait <= limit:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """
+    Pool padrão do engine async, medindo o tempo de cada checkout (espera por
+    conexão livre + pre-ping + abertura de conexões de overflow) e os timeouts.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> Any:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def recreate(self) -> "MonitoredPool":
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+def pool_status(engine: AsyncEngine) -> Optional[Dict[str, Any]]:
+    """ Ocupação atual e histórico de checkouts do pool, para dimensioná-lo com dados. """
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, MonitoredPool):
+        return None
+    stats = pool.stats
+    capacity = pool.size() + pool._max_overflow
+    checked_out = pool.checkedout()
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 4) if capacity else None,
+        "peak_checked_out": stats.peak_checked_out,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_wait_ms": round(stats.wait_seconds / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+        "max_wait_ms": round(stats.max_wait_seconds * 1000, 3),
+        "wait_histogram": {
+            **{f"le_{limit}": count for limit, count in zip(CHECKOUT_BUCKETS, stats.buckets)},
+            "gt_max": stats.buckets[-1],
+        },
+    }
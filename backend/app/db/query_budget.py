@@ -0,0 +1,98 @@
+"""
+Orçamento de round trips SQL por endpoint.
+
+Cada rota declara quantos comandos SQL pode executar (dependencies=[Depends(QueryBudget(3))]).
+Com QUERY_BUDGET_MODE="raise" (testes/CI) uma requisição que passa do orçamento
+levanta QueryBudgetExceeded depois da resposta, o que faz o TestClient falhar o
+teste; com "warn" só loga. Fora das rotas, assert_max_queries faz o mesmo para
+um trecho de código (ex: um método de repositório).
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.query_budget")
+
+class QueryBudgetExceeded(AssertionError):
+    """Mais comandos SQL do que o orçamento declarado (ex: um N+1 voltou)."""
+    pass
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def check(self, max_queries: int, label: str) -> None:
+        if self.count > max_queries:
+            listing = "\n".join(f"  {i}. {' '.join(sql.split())[:200]}" for i, sql in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(f"{label}: {self.count} comandos SQL (orçamento: {max_queries})\n{listing}")
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_budget_counter", default=None)
+
+# Vale para todos os engines (primário e réplica); só conta dentro de um contador ativo
+@event.listens_for(Engine, "after_cursor_execute")
+def _count(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: str = "Trecho") -> Iterator[QueryCounter]:
+    """
+    with assert_max_queries(2):
+        await repository.get_all()
+    """
+    with count_queries() as counter:
+        yield counter
+    counter.check(max_queries, label)
+
+class QueryBudget:
+    """ Dependência que declara o orçamento da rota; quem mede é o QueryBudgetMiddleware. """
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+
+    def __call__(self, request: Request) -> None:
+        request.state.query_budget = self.max_queries
+
+class QueryBudgetMiddleware:
+    """ Conta os comandos SQL da requisição inteira (inclusive o commit do get_db) e confere o orçamento. """
+
+    def __init__(self, app: Any, mode: str = "raise"):
+        self.app = app
+        self.mode = mode # "warn" ou "raise"
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            await self.app(scope, receive, send)
+
+        budget = scope.get("state", {}).get("query_budget")
+        if budget is None:
+            return
+        try:
+            counter.check(budget, f"{scope['method']} {scope['path']}")
+        except QueryBudgetExceeded as e:
+            if self.mode == "raise":
+                raise
+            logger.warning(str(e))
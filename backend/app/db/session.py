@@ -1,38 +1,164 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from app.core.config import settings
-from typing import AsyncGenerator
-
-# Criar a Engine
-engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URI,
-    echo=False, # Mude para True se quiser ver os SQLs no terminal
-    future=True
-)
-
-# Criar a Session Factory
-# expire_on_commit=False é padrão em async para evitar erros de I/O desnecessários
-SessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    autoflush=False,
-    expire_on_commit=False
-)
+import asyncio
+import logging
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from fastapi import Request
+from app.core.config import Settings, get_settings
+from app.core.metrics import instrument_engine
+from app.db.pool import MonitoredPool
+from typing import AsyncGenerator, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+def create_engine(url: str, settings: Settings) -> AsyncEngine:
+    """ Engine async com o pool configurado em Settings (DB_POOL_*). """
+    return create_async_engine(
+        url,
+        echo=False, # Mude para True se quiser ver os SQLs no terminal
+        future=True,
+        poolclass=MonitoredPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+
+class Database:
+    """
+    Engines e fábricas de sessão do processo. Criado no primeiro uso (lifespan da
+    app, scripts), não na importação: importar a app não monta pools nem drivers.
+    """
+
+    def __init__(self, settings: Settings):
+        # Primário: todas as escritas
+        self.engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, settings)
+
+        # Engine das leituras: a réplica, se configurada; senão o próprio primário (mesmo pool).
+        # Transações READ ONLY: uma escrita por engano numa rota de leitura falha já no primário.
+        self.replica_engine = create_engine(settings.DB_REPLICA_URL, settings) if settings.DB_REPLICA_URL else None
+        self.read_engine = (self.replica_engine or self.engine).execution_options(postgresql_readonly=True)
+
+        # Contagem e duração dos SQLs por rota, gauges dos pools (GET /metrics)
+        if settings.METRICS_ENABLED:
+            instrument_engine(self.engine, "primary")
+            if self.replica_engine is not None:
+                instrument_engine(self.replica_engine, "replica")
+
+        # expire_on_commit=False é padrão em async para evitar erros de I/O desnecessários
+        self.sessions = async_sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+        self.read_sessions = async_sessionmaker(
+            bind=self.read_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        if self.replica_engine is not None:
+            await self.replica_engine.dispose()
+
+_database: Optional[Database] = None
+
+def get_database() -> Database:
+    """ Database do processo (o mesmo de app.state.db), criado no primeiro uso. """
+    global _database
+    if _database is None:
+        _database = Database(get_settings())
+    return _database
+
+async def close_database() -> None:
+    """ Fecha os pools (fim do lifespan); um uso seguinte cria engines novos. """
+    global _database
+    database, _database = _database, None
+    if database is not None:
+        await database.dispose()
+
+class _SessionFactory:
+    """
+    SessionLocal() / ReadSessionLocal() para workers, jobs e scripts: abre uma
+    sessão do Database atual, resolvido na chamada (nada é criado na importação).
+    """
+
+    def __init__(self, read_only: bool = False):
+        self.read_only = read_only
+
+    def __call__(self) -> AsyncSession:
+        database = get_database()
+        return database.read_sessions() if self.read_only else database.sessions()
+
+SessionLocal = _SessionFactory()
+ReadSessionLocal = _SessionFactory(read_only=True)
 
 # Dependência (Dependency Injection)
 # O FastAPI vai usar isso para injetar a sessão nas rotas
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
 
     """
     Generator que cria uma sessão para cada requisição e a fecha ao terminar.
     Garante que não vai existir conexões abertas (Resource Management).
+
+    Unit of work: repositórios e services só fazem flush; o único commit da
+    requisição é este, depois da rota. Um commit no meio do caminho falha.
     """
 
-    async with SessionLocal() as session:
+    async with request.app.state.db.sessions() as session:
+        session.sync_session.info["unit_of_work"] = True
         try:
             yield session
+            session.sync_session.info["unit_of_work"] = False
             await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessão das rotas somente leitura (listagem, estatísticas, export): vai para a
+    réplica quando DB_REPLICA_URL está definida. Nunca faz commit.
+    """
+    async with request.app.state.db.read_sessions() as session:
+        yield session
+
+# Callbacks executados só depois de um commit bem-sucedido (ex: publicar eventos,
+# invalidar cache). Em rollback eles são descartados.
+_after_commit_tasks: Set[asyncio.Task] = set()
+
+def run_after_commit(db: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    db.sync_session.info.setdefault("after_commit", []).append(callback)
+
+async def _run_safely(callback: Callable[[], Awaitable[None]]) -> None:
+    try:
+        await callback()
+    except Exception:
+        logger.exception("Erro em callback pós-commit")
+
+@event.listens_for(Session, "before_commit")
+def _guard_unit_of_work(session: Session) -> None:
+    if session.info.get("unit_of_work"):
+        raise RuntimeError("Commit dentro da requisição: o commit é feito uma única vez por get_db (unit of work)")
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    callbacks = session.info.pop("after_commit", [])
+    if not callbacks:
+        return
+    loop = asyncio.get_running_loop()
+    for callback in callbacks:
+        task = loop.create_task(_run_safely(callback))
+        _after_commit_tasks.add(task)
+        task.add_done_callback(_after_commit_tasks.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("after_commit", None)
@@ -1,35 +1,185 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, MetricsMiddleware
+from app.db.pool import pool_status
+from app.db.query_budget import QueryBudgetMiddleware
+from app.db.session import close_database, get_database
 from app.api import habits
-from app.api import ai
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_STR}/openapi.json"
-)
-
-# Configuração de CORS (Cross-Origin Resource Sharing)
-# Permite que o Frontend (em outra porta) converse com o Backend
-origins = [
-    "http://localhost",
-    "http://localhost:3000", # Porta comum do Vue/Vite
-    "http://localhost:8080",
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Incluir Rotas
-app.include_router(habits.router, prefix="/api/habits", tags=["habits"])
-app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
-
-# Rota de Health Check
-@app.get("/health")
+from app.core.broadcast import create_broadcaster
+from app.services.habit_cache import create_habit_cache
+from app.services.log_partitions import create_partition_manager
+from app.services.habit_purge import create_habit_purger
+from app.services.habit_summaries import create_habit_summary_repair
+from app.services.habit_transfer import create_habit_importer
+
+logger = logging.getLogger(__name__)
+
+# A pilha de IA (rotas, serviços e LangChain) só é importada com a IA ligada;
+# o LangChain em si só carrega no primeiro uso ou no aquecimento (AI_WARMUP)
+
+def start_ai(app: FastAPI) -> None:
+    from app.core.batching import MicroBatcher
+    from app.services.ai_service import AIService
+    from app.services.job_queue import create_job_queue
+    from app.services.llm_client import create_llm_client
+    from app.services.suggestion_cache import create_suggestion_cache
+
+    settings = app.state.settings
+    # Um único cliente de IA por processo (reuso de conexões e limite de concorrência)
+    app.state.llm_client = create_llm_client()
+    app.state.suggestion_cache = create_suggestion_cache()
+
+    # Micro-batching: sugestões concorrentes dentro da janela viram um único prompt
+    batch_runner = AIService(app.state.llm_client)
+    batcher = MicroBatcher(
+        batch_runner.request_habits_batch,
+        window=settings.AI_BATCH_WINDOW_MS / 1000,
+        max_size=settings.AI_BATCH_MAX_GOALS
+    )
+    app.state.ai_service = AIService(app.state.llm_client, app.state.suggestion_cache, batcher)
+
+    # Workers da fila assíncrona de IA (iniciados depois do resto, em lifespan)
+    app.state.job_queue = create_job_queue({"suggest": app.state.ai_service.run_suggest_job})
+
+async def warm_up_ai(app: FastAPI) -> None:
+    try:
+        await asyncio.to_thread(app.state.ai_service.warm_up)
+    except Exception:
+        logger.exception("Erro no aquecimento da IA")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = app.state.settings
+    # Engines, pools e sessionmakers nascem aqui (get_db/get_read_db usam app.state.db)
+    app.state.db = get_database()
+
+    ai_enabled = app.state.ai_enabled
+    if ai_enabled:
+        start_ai(app)
+
+    # Cache das leituras de hábitos (respostas serializadas, invalidado nas escritas)
+    app.state.habit_cache = create_habit_cache()
+    app.state.habit_importer = create_habit_importer(app.state.habit_cache)
+
+    # Manutenção das partições de habit_logs (próximos anos e retenção)
+    app.state.partition_manager = create_partition_manager(app.state.habit_cache)
+    await app.state.partition_manager.start()
+
+    # Purge em lotes dos hábitos arquivados (soft delete)
+    app.state.habit_purger = create_habit_purger(app.state.habit_cache)
+    await app.state.habit_purger.start()
+
+    # Verificação em lotes do resumo de conclusões (last_completed_date, sequência, total)
+    app.state.summary_repair = create_habit_summary_repair(app.state.habit_cache)
+    await app.state.summary_repair.start()
+
+    # Fan-out de eventos dos hábitos (WebSocket /api/habits/events)
+    app.state.broadcaster = create_broadcaster()
+    await app.state.broadcaster.start()
+
+    warmup: Optional[asyncio.Task] = None
+    if ai_enabled:
+        if settings.AI_JOBS_ENABLED:
+            await app.state.job_queue.start()
+        if settings.AI_WARMUP:
+            warmup = asyncio.create_task(warm_up_ai(app))
+    try:
+        yield
+    finally:
+        if ai_enabled:
+            await app.state.job_queue.stop()
+        await app.state.partition_manager.stop()
+        await app.state.habit_purger.stop()
+        await app.state.summary_repair.stop()
+        await app.state.broadcaster.stop()
+        await app.state.habit_cache.aclose()
+        if ai_enabled:
+            if warmup is not None:
+                await asyncio.gather(warmup, return_exceptions=True) # A importação em thread não é cancelável
+            await app.state.llm_client.aclose()
+        await close_database()
+
 def health_check():
-    return {"status": "ok", "version": "0.1.0"}
\ No newline at end of file
+    return {"status": "ok", "version": "0.1.0"}
+
+def database_pools(request: Request):
+    """ Ocupação e tempos de checkout dos pools (primário e réplica), para dimensioná-los. """
+    db = request.app.state.db
+    return {
+        "primary": pool_status(db.engine),
+        "replica": pool_status(db.replica_engine) if db.replica_engine is not None else None,
+    }
+
+def metrics():
+    """ Métricas no formato texto do Prometheus (scrape). """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def create_app(ai_enabled: Optional[bool] = None) -> FastAPI:
+    """
+    Monta a aplicação (os recursos de longa duração, inclusive os engines do banco,
+    nascem no lifespan). ai_enabled=False (ou AI_ENABLED=false) sobe só a API de
+    hábitos, sem importar a pilha de IA.
+    Uso com o uvicorn: uvicorn app.main:create_app --factory
+    """
+    settings = get_settings()
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_STR}/openapi.json",
+        lifespan=lifespan
+    )
+    app.state.settings = settings
+    app.state.ai_enabled = settings.AI_ENABLED if ai_enabled is None else ai_enabled
+
+    # Configuração de CORS (Cross-Origin Resource Sharing)
+    # Permite que o Frontend (em outra porta) converse com o Backend
+    origins = [
+        "http://localhost",
+        "http://localhost:3000", # Porta comum do Vue/Vite
+        "http://localhost:8080",
+    ]
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Change-Cursor"],
+    )
+
+    # Orçamento de SQL por rota: em testes ("raise"), estourar faz a requisição falhar
+    if settings.QUERY_BUDGET_MODE != "off":
+        app.add_middleware(QueryBudgetMiddleware, mode=settings.QUERY_BUDGET_MODE)
+
+    # Métricas por rota (por fora do CORS: mede a requisição inteira)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(
+            MetricsMiddleware,
+            slow_threshold=settings.SLOW_REQUEST_THRESHOLD_MS / 1000 if settings.SLOW_REQUEST_LOG_ENABLED else None,
+        )
+
+    # Incluir Rotas
+    app.include_router(habits.router, prefix="/api/habits", tags=["habits"])
+    if app.state.ai_enabled:
+        from app.api import ai
+        app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
+
+    # Rotas de Health Check
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route("/health/db", database_pools, methods=["GET"])
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    return app
+
+def __getattr__(name: str) -> Any:
+    # Instância padrão (uvicorn app.main:app), montada só quando pedida: com --factory
+    # (ou importando só create_app) a importação do módulo não monta nada
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class AISuggestionCache(Base):
+    """
+    Camada persistente do cache de sugestões da IA (sobrevive a reinícios).
+    A chave é a meta normalizada.
+    """
+    __tablename__ = "ai_suggestion_cache"
+
+    key = Column(String(500), primary_key=True)
+    goal = Column(Text, nullable=False)
+    habits = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ChatSession(Base):
+    """
+    Sessão de conversa com o coach. Guarda o resumo das mensagens antigas
+    e a contabilidade de tokens da sessão.
+    """
+    __tablename__ = "chat_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    summary = Column(Text, nullable=True)
+    # Mensagens com id <= summarized_until_id já estão incorporadas ao resumo
+    summarized_until_id = Column(Integer, nullable=False, default=0)
+
+    # Contabilidade de tokens
+    history_tokens = Column(Integer, nullable=False, default=0) # Soma de todas as mensagens
+    prompt_tokens = Column(Integer, nullable=False, default=0) # Enviados de fato ao LLM
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    naive_prompt_tokens = Column(Integer, nullable=False, default=0) # Se o histórico inteiro fosse reenviado
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ChatMessageLog(Base):
+    """
+    Mensagem persistida de uma sessão de chat.
+    """
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AIJob(Base):
+    """
+    Job assíncrono de IA (ex: gerar sugestões). A tabela funciona como fila
+    durável: os workers reivindicam jobs com FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        Index("ix_ai_jobs_queue", "status", "priority", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="queued") # queued, running, succeeded, failed
+    priority = Column(Integer, nullable=False, default=0) # Maior = executa antes
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False) # Backoff entre tentativas
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
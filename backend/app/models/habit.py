@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Date
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Text, DateTime, Boolean, ForeignKey, Date, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -19,17 +20,120 @@ class Habit(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    is_active = Column(Boolean, default=True)
-    logs = relationship("HabitLog", back_populates="habit", lazy="selectin", cascade="all, delete-orphan")
+    is_active = Column(Boolean, default=True) # False = arquivado (soft delete)
+
+    # Resumo das conclusões, atualizado em O(1) junto com cada toggle (HabitRepository.toggle_logs)
+    # e recalculável a partir dos logs (refresh_summaries). As listas não precisam dos logs.
+    last_completed_date = Column(Date, nullable=True)
+    current_streak = Column(Integer, nullable=False, server_default="0") # Sequência que termina em last_completed_date
+    total_completions = Column(Integer, nullable=False, server_default="0")
+    recent_days = Column(SmallInteger, nullable=False, server_default="0") # Bit i = dia (last_completed_date - i) concluído, i < 7
+
+    __table_args__ = (
+        # Hábitos arquivados (soft delete) por data, para o purge em lotes
+        Index("ix_habits_archived_updated_at", "updated_at", postgresql_where=is_active == False),
+    )
+
+    # Sem eager loading fixo: cada consulta escolhe se (e quais) logs carregar.
+    # passive_deletes: os logs são apagados pelo ON DELETE CASCADE do banco, sem carregá-los
+    logs = relationship("HabitLog", back_populates="habit", cascade="all, delete-orphan", passive_deletes=True)
 
 class HabitLog(Base):
     """
     Tabela que guarda os dias que o hábito foi concluído. 
+    Particionada por ano em 'completed_date' (partições habit_logs_pAAAA + DEFAULT),
+    então consultas com filtro de data só tocam as partições necessárias.
     """
     __tablename__ = "habit_logs"
+    __table_args__ = (
+        # Um registro por hábito por dia (base do toggle atômico com ON CONFLICT)
+        Index("ix_habit_logs_habit_id_completed_date", "habit_id", "completed_date", unique=True),
+        {"postgresql_partition_by": "RANGE (completed_date)"},
+    )
+
+    # A chave de partição precisa fazer parte da PK; o id continua vindo da sequência
+    id = Column(Integer, primary_key=True, index=True)
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
+    completed_date = Column(Date, primary_key=True, default=func.current_date())
+
+    habit = relationship("Habit", back_populates="logs")
+
+class HabitLogArchive(Base):
+    """
+    Arquivo compacto dos logs antigos (retenção): um registro por hábito por ano,
+    com os dias do ano (1-366) em que o hábito foi concluído.
+    """
+    __tablename__ = "habit_logs_archive"
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(SmallInteger, primary_key=True)
+    days = Column(ARRAY(SmallInteger), nullable=False)
+
+class HabitBitmap(Base):
+    """
+    Histórico compacto de conclusões: um bit por dia do ano (46 bytes por hábito por ano),
+    mantido junto com o toggle. HabitLog continua sendo a fonte da verdade; os bitmaps
+    podem ser reconstruídos a partir dele.
+    """
+    __tablename__ = "habit_bitmaps"
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(SmallInteger, primary_key=True)
+    bits = Column(LargeBinary, nullable=False)
+
+class TableVersion(Base):
+    """
+    Contador de versão por tabela, incrementado na mesma transação de cada escrita.
+    Base barata para ETag/Last-Modified das leituras (sem carregar os dados).
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class HabitChange(Base):
+    """
+    Change log de hábitos e logs, base do delta-sync (GET /api/habits/changes).
+    'revision' é a versão de 'table_versions' da transação que fez a mudança;
+    o incremento é o último comando antes do commit e trava a linha até ele,
+    então as revisões ficam visíveis em ordem.
+    """
+    __tablename__ = "habit_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    revision = Column(BigInteger, nullable=False, index=True)
+    entity = Column(String(10), nullable=False) # "habit" ou "log"
+    entity_id = Column(Integer, nullable=False)
+    habit_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False) # "upsert" ou "delete"
+
+class HabitImport(Base):
+    """
+    Importação de hábitos/logs (POST /api/habits/import). Cada lote é gravado na
+    mesma transação que avança 'records_done', então uma importação que falhou
+    pode ser retomada reenviando o arquivo: os registros já gravados são pulados.
+    """
+    __tablename__ = "habit_imports"
 
     id = Column(Integer, primary_key=True, index=True)
-    habit_id = Column(Integer, ForeignKey("habits.id"), nullable=False)
-    completed_date = Column(Date, nullable=False, default=func.current_date())
+    format = Column(String(10), nullable=False) # "ndjson" ou "csv"
+    status = Column(String(20), nullable=False, default="running") # running, failed, completed
+    records_done = Column(BigInteger, nullable=False, default=0)
+    habits_imported = Column(Integer, nullable=False, default=0)
+    logs_imported = Column(BigInteger, nullable=False, default=0)
+    skipped = Column(BigInteger, nullable=False, default=0) # Duplicados ou sem hábito de origem
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class HabitImportId(Base):
+    """
+    Id do hábito no arquivo importado -> id criado aqui, para ligar os logs
+    (e para retomar a importação sem duplicar hábitos).
+    """
+    __tablename__ = "habit_import_ids"
 
-    habit = relationship("Habit", back_populates="logs")
\ No newline at end of file
+    import_id = Column(Integer, ForeignKey("habit_imports.id", ondelete="CASCADE"), primary_key=True)
+    source_id = Column(Integer, primary_key=True)
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
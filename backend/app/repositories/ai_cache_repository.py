@@ -0,0 +1,32 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func
+from typing import List, Optional
+from datetime import datetime
+from app.models.ai import AISuggestionCache
+
+class AICacheRepository:
+
+    """
+    Acesso à camada persistente do cache de sugestões.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, key: str, newer_than: datetime) -> Optional[List[str]]:
+        query = select(AISuggestionCache.habits).where(
+            AISuggestionCache.key == key,
+            AISuggestionCache.created_at >= newer_than,
+        )
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def save(self, key: str, goal: str, habits: List[str]) -> None:
+        stmt = insert(AISuggestionCache).values(key=key, goal=goal, habits=habits)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AISuggestionCache.key],
+            set_={"goal": stmt.excluded.goal, "habits": stmt.excluded.habits, "created_at": func.now()},
+        )
+        await self.db.execute(stmt)
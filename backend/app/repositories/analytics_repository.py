@@ -0,0 +1,162 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, cast, distinct, literal, union_all, Date, Integer
+from typing import List, Optional, Sequence
+from datetime import date, timedelta
+from app.models.habit import Habit, HabitLog, HabitLogArchive
+
+class AnalyticsRepository:
+
+    """
+    Consultas agregadas sobre 'habit_logs' e 'habit_logs_archive' (os anos que
+    a retenção já compactou continuam contando nas estatísticas).
+    Todo o cálculo (streaks, taxas, buckets) é feito no Postgres, então o
+    volume de dados trafegado não cresce com o tamanho do histórico.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _habit_filter(self, column, habit_id: Optional[int]):
+        if habit_id is not None:
+            return column == habit_id
+        return column.in_(select(Habit.id).where(Habit.is_active == True))
+
+    def _completions(self, habit_filter, start: Optional[date] = None, end: Optional[date] = None):
+        """
+        Subquery (habit_id, completed_date) com os logs "quentes" e os arquivados
+        (um dia por elemento de 'days'). habit_filter recebe a coluna habit_id de cada tabela.
+        """
+        live = select(HabitLog.habit_id, HabitLog.completed_date).where(habit_filter(HabitLog.habit_id))
+
+        day = cast(func.make_date(HabitLogArchive.year, 1, 1) + func.unnest(HabitLogArchive.days) - 1, Date)
+        archived_rows = select(HabitLogArchive.habit_id, day.label("completed_date")).where(habit_filter(HabitLogArchive.habit_id))
+        if start is not None:
+            archived_rows = archived_rows.where(HabitLogArchive.year >= start.year)
+        if end is not None:
+            archived_rows = archived_rows.where(HabitLogArchive.year <= end.year)
+        archived_rows = archived_rows.subquery()
+        archived = select(archived_rows.c.habit_id, archived_rows.c.completed_date)
+
+        if start is not None:
+            live = live.where(HabitLog.completed_date >= start)
+            archived = archived.where(archived_rows.c.completed_date >= start)
+        if end is not None:
+            live = live.where(HabitLog.completed_date <= end)
+            archived = archived.where(archived_rows.c.completed_date <= end)
+        return union_all(live, archived).subquery("completions")
+
+    async def get_summaries(self, today: date, days: int, habit_id: Optional[int] = None) -> Sequence:
+        """
+        Retorna (habit_id, current_streak, longest_streak, completed_in_window) por hábito.
+
+        Streaks usam a técnica de "gaps and islands": dentro de cada hábito,
+        completed_date - row_number() é constante para dias consecutivos.
+        """
+        completions = self._completions(lambda column: self._habit_filter(column, habit_id))
+
+        days_q = (
+            select(completions.c.habit_id, completions.c.completed_date)
+            .distinct()
+            .subquery()
+        )
+        row_number = cast(
+            func.row_number().over(partition_by=days_q.c.habit_id, order_by=days_q.c.completed_date),
+            Integer,
+        )
+        grouped = select(
+            days_q.c.habit_id,
+            days_q.c.completed_date,
+            (days_q.c.completed_date - row_number).label("grp"),
+        ).subquery()
+        islands = (
+            select(
+                grouped.c.habit_id,
+                func.count().label("length"),
+                func.max(grouped.c.completed_date).label("last_day"),
+            )
+            .group_by(grouped.c.habit_id, grouped.c.grp)
+            .subquery()
+        )
+        # O streak atual continua valendo se a última sequência terminou hoje ou ontem
+        streaks = (
+            select(
+                islands.c.habit_id,
+                func.max(islands.c.length).label("longest"),
+                func.max(islands.c.length)
+                .filter(islands.c.last_day >= today - timedelta(days=1))
+                .label("current"),
+            )
+            .group_by(islands.c.habit_id)
+            .subquery()
+        )
+        window = (
+            select(days_q.c.habit_id, func.count().label("done"))
+            .where(days_q.c.completed_date.between(today - timedelta(days=days - 1), today))
+            .group_by(days_q.c.habit_id)
+            .subquery()
+        )
+
+        query = (
+            select(
+                Habit.id,
+                func.coalesce(streaks.c.current, 0),
+                func.coalesce(streaks.c.longest, 0),
+                func.coalesce(window.c.done, 0),
+            )
+            .outerjoin(streaks, streaks.c.habit_id == Habit.id)
+            .outerjoin(window, window.c.habit_id == Habit.id)
+            .order_by(Habit.id)
+        )
+        if habit_id is not None:
+            query = query.where(Habit.id == habit_id)
+        else:
+            query = query.where(Habit.is_active == True)
+
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def get_period_counts(
+        self, habit_ids: List[int], week_start: date, month_start: date
+    ) -> Sequence:
+        """
+        Retorna (habit_id, period, period_start, count) agrupando por semana e por mês
+        numa única ida ao banco.
+        """
+        completions = self._completions(lambda column: column.in_(habit_ids), start=min(week_start, month_start))
+        week = cast(func.date_trunc("week", completions.c.completed_date), Date)
+        month = cast(func.date_trunc("month", completions.c.completed_date), Date)
+
+        weekly = (
+            select(
+                completions.c.habit_id,
+                literal("week").label("period"),
+                week.label("period_start"),
+                func.count(distinct(completions.c.completed_date)).label("count"),
+            )
+            .where(completions.c.completed_date >= week_start)
+            .group_by(completions.c.habit_id, week)
+        )
+        monthly = (
+            select(
+                completions.c.habit_id,
+                literal("month").label("period"),
+                month.label("period_start"),
+                func.count(distinct(completions.c.completed_date)).label("count"),
+            )
+            .where(completions.c.completed_date >= month_start)
+            .group_by(completions.c.habit_id, month)
+        )
+
+        query = union_all(weekly, monthly).order_by("habit_id", "period", "period_start")
+        result = await self.db.execute(query)
+        return result.all()
+
+    async def habit_exists(self, habit_id: int) -> bool:
+        result = await self.db.execute(select(Habit.id).where(Habit.id == habit_id))
+        return result.scalar() is not None
+
+    async def get_completed_days(self, habit_id: int, start: date, end: date) -> List[date]:
+        """ Datas concluídas do hábito no intervalo (inclusive). """
+        completions = self._completions(lambda column: column == habit_id, start, end)
+        result = await self.db.execute(select(completions.c.completed_date))
+        return list(result.scalars().all())
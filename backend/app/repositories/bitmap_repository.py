@@ -0,0 +1,83 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text, func, cast, literal, Integer, LargeBinary
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import date
+
+from app.models.habit import HabitBitmap
+from app.services.completion_bitmaps import BITMAP_BYTES, day_index
+
+# Reconstrói os bitmaps a partir de habit_logs e habit_logs_archive (mesma conta da migração)
+REBUILD_SQL = """
+    WITH days AS (
+        SELECT habit_id, extract(year FROM completed_date)::int AS year,
+               extract(doy FROM completed_date)::int - 1 AS bit
+        FROM habit_logs
+        WHERE {scope}
+        UNION
+        SELECT habit_id, year, unnest(days) - 1 FROM habit_logs_archive
+        WHERE {scope}
+    ), bytes AS (
+        SELECT k.habit_id, k.year, i, coalesce(sum(DISTINCT 1 << (d.bit % 8)), 0) AS v
+        FROM (SELECT DISTINCT habit_id, year FROM days) k
+        CROSS JOIN generate_series(0, :last_byte) i
+        LEFT JOIN days d ON d.habit_id = k.habit_id AND d.year = k.year AND d.bit / 8 = i
+        GROUP BY k.habit_id, k.year, i
+    )
+    INSERT INTO habit_bitmaps (habit_id, year, bits)
+    SELECT habit_id, year, decode(string_agg(lpad(to_hex(v), 2, '0'), '' ORDER BY i), 'hex')
+    FROM bytes
+    GROUP BY habit_id, year
+"""
+
+def set_bits_statement(toggles: Any, day: date) -> Any:
+    """
+    Upsert que liga ou desliga o bit do dia para cada linha (habit_id, done) de
+    'toggles'. Hábitos sem bitmap no ano ganham um bitmap zerado com o bit aplicado.
+    Usado como CTE do próprio toggle (mesmo comando e mesmo commit dos logs).
+    """
+    bit = day_index(day)
+    rows = select(
+        toggles.c.habit_id,
+        literal(day.year),
+        func.set_bit(literal(bytes(BITMAP_BYTES), LargeBinary), bit, cast(toggles.c.done, Integer)),
+    )
+    stmt = insert(HabitBitmap).from_select(["habit_id", "year", "bits"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[HabitBitmap.habit_id, HabitBitmap.year],
+        set_={"bits": func.set_bit(HabitBitmap.bits, bit, func.get_bit(stmt.excluded.bits, bit))},
+    )
+
+class BitmapRepository:
+
+    """
+    Bitmaps de conclusão em 'habit_bitmaps' (um bytea de 46 bytes por hábito por ano).
+    As escritas usam set_bit no próprio banco, sem ler o bitmap para a aplicação.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_bitmaps(self, habit_id: int, years: Optional[Sequence[int]] = None) -> Dict[int, bytes]:
+        """ {ano: bitmap} do hábito (todos os anos, ou só os pedidos). """
+        query = select(HabitBitmap.year, HabitBitmap.bits).where(HabitBitmap.habit_id == habit_id)
+        if years is not None:
+            query = query.where(HabitBitmap.year.in_(list(years)))
+        result = await self.db.execute(query)
+        return {year: bytes(bits) for year, bits in result.all()}
+
+    async def rebuild(self, habit_ids: Optional[List[int]] = None) -> int:
+        """
+        Recalcula os bitmaps a partir dos logs (todos os hábitos, ou só 'habit_ids').
+        Retorna quantos bitmaps foram gravados.
+        """
+        params: Dict = {"last_byte": BITMAP_BYTES - 1}
+        if habit_ids is None:
+            scope = "true"
+            await self.db.execute(text("DELETE FROM habit_bitmaps"))
+        else:
+            scope = "habit_id = ANY(CAST(:habit_ids AS int[]))"
+            params["habit_ids"] = habit_ids
+            await self.db.execute(text(f"DELETE FROM habit_bitmaps WHERE {scope}"), params)
+        result = await self.db.execute(text(REBUILD_SQL.format(scope=scope)), params)
+        return result.rowcount
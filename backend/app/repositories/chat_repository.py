@@ -0,0 +1,88 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Optional
+from app.models.ai import ChatSession, ChatMessageLog
+
+class ChatRepository:
+
+    """
+    Acesso às sessões de chat e suas mensagens.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_session(self) -> ChatSession:
+        session = ChatSession(
+            summarized_until_id=0,
+            history_tokens=0,
+            prompt_tokens=0,
+            completion_tokens=0,
+            naive_prompt_tokens=0,
+            updated_at=None # Valor já conhecido: sem SELECT do onupdate depois do INSERT
+        )
+        self.db.add(session)
+        await self.db.flush() # created_at volta no RETURNING (eager_defaults)
+        return session
+
+    async def get_session(self, session_id: int) -> Optional[ChatSession]:
+        return await self.db.get(ChatSession, session_id)
+
+    async def start_turn(self, session_id: int, tokens: int, system_tokens: int) -> Optional[ChatSession]:
+        """
+        Contabiliza a nova mensagem do usuário com UPDATE atômico (x = x + :n) e devolve
+        a sessão já atualizada. O UPDATE trava a linha até o commit, então turnos
+        concorrentes da mesma sessão não perdem incrementos.
+        """
+        stmt = (
+            update(ChatSession)
+            .where(ChatSession.id == session_id)
+            .values(
+                history_tokens=ChatSession.history_tokens + tokens,
+                # Sem o resumo, o prompt reenviaria o histórico inteiro (com a nova mensagem)
+                naive_prompt_tokens=ChatSession.naive_prompt_tokens + system_tokens + ChatSession.history_tokens + tokens,
+            )
+            .returning(ChatSession)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+
+    async def add_usage(self, session_id: int, history_tokens: int, prompt_tokens: int, completion_tokens: int) -> Optional[ChatSession]:
+        """ Soma a resposta e o uso do LLM aos contadores (atômico) e devolve a sessão atualizada. """
+        stmt = (
+            update(ChatSession)
+            .where(ChatSession.id == session_id)
+            .values(
+                history_tokens=ChatSession.history_tokens + history_tokens,
+                prompt_tokens=ChatSession.prompt_tokens + prompt_tokens,
+                completion_tokens=ChatSession.completion_tokens + completion_tokens,
+            )
+            .returning(ChatSession)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+
+    async def advance_summary(self, session_id: int, summary: str, summarized_until_id: int) -> None:
+        # Só avança: se um turno concorrente já resumiu até mais longe, mantém o resumo dele
+        await self.db.execute(
+            update(ChatSession)
+            .where(ChatSession.id == session_id, ChatSession.summarized_until_id < summarized_until_id)
+            .values(summary=summary, summarized_until_id=summarized_until_id)
+        )
+
+    async def add_message(self, session_id: int, role: str, content: str, tokens: int) -> ChatMessageLog:
+        message = ChatMessageLog(session_id=session_id, role=role, content=content, tokens=tokens)
+        self.db.add(message)
+        await self.db.flush()
+        return message
+
+    async def get_messages_after(self, session_id: int, after_id: int) -> List[ChatMessageLog]:
+        # Apenas as mensagens ainda não resumidas (janela limitada, não o histórico inteiro)
+        query = (
+            select(ChatMessageLog)
+            .where(ChatMessageLog.session_id == session_id, ChatMessageLog.id > after_id)
+            .order_by(ChatMessageLog.id)
+        )
+        result = await self.db.execute(query)
+        return result.scalars().all()
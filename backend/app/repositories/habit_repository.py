@@ -1,8 +1,172 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional
-from app.models.habit import Habit
-from app.schemas.habit import HabitCreate, HabitUpdate
+from sqlalchemy import event, delete, update, func, literal, true, false, values, column, case, and_, or_, not_, union_all, text, Date, Integer, BigInteger, String
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (entity, entity_id, habit_id, op) — ex: ("log", 42, 7, "delete")
+Change = Tuple[str, int, int, str]
+from datetime import date, datetime, timezone
+from app.models.habit import Habit, HabitLog, HabitChange, TableVersion
+from app.repositories.bitmap_repository import set_bits_statement
+from app.schemas.habit import HabitCreate, HabitUpdate, SUMMARY_FIELDS, completion_summary
+
+# Colunas de HabitRead, na mesma ordem (exceto 'logs')
+HABIT_ROW_FIELDS = ("name", "description", "id", "created_at", "is_active", *SUMMARY_FIELDS)
+
+# Colunas guardadas de onde saem os campos de resumo (na ordem de completion_summary)
+SUMMARY_COLUMNS = (Habit.last_completed_date, Habit.current_streak, Habit.total_completions, Habit.recent_days)
+
+# Recalcula o resumo a partir de habit_logs e habit_logs_archive (mesma conta da migração).
+# Numa sequência de dias consecutivos, day - row_number() é constante ("ilha"); a do
+# último dia é last_day - total. Só grava os hábitos cujo resumo mudou.
+SUMMARY_SQL = """
+    WITH days AS (
+        SELECT habit_id, completed_date AS day FROM habit_logs
+        WHERE habit_id = ANY(CAST(:habit_ids AS int[]))
+        UNION
+        SELECT habit_id, make_date(year, 1, 1) + unnest(days) - 1 FROM habit_logs_archive
+        WHERE habit_id = ANY(CAST(:habit_ids AS int[]))
+    ), runs AS (
+        SELECT habit_id, day,
+               day - CAST(row_number() OVER (PARTITION BY habit_id ORDER BY day) AS int) AS island,
+               max(day) OVER (PARTITION BY habit_id) AS last_day,
+               CAST(count(*) OVER (PARTITION BY habit_id) AS int) AS total
+        FROM days
+    ), summaries AS (
+        SELECT habit_id, max(last_day) AS last_day, max(total) AS total,
+               count(*) FILTER (WHERE island = last_day - total) AS streak,
+               sum(1 << (last_day - day)) FILTER (WHERE last_day - day < 7) AS recent
+        FROM runs
+        GROUP BY habit_id
+    ), computed AS (
+        SELECT h.id, s.last_day, coalesce(s.streak, 0) AS streak,
+               coalesce(s.total, 0) AS total, coalesce(s.recent, 0) AS recent
+        FROM habits h
+        LEFT JOIN summaries s ON s.habit_id = h.id
+        WHERE h.id = ANY(CAST(:habit_ids AS int[]))
+    )
+    UPDATE habits
+    SET last_completed_date = c.last_day, current_streak = c.streak,
+        total_completions = c.total, recent_days = c.recent
+    FROM computed c
+    WHERE habits.id = c.id
+      AND (habits.last_completed_date, habits.current_streak, habits.total_completions, habits.recent_days)
+          IS DISTINCT FROM (c.last_day, c.streak, c.total, c.recent)
+    RETURNING habits.id, habits.last_completed_date, habits.current_streak, habits.total_completions, habits.recent_days
+"""
+
+def group_logs(rows: List[Dict[str, Any]], logs: Sequence[Tuple[int, int, date]]) -> None:
+    """ Distribui tuplas (habit_id, log_id, completed_date) na chave 'logs' de cada linha. """
+    by_habit: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        row["logs"] = by_habit[row["id"]] = []
+    for habit_id, log_id, completed_date in logs:
+        by_habit[habit_id].append({"id": log_id, "completed_date": completed_date})
+
+def _field_columns(fields: Sequence[str]) -> list:
+    """ Colunas para os campos pedidos; os de resumo viram as colunas guardadas (prefixo '_'). """
+    columns = [getattr(Habit, f) for f in fields if f != "logs" and f not in SUMMARY_FIELDS]
+    if any(f in SUMMARY_FIELDS for f in fields):
+        columns += [c.label(f"_{c.key}") for c in SUMMARY_COLUMNS]
+    return columns
+
+def _field_row(mapping: Any, fields: Sequence[str], today: date) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {}
+    if any(f in SUMMARY_FIELDS for f in fields):
+        summary = completion_summary(*(mapping[f"_{c.key}"] for c in SUMMARY_COLUMNS), today)
+    return {f: summary[f] if f in SUMMARY_FIELDS else mapping[f] for f in fields if f != "logs"}
+
+def _summary_after_toggle(done: Any, day: date) -> Dict[str, Any]:
+    """
+    Novo resumo do hábito depois de marcar (done) ou desmarcar o dia, só com os
+    valores atuais da linha (O(1), sem ler os logs). Os casos que dependem do
+    histórico — ligar duas sequências ou desmarcar o último dia concluído (o dia
+    anterior pode estar fora dos 7 bits) — zeram a sequência ou encostam nela e
+    são recalculados logo depois por refresh_summaries (ver _needs_refresh).
+    """
+    last, streak, total, recent = SUMMARY_COLUMNS
+    d = literal(day, Date)
+    offset = last - d # Dias entre o dia do toggle e o último dia concluído
+    bit = literal(1).bitwise_lshift(offset)
+    newest = or_(last.is_(None), d > last)
+    # Marcado de novo por um toggle concorrente (ON CONFLICT): já está no resumo
+    repeated = and_(done, or_(d == last, and_(d < last, offset < 7, recent.bitwise_and(bit) != 0)))
+    return {
+        "last_completed_date": case((and_(done, newest), d), else_=last),
+        "current_streak": case(
+            (repeated, streak),
+            (and_(done, d == last + 1), streak + 1),
+            (and_(done, newest), 1),
+            (and_(not_(done), d == last), 0),
+            (and_(not_(done), d < last, d > last - streak), offset), # Quebrou a sequência atual
+            else_=streak,
+        ),
+        "total_completions": case(
+            (repeated, total),
+            (done, total + 1),
+            else_=func.greatest(total - 1, 0),
+        ),
+        "recent_days": case(
+            (repeated, recent),
+            (and_(done, last.is_(None)), 1),
+            (and_(done, d > last, d - last < 7), recent.bitwise_lshift(d - last).bitwise_or(1).bitwise_and(127)),
+            (and_(done, d > last), 1),
+            (and_(done, offset < 7), recent.bitwise_or(bit)),
+            (and_(not_(done), offset < 7), recent.bitwise_and(bit.bitwise_not())),
+            else_=recent,
+        ),
+        "updated_at": Habit.updated_at, # Não é uma edição do hábito (o purge usa updated_at)
+    }
+
+def _needs_refresh(done: Any, day: date) -> Any:
+    # Sobre os valores novos (RETURNING): o dia marcado encostou no início da sequência
+    # (pode ligar com uma anterior) ou o último dia foi desmarcado (sequência zerada)
+    return or_(
+        and_(done, Habit.last_completed_date - Habit.current_streak == literal(day, Date)),
+        and_(not_(done), Habit.current_streak <= 0),
+    )
+
+def _bump_version_statement(changes: Sequence[Change]) -> Any:
+    """
+    Incrementa a versão e grava as mudanças no change log com essa revisão (um único
+    comando). Todas as escritas da transação saem numa revisão só.
+    """
+    bump = insert(TableVersion).values(name="habits", version=1)
+    bump = bump.on_conflict_do_update(
+        index_elements=[TableVersion.name],
+        set_={"version": TableVersion.version + 1, "updated_at": func.now()},
+    ).returning(TableVersion.version)
+    if not changes:
+        return bump
+
+    version = bump.cte("version")
+    rows = values(
+        column("entity", String), column("entity_id", Integer),
+        column("habit_id", Integer), column("op", String),
+        name="changes",
+    ).data(list(changes))
+    return insert(HabitChange).from_select(
+        ["revision", "entity", "entity_id", "habit_id", "op"],
+        select(version.c.version, rows.c.entity, rows.c.entity_id, rows.c.habit_id, rows.c.op)
+        .select_from(version)
+        .join(rows, true()), # Uma única linha de versão para todas as mudanças
+    )
+
+# A versão é um contador único (linha quente): incrementá-la no meio da transação
+# serializaria as escritas inteiras. Aqui ela é o último comando antes do COMMIT,
+# então a linha fica travada só por esse comando e o commit, e as revisões
+# continuam visíveis em ordem para o delta-sync.
+@event.listens_for(Session, "before_commit")
+def _write_changes(session: Session) -> None:
+    changes = session.info.pop("habit_changes", None)
+    if changes is not None:
+        session.execute(_bump_version_statement(changes))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop("habit_changes", None)
 
 class HabitRepository:
     
@@ -14,27 +178,362 @@ class HabitRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def get_version(self) -> Tuple[int, datetime]:
+        """
+        Versão atual dos dados de hábitos (uma linha, lida pela chave primária).
+        """
+        result = await self.db.execute(
+            select(TableVersion.version, TableVersion.updated_at).where(TableVersion.name == "habits")
+        )
+        row = result.first()
+        if row is None:
+            return 0, datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return row.version, row.updated_at
+
+    async def _bump_version(self, changes: Sequence[Change] = ()) -> None:
+        """
+        Chamado por toda escrita: acumula as mudanças na sessão. A versão só é
+        incrementada (com o change log) no último comando antes do COMMIT, ver
+        _write_changes: a linha da versão fica travada só até o commit, não durante a escrita.
+        """
+        self.db.sync_session.info.setdefault("habit_changes", []).extend(changes)
+
+    async def record_changes(self, changes: Sequence[Change]) -> None:
+        """ Versão + change log para escritas feitas fora deste repositório (ex: importação). """
+        await self._bump_version(changes)
+
+    async def get_changes(self, since: int, limit: int = 100) -> Tuple[List[HabitChange], int, bool]:
+        """
+        Mudanças com revisão > since, das 'limit' revisões seguintes (uma revisão
+        nunca é dividida entre páginas). Retorna (mudanças, novo cursor, has_more).
+        Usa o índice em 'revision': o custo depende do volume de mudanças, não do histórico.
+        """
+        revisions_query = (
+            select(HabitChange.revision)
+            .where(HabitChange.revision > since)
+            .group_by(HabitChange.revision)
+            .order_by(HabitChange.revision)
+            .limit(limit + 1)
+        )
+        revisions = list((await self.db.execute(revisions_query)).scalars().all())
+        if not revisions:
+            return [], since, False
+
+        has_more = len(revisions) > limit
+        cursor = revisions[min(limit, len(revisions)) - 1]
+        query = (
+            select(HabitChange)
+            .where(HabitChange.revision > since, HabitChange.revision <= cursor)
+            .order_by(HabitChange.id)
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all()), cursor, has_more
+
+    async def get_habit_rows(self, habit_ids: Sequence[int]) -> List[Habit]:
+        """ Hábitos (sem logs) pelos ids, para o delta-sync. """
+        result = await self.db.execute(select(Habit).where(Habit.id.in_(habit_ids)).order_by(Habit.id))
+        return list(result.scalars().all())
+
+    async def get_log_rows(self, log_ids: Sequence[int]) -> List[HabitLog]:
+        result = await self.db.execute(select(HabitLog).where(HabitLog.id.in_(log_ids)).order_by(HabitLog.id))
+        return list(result.scalars().all())
+
     async def create(self, habit_in: HabitCreate) -> Habit:
         db_habit = Habit(
             name=habit_in.name,
-            description=habit_in.description
+            description=habit_in.description,
+            updated_at=None, # Valor já conhecido: sem SELECT do onupdate depois do INSERT
+            last_completed_date=None, # Resumo de um hábito sem conclusões (o resto vem no RETURNING)
+            logs=[] # Hábito novo não tem histórico: evita lazy load na serialização
         )
         self.db.add(db_habit)
-        # O commit é feito no Service ou na injeção de dependência para garantir atomicidade
-        await self.db.flush() # Gera o ID sem fechar a transação
-        await self.db.refresh(db_habit)
+        # O commit é feito uma única vez por requisição, em get_db (unit of work).
+        # O flush gera o ID; created_at e afins voltam no RETURNING (eager_defaults)
+        await self.db.flush()
+        await self._bump_version([("habit", db_habit.id, db_habit.id, "upsert")])
         return db_habit
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Habit]:
-        query = select(Habit).where(Habit.is_active == True).offset(skip).limit(limit)
+    def _logs_criteria(self, logs_since: Optional[date], logs_until: Optional[date]) -> list:
+        criteria = []
+        if logs_since is not None:
+            criteria.append(HabitLog.completed_date >= logs_since)
+        if logs_until is not None:
+            criteria.append(HabitLog.completed_date <= logs_until)
+        return criteria
+
+    def _logs_option(self, logs_since: Optional[date] = None, logs_until: Optional[date] = None):
+        # Carrega os logs em uma segunda query (IN), restrita à janela de datas pedida
+        criteria = self._logs_criteria(logs_since, logs_until)
+        return selectinload(Habit.logs.and_(*criteria) if criteria else Habit.logs)
+
+    def _page(self, query, after_id: Optional[int], skip: int, limit: int):
+        # Keyset pagination: "id > cursor" usa o índice e não degrada com páginas profundas.
+        # skip/offset é mantido apenas para compatibilidade.
+        query = query.where(Habit.is_active == True).order_by(Habit.id)
+        if after_id is not None:
+            query = query.where(Habit.id > after_id)
+        elif skip:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> List[Habit]:
+        query = self._page(select(Habit), after_id, skip, limit)
+        query = query.options(self._logs_option(logs_since, logs_until))
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_by_id(self, habit_id: int) -> Optional[Habit]:
+    async def get_all_fields(
+        self,
+        fields: Sequence[str],
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sparse fieldset: seleciona apenas as colunas pedidas (sem ORM).
+        Os logs só são consultados se 'logs' estiver entre os campos.
+        """
+        # As chaves seguem a ordem pedida; 'id' sempre vem (usado no cursor)
+        if "id" not in fields:
+            fields = ["id", *fields]
+        query = self._page(select(*_field_columns(fields)), after_id, skip, limit)
+        result = await self.db.execute(query)
+        today = date.today()
+        rows = [_field_row(row._mapping, fields, today) for row in result.all()]
+
+        if "logs" in fields and rows:
+            await self._attach_logs(rows, logs_since, logs_until)
+        return rows
+
+    async def get_row(
+        self,
+        habit_id: int,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """ Um hábito com os logs, como dict (Core, sem ORM). Mesmo formato de HabitRead. """
+        query = select(*_field_columns(HABIT_ROW_FIELDS)).where(Habit.id == habit_id)
+        row = (await self.db.execute(query)).first()
+        if row is None:
+            return None
+        rows = [_field_row(row._mapping, HABIT_ROW_FIELDS, date.today())]
+        await self._attach_logs(rows, logs_since, logs_until)
+        return rows[0]
+
+    async def _attach_logs(self, rows: List[Dict[str, Any]], logs_since: Optional[date], logs_until: Optional[date]) -> None:
+        logs_query = select(HabitLog.habit_id, HabitLog.id, HabitLog.completed_date).where(
+            HabitLog.habit_id.in_([row["id"] for row in rows]),
+            *self._logs_criteria(logs_since, logs_until),
+        )
+        logs_result = await self.db.execute(logs_query)
+        group_logs(rows, logs_result.all())
+
+    async def get_by_id(
+        self,
+        habit_id: int,
+        include_logs: bool = True,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> Optional[Habit]:
         query = select(Habit).where(Habit.id == habit_id)
+        if include_logs:
+            query = query.options(self._logs_option(logs_since, logs_until))
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
     
-    async def delete(self, habit: Habit) -> None:
-        await self.db.delete(habit)
-        await self.db.commit()
\ No newline at end of file
+    async def create_many(self, habits_in: List[HabitCreate]) -> List[Habit]:
+        """
+        Cria vários hábitos com um único INSERT multi-linha ... RETURNING.
+        """
+        stmt = (
+            insert(Habit)
+            .values([{"name": h.name, "description": h.description, "is_active": True} for h in habits_in])
+            .returning(Habit.id, Habit.name, Habit.description, Habit.created_at, Habit.is_active, *SUMMARY_COLUMNS)
+        )
+        result = await self.db.execute(stmt)
+        habits = [Habit(**row._mapping, logs=[]) for row in result.all()]
+        await self._bump_version([("habit", h.id, h.id, "upsert") for h in habits])
+        return habits
+
+    async def toggle_log(self, habit_id: int, day: date, bitmaps: bool = False) -> Optional[Tuple[Optional[int], tuple]]:
+        """
+        Marca/desmarca um hábito no dia. Retorna (log_id, resumo) como em toggle_logs,
+        ou None se o hábito não existir.
+        """
+        toggled = await self.toggle_logs([habit_id], day, bitmaps)
+        return toggled.get(habit_id)
+
+    async def toggle_logs(self, habit_ids: List[int], day: date, bitmaps: bool = False) -> Dict[int, Tuple[Optional[int], tuple]]:
+        """
+        Marca/desmarca vários hábitos no dia em um único comando (uma ida ao banco):
+
+            WITH deleted AS (DELETE ... RETURNING habit_id),
+                 inserted AS (INSERT ... SELECT habits não desmarcados ON CONFLICT ... RETURNING),
+                 summary AS (UPDATE habits SET <resumo> FROM deleted/inserted RETURNING ...),
+                 bitmap AS (INSERT INTO habit_bitmaps ... ON CONFLICT DO UPDATE SET bits = set_bit(...))
+            SELECT habits.id, inserted.id FROM habits LEFT JOIN inserted ...
+
+        O resumo (último dia, sequência, total, últimos 7 dias) e, com 'bitmaps', o bit
+        do dia em habit_bitmaps são atualizados no mesmo comando; só os casos que
+        dependem do histórico custam um refresh_summaries.
+        Retorna {habit_id: (log_id, resumo)}: log_id None = desmarcado; resumo são os novos
+        valores de SUMMARY_COLUMNS (para completion_summary). Ids inexistentes ficam de fora.
+        Cada hábito alterado entra no change log (o delta-sync leva o resumo novo).
+        """
+        deleted = (
+            delete(HabitLog)
+            .where(HabitLog.habit_id.in_(habit_ids), HabitLog.completed_date == day)
+            .returning(HabitLog.id, HabitLog.habit_id)
+            .cte("deleted")
+        )
+        new_logs = select(Habit.id, literal(day, Date)).where(
+            Habit.id.in_(habit_ids),
+            Habit.id.not_in(select(deleted.c.habit_id)),
+        )
+        insert_stmt = insert(HabitLog).from_select(["habit_id", "completed_date"], new_logs)
+        # Se um toggle concorrente já inseriu o dia, o estado final é "feito": devolvemos a linha existente
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[HabitLog.habit_id, HabitLog.completed_date],
+            set_={"completed_date": insert_stmt.excluded.completed_date},
+        ).returning(HabitLog.id, HabitLog.habit_id)
+        inserted = insert_stmt.cte("inserted")
+
+        toggles = union_all(
+            select(inserted.c.habit_id, true().label("done")),
+            select(deleted.c.habit_id, false()),
+        ).cte("toggles")
+        summary = (
+            update(Habit)
+            .where(Habit.id == toggles.c.habit_id)
+            .values(_summary_after_toggle(toggles.c.done, day))
+            .returning(Habit.id, *SUMMARY_COLUMNS, _needs_refresh(toggles.c.done, day).label("stale"))
+            .cte("summary")
+        )
+
+        query = (
+            select(Habit.id, inserted.c.id, deleted.c.id, summary.c.stale, *(summary.c[c.key] for c in SUMMARY_COLUMNS))
+            .outerjoin(inserted, inserted.c.habit_id == Habit.id)
+            .outerjoin(deleted, deleted.c.habit_id == Habit.id)
+            .outerjoin(summary, summary.c.id == Habit.id)
+            .where(Habit.id.in_(habit_ids))
+        )
+        if bitmaps:
+            # Bit do dia no bitmap do ano, no mesmo comando (sem ida extra ao banco)
+            query = query.add_cte(set_bits_statement(toggles, day).cte("bitmap"))
+        result = await self.db.execute(query)
+
+        toggled: Dict[int, Tuple[Optional[int], tuple]] = {}
+        changes: List[Change] = []
+        stale: List[int] = []
+        for habit_id, log_id, deleted_id, needs_refresh, *summary in result.all():
+            toggled[habit_id] = (log_id, tuple(summary))
+            if needs_refresh:
+                stale.append(habit_id)
+            if log_id is not None:
+                changes.append(("log", log_id, habit_id, "upsert"))
+            if deleted_id is not None:
+                changes.append(("log", deleted_id, habit_id, "delete"))
+            changes.append(("habit", habit_id, habit_id, "upsert")) # Resumo novo
+        if stale:
+            # Linhas já travadas pelo UPDATE acima; só as que mudaram voltam do recálculo
+            refreshed = await self._refresh(stale)
+            for habit_id, summary in refreshed.items():
+                toggled[habit_id] = (toggled[habit_id][0], summary)
+        if changes:
+            await self._bump_version(changes)
+        return toggled
+
+    async def refresh_summaries(self, habit_ids: Sequence[int], locked: bool = False) -> List[int]:
+        """
+        Recalcula o resumo de conclusões a partir dos logs. Retorna os ids cujo resumo
+        estava diferente. Sem 'locked', trava antes as linhas dos hábitos: o cálculo
+        enxerga os toggles já commitados e os próximos esperam por ele.
+        """
+        if not habit_ids:
+            return []
+        if not locked:
+            await self.db.execute(
+                select(Habit.id).where(Habit.id.in_(habit_ids)).order_by(Habit.id).with_for_update()
+            )
+        return sorted(await self._refresh(habit_ids))
+
+    async def _refresh(self, habit_ids: Sequence[int]) -> Dict[int, tuple]:
+        """ Executa SUMMARY_SQL; retorna {habit_id: novo resumo} só dos que mudaram. """
+        result = await self.db.execute(text(SUMMARY_SQL), {"habit_ids": list(habit_ids)})
+        return {habit_id: tuple(summary) for habit_id, *summary in result.all()}
+
+    async def lock_ids_after(self, after_id: int, limit: int) -> List[int]:
+        """ Próximos 'limit' ids depois de 'after_id', travados até o commit (lotes da verificação do resumo). """
+        result = await self.db.execute(
+            select(Habit.id).where(Habit.id > after_id).order_by(Habit.id).limit(limit).with_for_update()
+        )
+        return list(result.scalars().all())
+
+    async def delete_many(self, habit_ids: List[int]) -> List[int]:
+        """
+        Apaga vários hábitos em um único comando; logs, arquivo e bitmaps saem pelo
+        ON DELETE CASCADE do banco, sem carregar nada. Retorna os ids apagados.
+        """
+        return await self._delete_where(Habit.id.in_(habit_ids))
+
+    async def _delete_where(self, criteria) -> List[int]:
+        stmt = delete(Habit).where(criteria).returning(Habit.id)
+        result = await self.db.execute(stmt)
+        deleted = list(result.scalars().all())
+        if deleted:
+            # Tombstone só do hábito: o cliente descarta os logs junto
+            await self._bump_version([("habit", i, i, "delete") for i in deleted])
+        return deleted
+
+    async def delete(self, habit_id: int) -> bool:
+        return bool(await self.delete_many([habit_id]))
+
+    async def set_active_many(self, habit_ids: List[int], active: bool) -> List[int]:
+        """
+        Arquiva (active=False, soft delete) ou restaura hábitos. Só altera os que
+        estão no estado oposto; retorna os ids alterados.
+        """
+        stmt = (
+            update(Habit)
+            .where(Habit.id.in_(habit_ids), Habit.is_active == (not active))
+            .values(is_active=active)
+            .returning(Habit.id)
+        )
+        result = await self.db.execute(stmt)
+        changed = list(result.scalars().all())
+        if not changed:
+            return changed
+        if active:
+            # Restaurado: o cliente já descartou os logs no tombstone, então eles voltam ao feed
+            logs = await self.db.execute(
+                select(HabitLog.id, HabitLog.habit_id).where(HabitLog.habit_id.in_(changed))
+            )
+            changes: List[Change] = [("habit", i, i, "upsert") for i in changed]
+            changes += [("log", log_id, habit_id, "upsert") for log_id, habit_id in logs.all()]
+        else:
+            changes = [("habit", i, i, "delete") for i in changed] # Arquivado sai do feed como um delete
+        await self._bump_version(changes)
+        return changed
+
+    async def purge_archived(self, archived_before: datetime, limit: int) -> List[int]:
+        """
+        Apaga definitivamente até 'limit' hábitos arquivados antes de 'archived_before'.
+        SKIP LOCKED deixa vários workers purgarem em paralelo sem disputar as mesmas linhas.
+        """
+        batch = (
+            select(Habit.id)
+            .where(Habit.is_active == False, Habit.updated_at < archived_before)
+            .order_by(Habit.updated_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return await self._delete_where(Habit.id.in_(batch))
@@ -0,0 +1,109 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update, func, case, literal
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+from app.models.ai import AIJob
+
+class JobRepository:
+
+    """
+    Acesso à fila durável de jobs de IA ('ai_jobs').
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], priority: int, max_attempts: int) -> AIJob:
+        job = AIJob(
+            kind=kind,
+            payload=payload,
+            status="queued",
+            priority=priority,
+            attempts=0,
+            max_attempts=max_attempts
+        )
+        self.db.add(job)
+        await self.db.flush()
+        return job
+
+    async def get(self, job_id: int) -> Optional[AIJob]:
+        return await self.db.get(AIJob, job_id)
+
+    async def count_queued(self) -> int:
+        result = await self.db.execute(select(func.count()).where(AIJob.status == "queued"))
+        return result.scalar_one()
+
+    async def counts_by_status(self) -> Dict[str, int]:
+        result = await self.db.execute(select(AIJob.status, func.count()).group_by(AIJob.status))
+        return dict(result.all())
+
+    async def claim_next(self) -> Optional[AIJob]:
+        """
+        Reivindica o próximo job pronto em um único UPDATE ... RETURNING.
+        SKIP LOCKED permite vários workers (e processos) sem disputa pela mesma linha.
+        """
+        next_id = (
+            select(AIJob.id)
+            .where(AIJob.status == "queued", AIJob.run_after <= func.now())
+            .order_by(AIJob.priority.desc(), AIJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(AIJob)
+            .where(AIJob.id == next_id)
+            .values(status="running", attempts=AIJob.attempts + 1, started_at=func.now())
+            .returning(AIJob)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+
+    async def mark_succeeded(self, job_id: int, result: Dict[str, Any]) -> None:
+        await self.db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id)
+            .values(status="succeeded", result=result, error=None, finished_at=func.now())
+        )
+
+    async def mark_failed(self, job_id: int, error: str, retry_at: Optional[datetime]) -> None:
+        # Com retry_at o job volta para a fila (backoff); sem, a falha é definitiva
+        values: Dict[str, Any] = {"error": error}
+        if retry_at is not None:
+            values.update(status="queued", run_after=retry_at)
+        else:
+            values.update(status="failed", finished_at=func.now())
+        await self.db.execute(update(AIJob).where(AIJob.id == job_id).values(**values))
+
+    async def release(self, job_id: int) -> None:
+        # Devolve um job interrompido (shutdown) sem contar a tentativa
+        await self.db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id, AIJob.status == "running")
+            .values(status="queued", attempts=AIJob.attempts - 1, started_at=None)
+        )
+
+    async def requeue_stale(self, started_before: datetime, retry_base: float) -> Tuple[int, int]:
+        """
+        Jobs "running" de um worker que morreu ou travou: voltam para a fila com o
+        mesmo backoff de uma falha, ou falham de vez se já esgotaram as tentativas
+        (um job que derruba o worker não fica em loop). Retorna (devolvidos, falhados).
+        """
+        exhausted = AIJob.attempts >= AIJob.max_attempts
+        backoff = func.make_interval(0, 0, 0, 0, 0, 0, literal(retry_base) * func.power(2, AIJob.attempts - 1))
+        result = await self.db.execute(
+            update(AIJob)
+            .where(AIJob.status == "running", AIJob.started_at < started_before)
+            .values(
+                status=case((exhausted, "failed"), else_="queued"),
+                error="Worker interrompido (timeout ou processo encerrado)",
+                run_after=case((exhausted, AIJob.run_after), else_=func.now() + backoff),
+                finished_at=case((exhausted, func.now()), else_=None),
+                started_at=None,
+            )
+            .returning(AIJob.status)
+        )
+        statuses = result.scalars().all()
+        failed = statuses.count("failed")
+        return len(statuses) - failed, failed
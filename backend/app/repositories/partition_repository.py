@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict, List, Tuple
+
+# Chave fixa do advisory lock: só um processo faz a manutenção por vez
+MAINTENANCE_LOCK_KEY = 72_410_016
+
+class PartitionRepository:
+
+    """
+    DDL das partições anuais de 'habit_logs' (habit_logs_pAAAA) e da retenção
+    para 'habit_logs_archive'. Cada método roda na transação da sessão.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def try_lock(self) -> bool:
+        result = await self.db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+        return bool(result.scalar())
+
+    async def list_partitions(self) -> Dict[int, str]:
+        """ {ano: nome} das partições anuais existentes. """
+        result = await self.db.execute(text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = 'habit_logs' AND child.relname ~ '^habit_logs_p[0-9]{4}$'
+            """
+        ))
+        return {int(name[-4:]): name for name in result.scalars()}
+
+    async def default_years(self) -> List[int]:
+        """ Anos com linhas caídas na partição DEFAULT (sem partição própria). """
+        result = await self.db.execute(text(
+            "SELECT DISTINCT extract(year FROM completed_date)::int FROM habit_logs_default ORDER BY 1"
+        ))
+        return list(result.scalars())
+
+    async def create_partition(self, year: int) -> None:
+        """
+        Cria a partição do ano movendo antes as linhas desse ano que estejam na DEFAULT
+        (o ATTACH falharia se a DEFAULT ainda tivesse linhas da faixa).
+        """
+        name = f"habit_logs_p{year:04d}"
+        start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+        await self.db.execute(text(f"CREATE TABLE {name} (LIKE habit_logs INCLUDING DEFAULTS)"))
+        await self.db.execute(text(
+            f"""
+            WITH moved AS (
+                DELETE FROM habit_logs_default
+                WHERE completed_date >= '{start}' AND completed_date < '{end}'
+                RETURNING id, habit_id, completed_date
+            )
+            INSERT INTO {name} (id, habit_id, completed_date) SELECT * FROM moved
+            """
+        ))
+        # Com o CHECK equivalente à faixa, o ATTACH não precisa varrer a tabela
+        await self.db.execute(text(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_range "
+            f"CHECK (completed_date >= '{start}' AND completed_date < '{end}')"
+        ))
+        await self.db.execute(text(f"ALTER TABLE habit_logs ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+        await self.db.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+
+    async def archive_partition(self, year: int, name: str) -> Tuple[int, List[int]]:
+        """
+        Compacta o ano em 'habit_logs_archive' (um registro por hábito, com os dias do ano)
+        e remove a partição (DETACH + DROP). Retorna (logs arquivados, hábitos afetados).
+        """
+        archived, habit_ids = await self._archive_rows(f"SELECT habit_id, completed_date FROM {name}", year)
+        await self.db.execute(text(f"ALTER TABLE habit_logs DETACH PARTITION {name}"))
+        await self.db.execute(text(f"DROP TABLE {name}"))
+        return archived, habit_ids
+
+    async def archive_default_before(self, year: int) -> Tuple[int, List[int]]:
+        """ Arquiva (e apaga) linhas da DEFAULT anteriores ao ano informado. """
+        archived, habit_ids = 0, set()
+        for old_year in [y for y in await self.default_years() if y < year]:
+            count, affected = await self._archive_rows(
+                f"""
+                DELETE FROM habit_logs_default
+                WHERE completed_date >= '{old_year:04d}-01-01' AND completed_date < '{old_year + 1:04d}-01-01'
+                RETURNING habit_id, completed_date
+                """,
+                old_year,
+            )
+            archived += count
+            habit_ids.update(affected)
+        return archived, sorted(habit_ids)
+
+    async def _archive_rows(self, source: str, year: int) -> Tuple[int, List[int]]:
+        # Mescla com o que já estiver arquivado para o mesmo hábito/ano
+        result = await self.db.execute(text(
+            f"""
+            WITH src AS ({source}),
+            grouped AS (
+                SELECT habit_id, array_agg(DISTINCT extract(doy FROM completed_date)::smallint) AS days, count(*) AS n
+                FROM src GROUP BY habit_id
+            ),
+            archived AS (
+                INSERT INTO habit_logs_archive (habit_id, year, days)
+                SELECT habit_id, :year, days FROM grouped
+                ON CONFLICT (habit_id, year) DO UPDATE SET days = ARRAY(
+                    SELECT DISTINCT unnest(habit_logs_archive.days || excluded.days) ORDER BY 1
+                )
+            )
+            SELECT coalesce(sum(n), 0), coalesce(array_agg(habit_id ORDER BY habit_id), '{{}}') FROM grouped
+            """
+        ), {"year": year})
+        archived, habit_ids = result.one()
+        return int(archived), list(habit_ids)
@@ -0,0 +1,139 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, func, bindparam, or_, union_all, Date, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta, timezone
+from app.models.habit import Habit, HabitLog, HabitLogArchive, HabitImport, HabitImportId
+
+class TransferRepository:
+
+    """
+    Exportação e importação em massa de hábitos e logs.
+    A leitura usa cursor no servidor (AsyncSession.stream + yield_per), então a
+    memória fica constante; a escrita é feita em lotes de comandos multi-linha.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def stream_habits(self, chunk_size: int) -> AsyncIterator[Sequence[Any]]:
+        query = (
+            select(Habit.id, Habit.name, Habit.description, Habit.created_at, Habit.is_active)
+            .order_by(Habit.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+    async def stream_logs(self, chunk_size: int) -> AsyncIterator[Sequence[Any]]:
+        """ (habit_id, completed_date) de habit_logs e dos anos arquivados em habit_logs_archive. """
+        archived_date = func.make_date(HabitLogArchive.year, 1, 1) + (func.unnest(HabitLogArchive.days) - 1)
+        query = (
+            union_all(
+                select(HabitLog.habit_id, HabitLog.completed_date),
+                select(HabitLogArchive.habit_id, archived_date.label("completed_date")),
+            )
+            .order_by("habit_id", "completed_date")
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+    async def create_import(self, format: str) -> HabitImport:
+        habit_import = HabitImport(format=format, status="running", records_done=0, habits_imported=0, logs_imported=0, skipped=0, updated_at=None)
+        self.db.add(habit_import)
+        await self.db.flush()
+        return habit_import
+
+    async def get_import(self, import_id: int) -> Optional[HabitImport]:
+        return await self.db.get(HabitImport, import_id)
+
+    async def claim_import(self, import_id: int, stale_after: timedelta) -> Optional[HabitImport]:
+        """
+        Marca uma importação falha (ou "running" sem progresso há 'stale_after',
+        ex: processo morreu) como em andamento de novo. None = não pode ser retomada.
+        """
+        stale_before = datetime.now(timezone.utc) - stale_after
+        stmt = (
+            update(HabitImport)
+            .where(
+                HabitImport.id == import_id,
+                or_(
+                    HabitImport.status == "failed",
+                    (HabitImport.status == "running") & (func.coalesce(HabitImport.updated_at, HabitImport.created_at) < stale_before),
+                ),
+            )
+            .values(status="running", error=None)
+            .returning(HabitImport)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_id_map(self, import_id: int) -> Dict[int, int]:
+        result = await self.db.execute(
+            select(HabitImportId.source_id, HabitImportId.habit_id).where(HabitImportId.import_id == import_id)
+        )
+        return dict(result.all())
+
+    async def insert_habits(self, import_id: int, habits: List[Dict[str, Any]]) -> Dict[int, int]:
+        """
+        Cria os hábitos do lote ({id, name, description, created_at, is_active}) e grava
+        o mapeamento id de origem -> id novo. Um INSERT multi-linha (insertmanyvalues)
+        com RETURNING na ordem dos parâmetros.
+        """
+        stmt = insert(Habit).returning(Habit.id, sort_by_parameter_order=True)
+        params = [
+            {"name": h["name"], "description": h["description"], "is_active": h["is_active"], "created_at": h["created_at"]}
+            for h in habits
+        ]
+        result = await self.db.execute(stmt, params)
+        new_ids = list(result.scalars().all())
+
+        id_map = {h["id"]: new_id for h, new_id in zip(habits, new_ids)}
+        await self.db.execute(
+            insert(HabitImportId),
+            [{"import_id": import_id, "source_id": source, "habit_id": new} for source, new in id_map.items()],
+        )
+        return id_map
+
+    async def insert_logs(self, logs: List[Tuple[int, date]]) -> List[Tuple[int, int]]:
+        """
+        Insere os logs do lote em um único comando (unnest de dois arrays).
+        Dias que já existem são ignorados. Retorna (log_id, habit_id) dos inseridos.
+        """
+        rows = select(
+            func.unnest(bindparam("habit_ids", [h for h, _ in logs], type_=ARRAY(Integer))),
+            func.unnest(bindparam("dates", [d for _, d in logs], type_=ARRAY(Date))),
+        )
+        stmt = (
+            pg_insert(HabitLog)
+            .from_select(["habit_id", "completed_date"], rows)
+            .on_conflict_do_nothing(index_elements=[HabitLog.habit_id, HabitLog.completed_date])
+            .returning(HabitLog.id, HabitLog.habit_id)
+        )
+        result = await self.db.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def advance(self, import_id: int, records: int, habits: int, logs: int, skipped: int) -> None:
+        """ Progresso do lote, na mesma transação dos dados (base da retomada). """
+        await self.db.execute(
+            update(HabitImport)
+            .where(HabitImport.id == import_id)
+            .values(
+                records_done=HabitImport.records_done + records,
+                habits_imported=HabitImport.habits_imported + habits,
+                logs_imported=HabitImport.logs_imported + logs,
+                skipped=HabitImport.skipped + skipped,
+            )
+        )
+
+    async def finish(self, import_id: int, status: str, error: Optional[str] = None) -> Optional[HabitImport]:
+        result = await self.db.execute(
+            update(HabitImport)
+            .where(HabitImport.id == import_id)
+            .values(status=status, error=error)
+            .returning(HabitImport)
+        )
+        return result.scalar_one_or_none()
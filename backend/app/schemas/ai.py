@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+from datetime import datetime
 
 class AIRequest(BaseModel):
     goal: str
@@ -7,6 +8,17 @@ class AIRequest(BaseModel):
 class AIResponse(BaseModel):
     habits: List[str]
 
+class AIBatchRequest(BaseModel):
+    goals: List[str] = Field(..., min_length=1, max_length=20)
+
+class AIBatchItem(BaseModel):
+    goal: str
+    habits: List[str] = []
+    error: Optional[str] = None
+
+class AIBatchResponse(BaseModel):
+    results: List[AIBatchItem]
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -15,4 +27,45 @@ class ChatRequest(BaseModel):
     messages: List[ChatMessage]
 
 class ChatResponse(BaseModel):
-    response: str
\ No newline at end of file
+    response: str
+
+# Sessões de chat persistidas no servidor
+class ChatSessionMessage(BaseModel):
+    content: str
+
+class ChatUsage(BaseModel):
+    prompt_tokens: int
+    completion_tokens: int
+    naive_prompt_tokens: int # Quanto teria custado reenviar o histórico completo
+    saved_prompt_tokens: int
+
+class ChatSessionRead(BaseModel):
+    id: int
+    created_at: datetime
+    summary: Optional[str] = None
+    usage: ChatUsage
+
+class ChatSessionReply(BaseModel):
+    session_id: int
+    response: str
+    usage: ChatUsage
+
+
+# Jobs assíncronos de IA
+class AIJobCreated(BaseModel):
+    job_id: int
+    status: str
+
+class AIJobRead(BaseModel):
+    id: int
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    result: Optional[AIResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date
+
+# Contagem de conclusões dentro de um período (semana ou mês)
+class PeriodCount(BaseModel):
+    period_start: date
+    count: int
+
+# Estatísticas agregadas de um hábito (tamanho fixo, independente do histórico)
+class HabitStats(BaseModel):
+    habit_id: int
+    current_streak: int
+    longest_streak: int
+    window_days: int
+    completed_in_window: int
+    completion_rate: float
+    weekly: List[PeriodCount] = []
+    monthly: List[PeriodCount] = []
+
+# Dias concluídos de um ano como bitmap (base64): bit N = dia do ano N+1, bit menos significativo primeiro
+class HabitHeatmap(BaseModel):
+    habit_id: int
+    year: int
+    days: int
+    bitorder: str = "little"
+    bits: str
+
+# Indicadores calculados sobre o histórico completo (bitmaps)
+class HabitInsights(BaseModel):
+    habit_id: int
+    window_days: int
+    current_streak: int
+    longest_streak: int
+    total_completions: int
+    completion_rate: float
+    rolling_rate: List[float]
+    weekday_histogram: List[int]
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from typing import Any, Dict, Optional, List, Literal, Union
+from typing_extensions import Annotated, TypedDict
 from datetime import datetime, date
 
 # Schema de Logs (Datas Completas)
@@ -23,12 +24,194 @@ class HabitUpdate(HabitBase):
     name: Optional[str] = None
     is_active: Optional[bool] = None
 
+# Campos de HabitRead calculados do resumo guardado em 'habits' (sem consultar os logs)
+SUMMARY_FIELDS = ("last_completed_date", "current_streak", "total_completions", "completions_last_7_days", "completed_today")
+
+def completion_summary(
+    last_completed_date: Optional[date],
+    current_streak: int,
+    total_completions: int,
+    recent_days: int,
+    today: date,
+) -> Dict[str, Any]:
+    """
+    Campos de resumo vistos a partir de 'today'. A sequência guardada termina em
+    last_completed_date e só continua valendo até ontem; recent_days tem um bit
+    por dia (bit i = last_completed_date - i), dos quais contam os 7 últimos até hoje.
+    """
+    summary = {
+        "last_completed_date": last_completed_date,
+        "current_streak": 0,
+        "total_completions": total_completions or 0,
+        "completions_last_7_days": 0,
+        "completed_today": False,
+    }
+    if last_completed_date is None:
+        return summary
+    age = (today - last_completed_date).days
+    if age >= 0:
+        window = recent_days & ((1 << max(7 - age, 0)) - 1)
+        summary["current_streak"] = current_streak if age <= 1 else 0
+    else: # Último dia no futuro (ex: log importado com data futura)
+        window = recent_days >> -age
+        summary["current_streak"] = max(current_streak + age, 0)
+    summary["completions_last_7_days"] = bin(window).count("1")
+    summary["completed_today"] = age <= 0 and bool(window & 1) # Bit 0 da janela = hoje
+    return summary
+
+def summary_from_columns(model: type, data: Any) -> Any:
+    """
+    Objeto ORM (Habit): troca as colunas guardadas do resumo pelos campos vistos a partir
+    de hoje. Só lê os atributos que o schema tem (nada de carregar 'logs' sem querer).
+    """
+    if isinstance(data, dict) or not hasattr(data, "recent_days"):
+        return data
+    fields = {f: getattr(data, f) for f in model.model_fields if f not in SUMMARY_FIELDS}
+    summary = completion_summary(
+        data.last_completed_date, data.current_streak, data.total_completions, data.recent_days, date.today()
+    )
+    return {**fields, **summary}
+
 # Schema para Leitura (O que a API devolve)
 class HabitRead(HabitBase):
     id: int
     created_at: datetime
     is_active: bool
+    # Resumo das conclusões (ver completion_summary): as listas não precisam dos logs
+    last_completed_date: Optional[date] = None
+    current_streak: int = 0
+    total_completions: int = 0
+    completions_last_7_days: int = 0
+    completed_today: bool = False
     logs: List[HabitLogRead] = []
 
     # Configuração necessária para o Pydantic ler objetos ORM do SQLAlchemy
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _summary_from_columns(cls, data: Any) -> Any:
+        return summary_from_columns(cls, data)
+
+# Linhas cruas (Core) com o mesmo JSON de HabitRead: dados internos confiáveis,
+# serializados direto para bytes (TypeAdapter.dump_json), sem validação
+class HabitLogRow(TypedDict):
+    id: int
+    completed_date: date
+
+class HabitRow(TypedDict):
+    name: str
+    description: Optional[str]
+    id: int
+    created_at: datetime
+    is_active: bool
+    last_completed_date: Optional[date]
+    current_streak: int
+    total_completions: int
+    completions_last_7_days: int
+    completed_today: bool
+    logs: List[HabitLogRow]
+
+# Schema enxuto do toggle: o novo estado do dia e o resumo atualizado (sem logs)
+class HabitToggleRead(BaseModel):
+    habit_id: int
+    completed_date: date
+    completed: bool
+    log_id: Optional[int] = None
+    last_completed_date: Optional[date] = None
+    current_streak: int = 0
+    total_completions: int = 0
+    completions_last_7_days: int = 0
+    completed_today: bool = False
+
+
+# Schemas das operações em lote
+class HabitBulkCreate(BaseModel):
+    habits: List[HabitCreate] = Field(..., min_length=1, max_length=100)
+
+class HabitBulkIds(BaseModel):
+    habit_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class HabitBulkToggle(HabitBulkIds):
+    completed_date: Optional[date] = None # Padrão: hoje
+
+    @field_validator("completed_date")
+    @classmethod
+    def _not_in_future(cls, value: Optional[date]) -> Optional[date]:
+        # Um log futuro contaria como sequência ativa e viraria o last_completed_date do resumo
+        if value is not None and value > date.today():
+            raise ValueError("completed_date não pode ser uma data futura")
+        return value
+
+class HabitBulkToggleResult(BaseModel):
+    results: List[HabitToggleRead]
+    not_found: List[int] = []
+
+class HabitBulkDeleteResult(BaseModel):
+    deleted: List[int]
+    not_found: List[int] = []
+
+
+# Schemas do delta-sync (GET /api/habits/changes)
+class HabitChangeRead(HabitBase):
+    id: int
+    created_at: datetime
+    is_active: bool
+    # Mesmo resumo de HabitRead: o cliente atualiza a lista sem os logs
+    last_completed_date: Optional[date] = None
+    current_streak: int = 0
+    total_completions: int = 0
+    completions_last_7_days: int = 0
+    completed_today: bool = False
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _summary_from_columns(cls, data: Any) -> Any:
+        return summary_from_columns(cls, data)
+
+class HabitLogChangeRead(HabitLogRead):
+    habit_id: int
+
+class HabitChangeFeed(BaseModel):
+    cursor: int # Enviar como 'since' na próxima chamada
+    has_more: bool
+    habits: List[HabitChangeRead] = [] # Criados/alterados (sem logs)
+    logs: List[HabitLogChangeRead] = [] # Logs criados
+    deleted_habits: List[int] = [] # Tombstones (os logs do hábito vão junto)
+    deleted_logs: List[int] = []
+
+
+# Registros do export/import (GET /api/habits/export, POST /api/habits/import):
+# hábitos primeiro, depois os logs, que apontam para o id do hábito no arquivo
+class HabitExportHabit(BaseModel):
+    type: Literal["habit"]
+    id: int
+    name: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = Field(None, max_length=500)
+    created_at: Optional[datetime] = None
+    is_active: bool = True
+
+class HabitExportLog(BaseModel):
+    type: Literal["log"]
+    habit_id: int
+    completed_date: date
+
+HabitExportRecord = Annotated[Union[HabitExportHabit, HabitExportLog], Field(discriminator="type")]
+
+class HabitImportRead(BaseModel):
+    id: int
+    format: str
+    status: str
+    records_done: int
+    habits_imported: int
+    logs_imported: int
+    skipped: int
+    error: Optional[str] = None
+    # Desta execução (não acumulado entre retomadas)
+    records_this_run: Optional[int] = None
+    seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,21 +1,143 @@
+import asyncio
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from app.core.config import settings
-from app.schemas.ai import AIResponse
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+import logging
+from contextlib import aclosing
 from app.schemas.ai import AIResponse, ChatRequest, ChatResponse 
+from app.core.batching import MicroBatcher
+from app.core.metrics import AI_ERRORS
+from app.services.llm_client import LLMClient, LLMUnavailableError
+from app.services.suggestion_cache import SuggestionCache
+from app.models.ai import ChatMessageLog
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CHAT_SYSTEM_PROMPT = "Você é um assistente amigável e motivador focado em produtividade e hábitos saudáveis. Responda de forma concisa e útil."
+
+class InvalidAIResponse(Exception):
+    """A IA respondeu, mas não no formato esperado (nunca é cacheado)."""
+    def __init__(self, fallback: str):
+        super().__init__(fallback)
+        self.fallback = fallback
+
+def _extract_json(content: str) -> dict:
+    # Limpeza para garantir uma resposta JSON
+    cleaned_content = content.replace("```json", "").replace("```", "").strip()
+    
+    # Tenta encontrar o início e fim do JSON se houver lixo em volta
+    if "{" in cleaned_content and "}" in cleaned_content:
+        start = cleaned_content.find("{")
+        end = cleaned_content.rfind("}") + 1
+        cleaned_content = cleaned_content[start:end]
+
+    data = json.loads(cleaned_content)
+    if not isinstance(data, dict):
+        raise json.JSONDecodeError("O JSON não é um objeto", cleaned_content, 0)
+    return data
+
+def _valid_habits(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(h, str) for h in value)
 
 class AIService:
-    def __init__(self):
-        # Inicializa o Gemini com a chave da API
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.7
+    def __init__(
+        self,
+        client: LLMClient,
+        cache: Optional[SuggestionCache] = None,
+        batcher: Optional[MicroBatcher] = None,
+    ):
+        # Cliente, cache e micro-batcher compartilhados pelo processo (criados no lifespan da app)
+        self.client = client
+        self.cache = cache
+        self.batcher = batcher
+
+    def warm_up(self) -> None:
+        """ Importa o LangChain e cria o modelo antes do primeiro uso (AI_WARMUP). Bloqueante: rodar em thread. """
+        import langchain_core.messages, langchain_core.prompts # noqa: F401
+        self.client.llm
+
+    async def generate_habits_from_goal(self, goal: str, use_cache: bool = True) -> AIResponse:
+        try:
+            if self.cache is not None and use_cache:
+                return await self.cache.get_or_compute(goal, lambda: self._compute_habits(goal))
+            return await self._compute_habits(goal)
+        except InvalidAIResponse as e:
+            return AIResponse(habits=[e.fallback])
+
+    async def generate_habits_batch(self, goals: List[str], use_cache: bool = True) -> List[Union[AIResponse, Exception]]:
+        """
+        Várias metas de uma vez. As chamadas concorrentes caem na mesma janela
+        do micro-batcher e viram um único prompt; metas repetidas são coalescidas pelo cache.
+        """
+        return await asyncio.gather(
+            *(self.generate_habits_from_goal(goal, use_cache) for goal in goals),
+            return_exceptions=True
         )
 
-    async def generate_habits_from_goal(self, goal: str) -> AIResponse:
+    async def _compute_habits(self, goal: str) -> AIResponse:
+        if self.batcher is not None:
+            return await self.batcher.submit(goal)
+        return await self._request_habits(goal)
+
+    async def request_habits_batch(self, goals: List[str]) -> List[Union[AIResponse, Exception]]:
+        """
+        Uma chamada ao LLM para várias metas, com saída JSON indexada por chave.
+        Metas que faltarem ou vierem inválidas no JSON caem no prompt individual.
+        """
+        if len(goals) == 1:
+            try:
+                return [await self._request_habits(goals[0])]
+            except Exception as e:
+                return [e]
+
+        keyed = {f"g{i}": goal for i, goal in enumerate(goals, start=1)}
+        template = """
+        Atue como um coach de produtividade.
+        Para CADA meta abaixo, crie de 3 a 5 hábitos curtos.
+
+        METAS: {goals}
+
+        IMPORTANTE: Sua resposta deve ser ESTRITAMENTE um JSON válido, usando as MESMAS chaves das metas.
+        NÃO escreva "Aqui está", NÃO use Markdown (```json), apenas o objeto JSON cru.
+
+        Formato obrigatório:
+        {{ "g1": ["Hábito 1", "Hábito 2", "Hábito 3"], "g2": ["Hábito 1", "Hábito 2", "Hábito 3"] }}
+        """
+        from langchain_core.prompts import PromptTemplate # LangChain só no primeiro uso da IA (startup rápido)
+        prompt = PromptTemplate(input_variables=["goals"], template=template)
+
+        data: dict = {}
+        try:
+            response = await self.client.ainvoke(prompt.format_prompt(goals=json.dumps(keyed, ensure_ascii=False)))
+            data = _extract_json(response.content)
+        except json.JSONDecodeError:
+            logger.exception("Resposta da IA (lote) não é um JSON válido")
+            AI_ERRORS.inc(kind="invalid_json_batch")
+        except LLMUnavailableError as e:
+            return [e] * len(goals)
+
+        results: List[Union[AIResponse, Exception, None]] = [
+            AIResponse(habits=data[key]) if _valid_habits(data.get(key)) else None
+            for key in keyed
+        ]
+
+        # Fallback por meta: só as que o lote não resolveu
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fallbacks = await asyncio.gather(
+                *(self._request_habits(goals[i]) for i in missing),
+                return_exceptions=True
+            )
+            for i, result in zip(missing, fallbacks):
+                results[i] = result
+
+        return results
+
+    async def run_suggest_job(self, payload: dict) -> dict:
+        """ Handler do job assíncrono "suggest" (executado pela AIJobQueue). """
+        response = await self.generate_habits_from_goal(payload["goal"], payload.get("use_cache", True))
+        return response.model_dump()
+
+    async def _request_habits(self, goal: str) -> AIResponse:
         # Template do Prompt
         template = """
         Atue como um coach de produtividade.
@@ -30,42 +152,35 @@ class AIService:
         {{ "habits": ["Hábito 1", "Hábito 2", "Hábito 3", "Hábito 4", "Hábito 5"] }}
         """
         
+        from langchain_core.prompts import PromptTemplate
         prompt = PromptTemplate(input_variables=["goal"], template=template)
-        chain = prompt | self.llm
 
         try:
-            # Aumentar timeout implícito aguardando a resposta
-            response = await chain.ainvoke({"goal": goal})
-            content = response.content
-
-            # Limpeza para garantir uma resposta JSON
-            cleaned_content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Tenta encontrar o início e fim do JSON se houver lixo em volta
-            if "{" in cleaned_content and "}" in cleaned_content:
-                start = cleaned_content.find("{")
-                end = cleaned_content.rfind("}") + 1
-                cleaned_content = cleaned_content[start:end]
-
-            data = json.loads(cleaned_content)
+            # Timeout, limite de concorrência e circuit breaker ficam no LLMClient
+            response = await self.client.ainvoke(prompt.format_prompt(goal=goal))
+            data = _extract_json(response.content)
             
             # Garante que a chave habits existe
             if "habits" not in data:
-                return AIResponse(habits=["A IA respondeu, mas sem hábitos válidos."])
+                AI_ERRORS.inc(kind="missing_habits")
+                raise InvalidAIResponse("A IA respondeu, mas sem hábitos válidos.")
 
             return AIResponse(habits=data["habits"])
 
-        except json.JSONDecodeError as e:
-            print(f"ERRO AO LER JSON: {e}")
-            return AIResponse(habits=["Erro: A IA não retornou um formato válido."])
+        except json.JSONDecodeError:
+            logger.exception("Resposta da IA não é um JSON válido")
+            AI_ERRORS.inc(kind="invalid_json")
+            raise InvalidAIResponse("Erro: A IA não retornou um formato válido.")
+        except InvalidAIResponse:
+            raise
         except Exception as e:
-            print(f"ERRO GERAL NA IA: {e}")
+            logger.exception("Erro na chamada à IA")
+            AI_ERRORS.inc(kind="unavailable" if isinstance(e, LLMUnavailableError) else "provider")
             raise e
         
-    async def run_chat(self, chat_data: ChatRequest) -> ChatResponse:
-        history = [
-            SystemMessage(content="Você é um assistente amigável e motivador focado em produtividade e hábitos saudáveis. Responda de forma concisa e útil.")
-        ]
+    def _build_history(self, chat_data: ChatRequest) -> list:
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+        history = [SystemMessage(content=CHAT_SYSTEM_PROMPT)]
 
         for msg in chat_data.messages:
             if msg.role == 'user':
@@ -73,6 +188,60 @@ class AIService:
             else:
                 history.append(AIMessage(content=msg.content))
 
-        response = await self.llm.ainvoke(history)
+        return history
+
+    async def run_chat(self, chat_data: ChatRequest) -> ChatResponse:
+        response = await self.client.ainvoke(self._build_history(chat_data))
         
-        return ChatResponse(response=response.content)
\ No newline at end of file
+        return ChatResponse(response=response.content)
+
+    async def stream_chat(self, chat_data: ChatRequest) -> AsyncIterator[str]:
+        """ Versão em streaming do chat: devolve os tokens conforme o LLM gera. """
+        async with aclosing(self.stream_messages(self._build_history(chat_data))) as tokens:
+            async for token in tokens:
+                yield token
+
+    def build_session_history(self, summary: Optional[str], recent: Sequence[ChatMessageLog]) -> list:
+        """ Contexto de uma sessão: prompt do sistema + resumo + últimas mensagens. """
+        from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+        history = [SystemMessage(content=CHAT_SYSTEM_PROMPT)]
+        if summary:
+            history.append(SystemMessage(content=f"Resumo da conversa até aqui: {summary}"))
+
+        for msg in recent:
+            if msg.role == 'user':
+                history.append(HumanMessage(content=msg.content))
+            else:
+                history.append(AIMessage(content=msg.content))
+
+        return history
+
+    async def complete(self, history: list) -> Tuple[str, Optional[dict]]:
+        """ Executa o chat e devolve (texto, uso de tokens informado pelo provedor). """
+        response = await self.client.ainvoke(history)
+        return response.content, response.usage_metadata
+
+    async def stream_messages(self, history: list, usage: Optional[dict] = None) -> AsyncIterator[str]:
+        # 'usage' recebe o uso informado pelo provedor (ver LLMClient.astream)
+        async with aclosing(self.client.astream(history, usage)) as chunks:
+            async for chunk in chunks:
+                if chunk.content:
+                    yield chunk.content
+
+    async def summarize_conversation(
+        self, summary: Optional[str], messages: Sequence[ChatMessageLog]
+    ) -> Tuple[str, list, Optional[dict]]:
+        """ Incorpora mensagens antigas ao resumo da sessão. Devolve (resumo, prompt, uso). """
+        from langchain_core.messages import HumanMessage, SystemMessage
+        transcript = "\n".join(
+            f"{'Usuário' if m.role == 'user' else 'Coach'}: {m.content}" for m in messages
+        )
+        prompt = [
+            SystemMessage(content=(
+                "Resuma a conversa entre um usuário e seu coach de hábitos em no máximo 5 frases, "
+                "preservando metas, hábitos combinados e preferências do usuário."
+            )),
+            HumanMessage(content=f"Resumo anterior: {summary or '(vazio)'}\n\nNovas mensagens:\n{transcript}"),
+        ]
+        text, usage = await self.complete(prompt)
+        return text, prompt, usage
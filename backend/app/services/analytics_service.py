@@ -0,0 +1,99 @@
+import base64
+from fastapi import HTTPException
+from app.repositories.analytics_repository import AnalyticsRepository
+from app.repositories.bitmap_repository import BitmapRepository
+from app.schemas.analytics import HabitStats, PeriodCount, HabitHeatmap, HabitInsights
+from app.services import completion_bitmaps
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+
+class AnalyticsService:
+    """
+    Camada de Regra de Negócio para estatísticas dos hábitos.
+    Define as janelas de tempo e monta a resposta a partir dos agregados do banco.
+    """
+
+    def __init__(self, repository: AnalyticsRepository, bitmaps: Optional[BitmapRepository] = None):
+        self.repository = repository
+        self.bitmaps = bitmaps
+
+    async def list_stats(self, days: int = 30, weeks: int = 12, months: int = 12) -> List[HabitStats]:
+        return await self._build_stats(None, days, weeks, months)
+
+    async def get_stats(self, habit_id: int, days: int = 30, weeks: int = 12, months: int = 12) -> HabitStats:
+        stats = await self._build_stats(habit_id, days, weeks, months)
+        if not stats:
+            raise HTTPException(status_code=404, detail="Hábito não encontrado")
+        return stats[0]
+
+    async def _build_stats(self, habit_id: Optional[int], days: int, weeks: int, months: int) -> List[HabitStats]:
+        today = date.today()
+        summaries = await self.repository.get_summaries(today, days, habit_id)
+        if not summaries:
+            return []
+
+        stats: Dict[int, HabitStats] = {}
+        for hid, current, longest, done in summaries:
+            stats[hid] = HabitStats(
+                habit_id=hid,
+                current_streak=current,
+                longest_streak=longest,
+                window_days=days,
+                completed_in_window=done,
+                completion_rate=round(done / days, 4),
+            )
+
+        buckets = await self.repository.get_period_counts(
+            list(stats.keys()),
+            week_start=_week_start(today, weeks),
+            month_start=_month_start(today, months),
+        )
+        for hid, period, period_start, count in buckets:
+            target = stats[hid].weekly if period == "week" else stats[hid].monthly
+            target.append(PeriodCount(period_start=period_start, count=count))
+
+        return list(stats.values())
+
+    async def _get_bitmaps(self, habit_id: int, years: Optional[List[int]] = None) -> Dict[int, bytes]:
+        if not await self.repository.habit_exists(habit_id):
+            raise HTTPException(status_code=404, detail="Hábito não encontrado")
+        if self.bitmaps is not None:
+            return await self.bitmaps.get_bitmaps(habit_id, years)
+
+        # Bitmaps desligados (HABIT_BITMAPS_ENABLED=false): monta a partir dos logs
+        start = date(min(years), 1, 1) if years else date.min
+        end = date(max(years), 12, 31) if years else date.today()
+        by_year: Dict[int, List[date]] = {}
+        for day in await self.repository.get_completed_days(habit_id, start, end):
+            by_year.setdefault(day.year, []).append(day)
+        return {year: completion_bitmaps.pack_days(days, year) for year, days in by_year.items()}
+
+    async def get_heatmap(self, habit_id: int, year: int) -> HabitHeatmap:
+        bitmaps = await self._get_bitmaps(habit_id, [year])
+        bitmap = bitmaps.get(year, bytes(completion_bitmaps.BITMAP_BYTES))
+        return HabitHeatmap(
+            habit_id=habit_id,
+            year=year,
+            days=completion_bitmaps.days_in_year(year),
+            bits=base64.b64encode(bitmap).decode(),
+        )
+
+    async def get_insights(self, habit_id: int, window: int = 30) -> HabitInsights:
+        """ Streaks, taxa móvel e histograma semanal sobre todo o histórico, em NumPy. """
+        bitmaps = await self._get_bitmaps(habit_id)
+        summary = completion_bitmaps.summarize(bitmaps, date.today(), window)
+        return HabitInsights(habit_id=habit_id, window_days=window, **summary)
+
+    async def rebuild_bitmaps(self, habit_ids: Optional[List[int]] = None) -> int:
+        if self.bitmaps is None:
+            raise HTTPException(status_code=409, detail="Bitmaps de conclusão desativados")
+        return await self.bitmaps.rebuild(habit_ids)
+
+def _week_start(today: date, weeks: int) -> date:
+    # Segunda-feira da semana atual, recuando (weeks - 1) semanas (igual ao date_trunc do Postgres)
+    monday = today - timedelta(days=today.weekday())
+    return monday - timedelta(weeks=weeks - 1)
+
+def _month_start(today: date, months: int) -> date:
+    index = today.year * 12 + (today.month - 1) - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
@@ -0,0 +1,46 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from app.models.ai import ChatMessageLog
+
+def estimate_tokens(text: Optional[str]) -> int:
+    # Aproximação barata (~4 caracteres por token), suficiente para orçamento de contexto
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+@dataclass
+class ContextWindow:
+    recent: List[ChatMessageLog] = field(default_factory=list) # Enviadas literalmente
+    to_summarize: List[ChatMessageLog] = field(default_factory=list) # Vão para o resumo
+
+class ChatContextManager:
+    """
+    Decide o que vai literalmente para o LLM e o que é incorporado ao resumo.
+    Mantém as últimas 'max_messages' mensagens dentro do orçamento de tokens;
+    a mensagem mais recente sempre é mantida.
+    """
+
+    def __init__(self, max_messages: int = 12, token_budget: int = 2000):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+
+    def split(self, pending: Sequence[ChatMessageLog], summary_tokens: int = 0) -> ContextWindow:
+        budget = self.token_budget - summary_tokens
+        kept: List[ChatMessageLog] = []
+        used = 0
+
+        for message in reversed(pending):
+            fits = used + message.tokens <= budget and len(kept) < self.max_messages
+            if kept and not fits:
+                break
+            kept.append(message)
+            used += message.tokens
+
+        # Histerese: ao estourar a janela, resume metade dela de uma vez
+        # para não chamar o resumo a cada nova mensagem
+        if len(kept) < len(pending):
+            kept = kept[: max(1, self.max_messages // 2)]
+
+        kept.reverse()
+        return ContextWindow(recent=kept, to_summarize=list(pending[: len(pending) - len(kept)]))
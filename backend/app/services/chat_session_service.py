@@ -0,0 +1,150 @@
+from contextlib import aclosing
+from dataclasses import dataclass
+from fastapi import HTTPException
+from typing import AsyncIterator, List, Optional
+from app.db.session import SessionLocal
+from app.models.ai import ChatSession, ChatMessageLog
+from app.repositories.chat_repository import ChatRepository
+from app.schemas.ai import ChatSessionRead, ChatSessionReply, ChatUsage
+from app.services.ai_service import AIService, CHAT_SYSTEM_PROMPT
+from app.services.chat_context import ChatContextManager, estimate_tokens
+
+@dataclass
+class ChatTurn:
+    """ Estado de um turno entre as duas transações curtas (nenhuma conexão fica presa durante o LLM). """
+    session_id: int
+    summary: Optional[str]
+    summarized_until_id: int
+    pending: List[ChatMessageLog]
+    history: Optional[list] = None
+    summary_changed: bool = False
+    prompt_tokens: int = 0 # Uso do LLM no turno (resumo + resposta), somado na 2ª transação
+    completion_tokens: int = 0
+
+class ChatSessionService:
+    """
+    Conversas persistidas no servidor: o cliente envia apenas a nova mensagem.
+    O contexto enviado ao LLM é limitado (últimas mensagens + resumo das antigas),
+    então o custo por turno não cresce com o tamanho da conversa.
+
+    Cada turno usa duas transações curtas, com o LLM chamado entre elas sem
+    conexão do pool: (1) grava a mensagem do usuário e lê o snapshot da sessão;
+    (2) grava a resposta, o resumo e os contadores. Se o LLM falhar, a segunda
+    não acontece.
+    """
+
+    def __init__(self, ai: AIService, context: ChatContextManager):
+        self.ai = ai
+        self.context = context
+
+    async def create_session(self) -> ChatSessionRead:
+        async with SessionLocal() as db:
+            session = await ChatRepository(db).create_session()
+            await db.commit()
+        return self._to_read(session)
+
+    async def get_session(self, session_id: int) -> ChatSessionRead:
+        async with SessionLocal() as db:
+            session = await ChatRepository(db).get_session(session_id)
+        if not session:
+            raise self._not_found()
+        return self._to_read(session)
+
+    async def send_message(self, session_id: int, content: str) -> ChatSessionReply:
+        turn = await self._prepare_turn(session_id, content)
+        reply, usage = await self.ai.complete(turn.history)
+        session = await self._finish_turn(turn, reply, usage)
+        return ChatSessionReply(session_id=session.id, response=reply, usage=self._usage(session))
+
+    async def stream_message(self, session_id: int, content: str) -> AsyncIterator[str]:
+        """
+        Versão em streaming. A resposta é persistida ao final, inclusive a parcial
+        se o cliente desconectar; se o LLM falhar no meio, nada é gravado.
+        """
+        turn = await self._prepare_turn(session_id, content)
+        tokens = []
+        usage: dict = {} # Preenchido pelo stream com o uso informado pelo provedor
+        failed = False
+        try:
+            async with aclosing(self.ai.stream_messages(turn.history, usage)) as stream:
+                async for token in stream:
+                    tokens.append(token)
+                    yield token
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if tokens and not failed:
+                await self._finish_turn(turn, "".join(tokens), usage)
+
+    def _not_found(self) -> HTTPException:
+        return HTTPException(status_code=404, detail="Sessão de chat não encontrada")
+
+    async def _prepare_turn(self, session_id: int, content: str) -> ChatTurn:
+        # Transação 1: mensagem do usuário + snapshot do que ainda não foi resumido
+        tokens = estimate_tokens(content)
+        async with SessionLocal() as db:
+            repository = ChatRepository(db)
+            session = await repository.start_turn(session_id, tokens, estimate_tokens(CHAT_SYSTEM_PROMPT))
+            if not session:
+                raise self._not_found()
+            await repository.add_message(session.id, "user", content, tokens)
+            pending = await repository.get_messages_after(session.id, session.summarized_until_id)
+            await db.commit()
+
+        turn = ChatTurn(session.id, session.summary, session.summarized_until_id, list(pending))
+
+        # Fora de transação: o resumo das mensagens que saem da janela
+        window = self.context.split(turn.pending, estimate_tokens(turn.summary))
+        if window.to_summarize:
+            summary, prompt, usage = await self.ai.summarize_conversation(turn.summary, window.to_summarize)
+            self._record_usage(turn, prompt, summary, usage)
+            turn.summary = summary
+            turn.summarized_until_id = window.to_summarize[-1].id
+            turn.summary_changed = True
+
+        turn.history = self.ai.build_session_history(turn.summary, window.recent)
+        return turn
+
+    async def _finish_turn(self, turn: ChatTurn, reply: str, usage: Optional[dict]) -> ChatSession:
+        # Transação 2: resposta, resumo e contadores (incrementos atômicos)
+        self._record_usage(turn, turn.history, reply, usage)
+        tokens = estimate_tokens(reply)
+        async with SessionLocal() as db:
+            repository = ChatRepository(db)
+            await repository.add_message(turn.session_id, "model", reply, tokens)
+            if turn.summary_changed:
+                await repository.advance_summary(turn.session_id, turn.summary, turn.summarized_until_id)
+            session = await repository.add_usage(turn.session_id, tokens, turn.prompt_tokens, turn.completion_tokens)
+            await db.commit()
+        if not session:
+            raise self._not_found() # Sessão apagada durante a chamada ao LLM
+        return session
+
+    def _record_usage(self, turn: ChatTurn, prompt: list, reply: str, usage: Optional[dict]) -> None:
+        # Usa a contagem do provedor quando disponível; senão (ou se veio parcial), a estimativa local
+        usage = usage or {}
+        prompt_tokens = usage.get("input_tokens")
+        completion_tokens = usage.get("output_tokens")
+        if prompt_tokens is None:
+            prompt_tokens = sum(estimate_tokens(m.content) for m in prompt)
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(reply)
+        turn.prompt_tokens += prompt_tokens
+        turn.completion_tokens += completion_tokens
+
+    def _usage(self, session: ChatSession) -> ChatUsage:
+        return ChatUsage(
+            prompt_tokens=session.prompt_tokens,
+            completion_tokens=session.completion_tokens,
+            naive_prompt_tokens=session.naive_prompt_tokens,
+            saved_prompt_tokens=max(0, session.naive_prompt_tokens - session.prompt_tokens),
+        )
+
+    def _to_read(self, session: ChatSession) -> ChatSessionRead:
+        return ChatSessionRead(
+            id=session.id,
+            created_at=session.created_at,
+            summary=session.summary,
+            usage=self._usage(session),
+        )
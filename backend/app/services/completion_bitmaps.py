@@ -0,0 +1,94 @@
+"""
+Histórico de conclusões em bitmaps: um bit por dia, um bytea de 46 bytes
+(368 bits, 366 usados) por hábito por ano. O bit N é o dia do ano N+1, na
+ordem do set_bit/get_bit do Postgres (bit menos significativo primeiro).
+
+As estatísticas trabalham sobre o vetor de dias (NumPy), sem percorrer logs.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+BITMAP_BYTES = 46
+
+def day_index(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+def days_in_year(year: int) -> int:
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+def pack_days(days: Iterable[date], year: int) -> bytes:
+    """ Monta o bitmap de um ano a partir das datas concluídas (reconstrução a partir de HabitLog). """
+    bits = np.zeros(BITMAP_BYTES * 8, dtype=np.uint8)
+    indexes = [day_index(d) for d in days if d.year == year]
+    bits[indexes] = 1
+    return np.packbits(bits, bitorder="little").tobytes()
+
+def unpack(bitmap: bytes, year: int) -> np.ndarray:
+    """ Vetor booleano com um item por dia do ano. """
+    raw = np.frombuffer(bitmap.ljust(BITMAP_BYTES, b"\0"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[: days_in_year(year)].astype(bool)
+
+def timeline(bitmaps: Dict[int, bytes], start: date, end: date) -> np.ndarray:
+    """
+    Dias concluídos de 'start' a 'end' (inclusive) num único vetor, juntando os anos.
+    Anos sem bitmap contam como dias não concluídos.
+    """
+    parts = []
+    for year in range(start.year, end.year + 1):
+        bitmap = bitmaps.get(year)
+        days = unpack(bitmap, year) if bitmap is not None else np.zeros(days_in_year(year), dtype=bool)
+        first = day_index(start) if year == start.year else 0
+        last = day_index(end) + 1 if year == end.year else len(days)
+        parts.append(days[first:last])
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
+
+def _runs(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Início e fim (exclusivo) de cada sequência de dias concluídos. """
+    edges = np.diff(np.concatenate(([0], days.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def streaks(days: np.ndarray) -> Tuple[int, int]:
+    """
+    (streak atual, maior streak). O último item do vetor é hoje; o streak atual
+    continua valendo se a última sequência terminou hoje ou ontem.
+    """
+    starts, ends = _runs(days)
+    if len(starts) == 0:
+        return 0, 0
+    lengths = ends - starts
+    current = int(lengths[-1]) if ends[-1] >= len(days) - 1 else 0
+    return current, int(lengths.max())
+
+def rolling_rate(days: np.ndarray, window: int) -> np.ndarray:
+    """ Taxa de conclusão na janela móvel de 'window' dias, para cada dia do vetor. """
+    sums = np.cumsum(np.concatenate(([0], days.astype(np.int32))))
+    totals = sums[window:] - sums[:-window] if len(days) >= window else np.zeros(0, dtype=np.int32)
+    return totals / window
+
+def weekday_histogram(days: np.ndarray, start: date) -> List[int]:
+    """ Conclusões por dia da semana (segunda = 0 ... domingo = 6). """
+    weekdays = (np.flatnonzero(days) + start.weekday()) % 7
+    return np.bincount(weekdays, minlength=7).tolist()
+
+def summarize(bitmaps: Dict[int, bytes], today: date, window: int = 30) -> Dict:
+    """ Streaks, taxa móvel e histograma semanal do hábito, a partir dos seus bitmaps. """
+    start = date(min(bitmaps), 1, 1) if bitmaps else today
+    days = timeline(bitmaps, start, today)
+    if not len(days):
+        # Nenhum dia até hoje (sem bitmaps, ou só anos futuros): a média de um vetor vazio seria NaN
+        return {"current_streak": 0, "longest_streak": 0, "total_completions": 0,
+                "completion_rate": 0.0, "rolling_rate": [], "weekday_histogram": [0] * 7}
+
+    current, longest = streaks(days)
+    rates = rolling_rate(days, window)
+    return {
+        "current_streak": current,
+        "longest_streak": longest,
+        "total_completions": int(days.sum()),
+        "completion_rate": float(rates[-1]) if len(rates) else float(days.mean()),
+        # Série da taxa móvel nos últimos 'window' dias (para gráfico)
+        "rolling_rate": [round(float(r), 4) for r in rates[-window:]],
+        "weekday_histogram": weekday_histogram(days, start),
+    }
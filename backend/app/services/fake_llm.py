@@ -0,0 +1,57 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+class FakeChatModel(BaseChatModel):
+    """
+    LLM local e determinístico para testes e benchmarks (LLM_PROVIDER=fake).
+    Simula a latência do provedor e responde no formato que o AIService espera.
+    """
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        batch = re.search(r"METAS: (\{.*\})", prompt)
+        if batch:
+            goals = json.loads(batch.group(1))
+            return json.dumps(
+                {key: [f"Hábito {i} para {goal}" for i in range(1, 4)] for key, goal in goals.items()},
+                ensure_ascii=False
+            )
+        if '"habits"' in prompt:
+            goal = re.search(r'Meta do usuário: "(.*)"', prompt)
+            goal_text = goal.group(1) if goal else "sua meta"
+            return json.dumps({"habits": [f"Hábito {i} para {goal_text}" for i in range(1, 4)]}, ensure_ascii=False)
+        return f"Resposta simulada para: {prompt[:80]}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in re.findall(r"\S+\s*", self._reply(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        # A latência é dividida entre o primeiro token e o restante da geração
+        await asyncio.sleep(self.latency / 2)
+        tokens = re.findall(r"\S+\s*", self._reply(messages))
+        for token in tokens:
+            await asyncio.sleep(self.latency / 2 / max(len(tokens), 1))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,92 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+
+from app.core.cache import FakeRedis, MemoryCacheBackend, RedisCacheBackend
+from app.core.config import settings
+
+Loader = Callable[[], Awaitable[Tuple[bytes, str]]]
+
+class HabitCache:
+    """
+    Cache read-through das respostas de hábitos já serializadas (JSON em bytes),
+    por parâmetros de consulta, entre o HabitService e o HabitRepository.
+
+    Invalidação por geração: cada namespace ("list" ou "habit:<id>") tem um contador
+    que entra na chave; invalidar = incrementar o contador (O(1), funciona igual no
+    backend local e no Redis). As entradas antigas expiram pelo TTL/LRU.
+    """
+
+    def __init__(self, backend: Any, ttl: float = 60.0, enabled: bool = True, prefix: str = "habits"):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.bypassed = 0
+
+    async def _key(self, namespace: str, params: Hashable) -> str:
+        generation = await self.backend.get(f"{self.prefix}:gen:{namespace}")
+        return f"{self.prefix}:{namespace}:g{int(generation or 0)}:{params}"
+
+    async def get_or_load(self, namespace: str, params: Hashable, loader: Loader) -> Tuple[bytes, str]:
+        """
+        Devolve (corpo, meta). 'meta' é um texto curto guardado junto ao corpo
+        (ex: o próximo cursor da paginação).
+        """
+        if not self.enabled:
+            self.bypassed += 1
+            return await loader()
+
+        key = await self._key(namespace, params)
+        stored = await self.backend.get(key)
+        if stored is not None:
+            self.hits += 1
+            meta, _, body = stored.partition(b"\n")
+            return body, meta.decode()
+
+        self.misses += 1
+        body, meta = await loader()
+        await self.backend.set(key, meta.encode() + b"\n" + body, ex=self.ttl)
+        return body, meta
+
+    async def invalidate(self, habit_ids: Iterable[int] = ()) -> None:
+        """ Toda escrita invalida as listas; as leituras individuais só dos hábitos afetados. """
+        if not self.enabled:
+            return
+        for namespace in ["list", *(f"habit:{i}" for i in habit_ids)]:
+            await self.backend.incr(f"{self.prefix}:gen:{namespace}")
+            self.invalidations += 1
+
+    async def aclose(self) -> None:
+        """ Libera as conexões do backend (Redis), no fim do lifespan. """
+        close = getattr(self.backend, "aclose", None)
+        if close is not None:
+            await close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "bypassed": self.bypassed,
+        }
+
+def create_habit_cache() -> HabitCache:
+    """ Backend escolhido em HABIT_CACHE_BACKEND ("memory", "redis" ou "fake-redis"). """
+    if settings.HABIT_CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis # Importado só com o backend Redis (está no requirements.txt)
+        except ImportError as e:
+            # Falha no startup (lifespan), com a causa clara, em vez de na primeira leitura
+            raise RuntimeError('HABIT_CACHE_BACKEND="redis" requer o pacote "redis" (pip install -r requirements.txt)') from e
+        backend: Any = RedisCacheBackend(redis.from_url(settings.HABIT_CACHE_REDIS_URL))
+    elif settings.HABIT_CACHE_BACKEND == "fake-redis":
+        backend = RedisCacheBackend(FakeRedis())
+    else:
+        backend = MemoryCacheBackend(maxsize=settings.HABIT_CACHE_MAX_ENTRIES, ttl=settings.HABIT_CACHE_TTL_SECONDS)
+    return HabitCache(backend, ttl=settings.HABIT_CACHE_TTL_SECONDS, enabled=settings.HABIT_CACHE_ENABLED)
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.habit_repository import HabitRepository
+from app.services.habit_cache import HabitCache
+from app.services.habit_service import HabitService
+
+logger = logging.getLogger(__name__)
+
+class HabitPurger:
+    """
+    Purge periódico dos hábitos arquivados (soft delete) há mais de 'purge_after'.
+    Apaga em lotes de 'batch_size' hábitos, cada um na sua transação, para não
+    segurar locks nem gerar um DELETE gigante quando há muito histórico.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[HabitCache] = None,
+        purge_after: timedelta = timedelta(days=30),
+        batch_size: int = 100,
+        max_batches: int = 50,
+        interval: float = 3600.0,
+    ):
+        self.cache = cache
+        self.purge_after = purge_after
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Dict[str, Any] = {}
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro no purge de hábitos arquivados")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        archived_before = (now or datetime.now(timezone.utc)) - self.purge_after
+        report: Dict[str, Any] = {"purged": 0, "batches": 0}
+
+        for _ in range(self.max_batches):
+            async with SessionLocal() as db:
+                service = HabitService(HabitRepository(db), cache=self.cache)
+                purged = await service.purge_archived(archived_before, self.batch_size)
+                await db.commit()
+
+            report["batches"] += 1
+            report["purged"] += len(purged)
+            if len(purged) < self.batch_size:
+                break
+
+        self.last_run = report
+        return report
+
+def create_habit_purger(cache: Optional[HabitCache] = None) -> HabitPurger:
+    return HabitPurger(
+        cache,
+        purge_after=timedelta(days=settings.HABIT_PURGE_AFTER_DAYS),
+        batch_size=settings.HABIT_PURGE_BATCH_SIZE,
+        max_batches=settings.HABIT_PURGE_MAX_BATCHES,
+        interval=settings.HABIT_PURGE_INTERVAL_SECONDS,
+    )
@@ -1,11 +1,21 @@
 from fastapi import HTTPException
-from app.repositories.habit_repository import HabitRepository
-from app.schemas.habit import HabitCreate, HabitRead
-from typing import List
-from app.models.habit import Habit, HabitLog
-from datetime import date
-from sqlalchemy import and_
-from sqlalchemy.future import select
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from app.repositories.habit_repository import HabitRepository, HABIT_ROW_FIELDS
+from app.core.broadcast import Broadcaster
+from app.db.session import run_after_commit
+from app.services.habit_cache import HabitCache
+from app.schemas.habit import (
+    HabitCreate, HabitRead, HabitToggleRead,
+    HabitBulkToggleResult, HabitBulkDeleteResult,
+    HabitChangeFeed, HabitChangeRead, HabitLogChangeRead, HabitRow, completion_summary
+)
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from app.models.habit import Habit
+from datetime import date, datetime
+
+_habit_row_adapter = TypeAdapter(HabitRow)
+_habit_rows_adapter = TypeAdapter(List[HabitRow])
 
 class HabitService:
     """
@@ -13,44 +23,288 @@ class HabitService:
     Coordena as operações e aplica validações lógicas.
     """
 
-    def __init__(self, repository: HabitRepository):
+    def __init__(
+        self,
+        repository: HabitRepository,
+        events: Optional[Broadcaster] = None,
+        cache: Optional[HabitCache] = None,
+        bitmaps_enabled: bool = False,
+        soft_delete: bool = False,
+    ):
         self.repository = repository
+        self.events = events
+        self.cache = cache
+        self.bitmaps_enabled = bitmaps_enabled # O toggle mantém habit_bitmaps no mesmo comando
+        self.soft_delete = soft_delete # Delete arquiva (is_active=False); o purge apaga depois
+
+    async def _invalidate(self, habit_ids: Iterable[int] = ()) -> None:
+        # Invalida já e de novo após o commit: uma leitura concorrente feita antes
+        # do commit não deixa uma versão antiga no cache
+        if self.cache is None:
+            return
+        habit_ids = list(habit_ids)
+        await self.cache.invalidate(habit_ids)
+        run_after_commit(self.repository.db, lambda: self.cache.invalidate(habit_ids))
+
+    def _emit(self, event_type: str, **data: Any) -> None:
+        # Eventos compactos para os clientes conectados, enviados só após o commit
+        if self.events is not None:
+            self.events.publish_after_commit(self.repository.db, {"type": event_type, **data})
+
+    def _emit_created(self, habit: Habit) -> None:
+        self._emit("habit.created", habit=HabitChangeRead.model_validate(habit).model_dump(mode="json"))
+
+    async def get_version(self) -> Tuple[int, datetime]:
+        """ Versão dos dados de hábitos, usada para ETag/Last-Modified. """
+        return await self.repository.get_version()
+
+    async def get_changes(self, since: int, limit: int = 100) -> HabitChangeFeed:
+        """
+        Delta-sync: só o que mudou depois do cursor. Várias mudanças da mesma
+        entidade são compactadas na última; upserts trazem o estado atual.
+        """
+        changes, cursor, has_more = await self.repository.get_changes(since, limit)
+
+        latest: Dict[Tuple[str, int], str] = {}
+        for change in changes:
+            latest[(change.entity, change.entity_id)] = change.op
+        deleted_habits = {i for (entity, i), op in latest.items() if entity == "habit" and op == "delete"}
+        habit_ids = [i for (entity, i), op in latest.items() if entity == "habit" and op == "upsert"]
+        log_ids = [i for (entity, i), op in latest.items() if entity == "log" and op == "upsert"]
+        deleted_logs = {i for (entity, i), op in latest.items() if entity == "log" and op == "delete"}
+
+        habits = await self.repository.get_habit_rows(habit_ids) if habit_ids else []
+        logs = await self.repository.get_log_rows(log_ids) if log_ids else []
+
+        # Linhas que já não existem (ou hábitos desativados) viram tombstones
+        active = [h for h in habits if h.is_active]
+        deleted_habits.update(set(habit_ids) - {h.id for h in active})
+        logs = [log for log in logs if log.habit_id not in deleted_habits]
+        deleted_logs.update(set(log_ids) - {log.id for log in logs})
+
+        return HabitChangeFeed(
+            cursor=cursor,
+            has_more=has_more,
+            habits=[HabitChangeRead.model_validate(h) for h in active],
+            logs=[HabitLogChangeRead.model_validate(log) for log in logs],
+            deleted_habits=sorted(deleted_habits),
+            deleted_logs=sorted(deleted_logs),
+        )
 
     async def create_new_habit(self, habit_data: HabitCreate) -> HabitRead:
         # Exemplo de regra de negócio: Não permitir hábitos duplicados (lógica futura)
         # Por enquanto, apenas delega a criação
-        return await self.repository.create(habit_data)
+        habit = await self.repository.create(habit_data)
+        await self._invalidate()
+        self._emit_created(habit)
+        return habit
+
+    async def create_habits_bulk(self, habits_data: List[HabitCreate]) -> List[HabitRead]:
+        habits = await self.repository.create_many(habits_data)
+        await self._invalidate()
+        for habit in habits:
+            self._emit_created(habit)
+        return habits
 
-    async def list_habits(self, skip: int = 0, limit: int = 100) -> List[HabitRead]:
-        return await self.repository.get_all(skip, limit)
+    async def list_habits(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> List[HabitRead]:
+        return await self.repository.get_all(skip, limit, after_id, logs_since, logs_until)
+
+    async def list_habit_fields(
+        self,
+        fields: List[str],
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        invalid = [f for f in fields if f not in HabitRead.model_fields]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalid)}")
+        return await self.repository.get_all_fields(fields, skip, limit, after_id, logs_since, logs_until)
     
-    async def get_habit(self, habit_id: int) -> HabitRead:
-        habit = await self.repository.get_by_id(habit_id)
+    async def _cached(self, namespace: str, params: tuple, loader) -> Tuple[bytes, str]:
+        if self.cache is None:
+            return await loader()
+        return await self.cache.get_or_load(namespace, params, loader)
+
+    async def list_habits_json(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+        version: Optional[int] = None,
+    ) -> Tuple[bytes, Optional[int]]:
+        """
+        Lista já serializada (JSON), via cache. Retorna (corpo, próximo cursor).
+        'version' é a versão lida na mesma sessão: entra na chave do cache para que
+        uma réplica atrasada nunca grave dados antigos sob uma versão mais nova.
+        """
+        async def load() -> Tuple[bytes, str]:
+            # Caminho rápido: tuplas do Core -> dicts -> JSON (sem ORM e sem validar de novo)
+            rows = await self.repository.get_all_fields(
+                [*HABIT_ROW_FIELDS, "logs"], skip, limit, after_id, logs_since, logs_until
+            )
+            return _habit_rows_adapter.dump_json(rows), str(rows[-1]["id"]) if len(rows) == limit else ""
+
+        # A data de hoje entra na chave: o resumo (completed_today, sequência) muda à meia-noite
+        body, cursor = await self._cached("list", (skip, limit, after_id, logs_since, logs_until, version, date.today()), load)
+        return body, int(cursor) if cursor else None
+
+    async def list_habit_fields_json(
+        self,
+        fields: List[str],
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+        version: Optional[int] = None,
+    ) -> Tuple[bytes, Optional[int]]:
+        async def load() -> Tuple[bytes, str]:
+            rows = await self.list_habit_fields(fields, skip, limit, after_id, logs_since, logs_until)
+            return to_json(rows), str(rows[-1]["id"]) if len(rows) == limit else ""
+
+        params = (tuple(fields), skip, limit, after_id, logs_since, logs_until, version, date.today())
+        body, cursor = await self._cached("list", params, load)
+        return body, int(cursor) if cursor else None
+
+    async def get_habit_json(
+        self,
+        habit_id: int,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+        version: Optional[int] = None,
+    ) -> bytes:
+        async def load() -> Tuple[bytes, str]:
+            row = await self.repository.get_row(habit_id, logs_since, logs_until)
+            if row is None: # 404 não é cacheado
+                raise HTTPException(status_code=404, detail="Hábito não encontrado")
+            return _habit_row_adapter.dump_json(row), ""
+
+        body, _ = await self._cached(f"habit:{habit_id}", (logs_since, logs_until, version, date.today()), load)
+        return body
+
+    async def get_habit(
+        self,
+        habit_id: int,
+        logs_since: Optional[date] = None,
+        logs_until: Optional[date] = None,
+    ) -> HabitRead:
+        habit = await self.repository.get_by_id(habit_id, logs_since=logs_since, logs_until=logs_until)
         if not habit:
             raise HTTPException(status_code=404, detail="Hábito não encontrado")
         return habit
     
-    async def toggle_habit(self, habit_id: int) -> Habit:
+    async def toggle_habit(self, habit_id: int, full: bool = False) -> Union[HabitToggleRead, Habit]:
         today = date.today()
-        
-        query = select(HabitLog).where(and_(HabitLog.habit_id == habit_id, HabitLog.completed_date == today))
 
-        result = await self.repository.db.execute(query)
-        existing_log = result.scalar_one_or_none()
+        toggled = await self.repository.toggle_log(habit_id, today, self.bitmaps_enabled)
+        if toggled is None:
+            raise HTTPException(status_code=404, detail="Hábito não encontrado")
+
+        await self._invalidate([habit_id])
+        result = self._toggle_result(habit_id, today, *toggled)
+        self._emit("habit.toggled", **result.model_dump(mode="json"))
+
+        if full:
+            # Resposta completa (hábito com todos os logs), mantida para compatibilidade
+            return await self.repository.get_by_id(habit_id)
+        return result
+    
+    async def toggle_habits_bulk(self, habit_ids: List[int], day: Optional[date] = None) -> HabitBulkToggleResult:
+        day = day or date.today()
+        ids = list(dict.fromkeys(habit_ids)) # Remove repetidos (mantém a ordem)
 
-        if existing_log:
-            await self.repository.db.delete(existing_log)
+        toggled = await self.repository.toggle_logs(ids, day, self.bitmaps_enabled)
+        await self._invalidate(toggled.keys())
+        results = [self._toggle_result(habit_id, day, *toggled[habit_id]) for habit_id in ids if habit_id in toggled]
+        for result in results:
+            self._emit("habit.toggled", **result.model_dump(mode="json"))
+        return HabitBulkToggleResult(results=results, not_found=[i for i in ids if i not in toggled])
+
+    @staticmethod
+    def _toggle_result(habit_id: int, day: date, log_id: Optional[int], summary: tuple) -> HabitToggleRead:
+        # Novo estado do dia e o resumo do hábito (mesmos campos de HabitRead), sem os logs
+        return HabitToggleRead(
+            habit_id=habit_id,
+            completed_date=day,
+            completed=log_id is not None,
+            log_id=log_id,
+            **completion_summary(*summary, date.today()),
+        )
+
+    async def _remove(self, habit_ids: List[int], hard: bool) -> List[int]:
+        if self.soft_delete and not hard:
+            removed = await self.repository.set_active_many(habit_ids, False)
         else:
-            new_log = HabitLog(habit_id=habit_id, completed_date=today)
-            self.repository.db.add(new_log)
+            removed = await self.repository.delete_many(habit_ids)
+        await self._invalidate(removed)
+        for habit_id in removed:
+            self._emit("habit.deleted", habit_id=habit_id)
+        return removed
 
-        await self.repository.db.commit()
+    async def delete_habits_bulk(self, habit_ids: List[int], hard: bool = False) -> HabitBulkDeleteResult:
+        ids = list(dict.fromkeys(habit_ids))
+        deleted = set(await self._remove(ids, hard))
+        return HabitBulkDeleteResult(
+            deleted=[i for i in ids if i in deleted],
+            not_found=[i for i in ids if i not in deleted]
+        )
 
-        return await self.repository.get_by_id(habit_id)
-    
-    async def delete_habit(self, habit_id: int):
-        habit = await self.repository.get_by_id(habit_id)
-        if not habit:
+    async def delete_habit(self, habit_id: int, hard: bool = False) -> None:
+        """
+        Remove o hábito sem carregá-lo: um único DELETE (cascade no banco) ou,
+        em modo soft delete, o arquivamento. hard=True apaga mesmo em modo soft.
+        """
+        if not await self._remove([habit_id], hard):
             raise HTTPException(status_code=404, detail="Hábito não encontrado")
 
-        await self.repository.delete(habit)
\ No newline at end of file
+    async def archive_habit(self, habit_id: int) -> None:
+        if not await self.repository.set_active_many([habit_id], False):
+            raise HTTPException(status_code=404, detail="Hábito não encontrado ou já arquivado")
+        await self._invalidate([habit_id])
+        self._emit("habit.deleted", habit_id=habit_id)
+
+    async def restore_habit(self, habit_id: int) -> None:
+        if not await self.repository.set_active_many([habit_id], True):
+            raise HTTPException(status_code=404, detail="Hábito não encontrado ou não arquivado")
+        await self._invalidate([habit_id])
+        # Os logs voltam junto: o cliente busca tudo pelo delta-sync
+        self._emit("habit.restored", habit_id=habit_id)
+
+    async def purge_archived(self, archived_before: datetime, limit: int) -> List[int]:
+        """ Apaga de vez um lote de hábitos arquivados (clientes já receberam o habit.deleted). """
+        purged = await self.repository.purge_archived(archived_before, limit)
+        await self._invalidate(purged)
+        return purged
+
+    async def repair_summaries(
+        self,
+        habit_ids: Optional[List[int]] = None,
+        after_id: int = 0,
+        limit: int = 500,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Confere o resumo de conclusões contra os logs e corrige o que divergiu: os
+        'habit_ids' dados, ou o lote de 'limit' hábitos depois de 'after_id'.
+        Retorna (conferidos, corrigidos).
+        """
+        locked = habit_ids is None
+        if habit_ids is None:
+            habit_ids = await self.repository.lock_ids_after(after_id, limit)
+        fixed = await self.repository.refresh_summaries(habit_ids, locked=locked)
+        if fixed:
+            # Nova versão (sem entradas no change log): ETags e caches das listas deixam de valer
+            await self.repository.record_changes([])
+            await self._invalidate(fixed)
+        return habit_ids, fixed
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.habit_repository import HabitRepository
+from app.services.habit_cache import HabitCache
+from app.services.habit_service import HabitService
+
+logger = logging.getLogger(__name__)
+
+class HabitSummaryRepair:
+    """
+    Verificação periódica do resumo de conclusões guardado em 'habits' (mantido
+    incrementalmente pelo toggle): recalcula a partir dos logs, em lotes de
+    'batch_size' hábitos por transação, e corrige só o que divergiu (ex: um toggle
+    concorrente num dia antigo, ou escrita direta no banco).
+    """
+
+    def __init__(
+        self,
+        cache: Optional[HabitCache] = None,
+        batch_size: int = 500,
+        interval: Optional[float] = 86400.0,
+    ):
+        self.cache = cache
+        self.batch_size = batch_size
+        self.interval = interval # None = só sob demanda (run_once)
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Dict[str, Any] = {}
+
+    async def start(self) -> None:
+        if self.interval is not None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            # Espera antes: o resumo já nasce consistente, não precisa varrer tudo a cada deploy
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro na verificação do resumo dos hábitos")
+
+    async def run_once(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"checked": 0, "fixed": 0, "batches": 0}
+        after_id = 0
+
+        while True:
+            async with SessionLocal() as db:
+                service = HabitService(HabitRepository(db), cache=self.cache)
+                checked, fixed = await service.repair_summaries(after_id=after_id, limit=self.batch_size)
+                await db.commit()
+
+            report["batches"] += 1
+            report["checked"] += len(checked)
+            report["fixed"] += len(fixed)
+            if len(checked) < self.batch_size:
+                break
+            after_id = checked[-1]
+
+        self.last_run = report
+        return report
+
+def create_habit_summary_repair(cache: Optional[HabitCache] = None) -> HabitSummaryRepair:
+    return HabitSummaryRepair(
+        cache,
+        batch_size=settings.HABIT_SUMMARY_REPAIR_BATCH_SIZE,
+        interval=settings.HABIT_SUMMARY_REPAIR_INTERVAL_SECONDS,
+    )
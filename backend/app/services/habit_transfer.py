@@ -0,0 +1,258 @@
+import codecs
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.db.session import SessionLocal, ReadSessionLocal
+from app.models.habit import HabitImport
+from app.repositories.bitmap_repository import BitmapRepository
+from app.repositories.habit_repository import HabitRepository
+from app.repositories.transfer_repository import TransferRepository
+from app.schemas.habit import HabitExportHabit, HabitExportLog, HabitExportRecord, HabitImportRead
+from app.services.habit_cache import HabitCache
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_FIELDS = ["type", "id", "name", "description", "created_at", "is_active", "habit_id", "completed_date"]
+
+_record_adapter = TypeAdapter(HabitExportRecord)
+
+def _ndjson_chunk(records: List[Dict[str, Any]]) -> bytes:
+    return b"".join(to_json(record) + b"\n" for record in records)
+
+def _csv_chunk(records: List[Dict[str, Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    for record in records:
+        writer.writerow({k: ("true" if v is True else "false" if v is False else v) for k, v in record.items()})
+    return buffer.getvalue().encode()
+
+async def export_stream(format: str, chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    """
+    Exporta todos os hábitos e logs (inclusive anos arquivados) em NDJSON ou CSV.
+    Um bloco de bytes por lote do cursor: a memória não cresce com o histórico.
+    Roda numa transação REPEATABLE READ própria (snapshot consistente entre hábitos
+    e logs) na réplica de leitura, fora da sessão da requisição, que termina antes
+    do corpo ser enviado.
+    """
+    encode = _ndjson_chunk if format == "ndjson" else _csv_chunk
+    if format == "csv":
+        yield _csv_chunk([], header=True)
+
+    async with ReadSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        repository = TransferRepository(db)
+
+        async for rows in repository.stream_habits(chunk_size):
+            yield encode([
+                {"type": "habit", "id": id, "name": name, "description": description,
+                 "created_at": created_at.isoformat() if created_at else None, "is_active": is_active}
+                for id, name, description, created_at, is_active in rows
+            ])
+
+        async for rows in repository.stream_logs(chunk_size):
+            yield encode([
+                {"type": "log", "habit_id": habit_id, "completed_date": completed_date.isoformat()}
+                for habit_id, completed_date in rows
+            ])
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """ Linhas do corpo enviado (com a quebra de linha), decodificando aos poucos (UTF-8, BOM opcional). """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def parse_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    (número do registro, dict cru) conforme o corpo chega. No CSV, um registro pode
+    ocupar várias linhas (campo entre aspas com quebra de linha): as linhas são
+    acumuladas até as aspas fecharem e só então passam pelo leitor de CSV.
+    """
+    number = 0
+    if format == "ndjson":
+        async for line in _lines(chunks):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Registro {number}: JSON inválido ({e.msg})")
+        return
+
+    header: Optional[List[str]] = None
+    buffered: List[str] = []
+    quotes = 0
+    async for line in _lines(chunks):
+        buffered.append(line)
+        quotes += line.count('"')
+        if quotes % 2: # Campo entre aspas continua na próxima linha
+            continue
+        for row in csv.reader(buffered):
+            if not row:
+                continue
+            if header is None:
+                header = row
+                continue
+            number += 1
+            # CSV não tem null: campos vazios ficam de fora (valem os padrões do schema)
+            yield number, {k: v for k, v in zip(header, row) if v != ""}
+        buffered, quotes = [], 0
+    if buffered:
+        raise ValueError(f"Registro {number + 1}: aspas não fechadas no CSV")
+
+class HabitImporter:
+    """
+    Importação em lotes: cada lote de 'batch_size' registros é gravado numa
+    transação própria (INSERT multi-linha de hábitos, INSERT ... SELECT unnest
+    dos logs) junto com o progresso. Se algo falhar, os lotes anteriores ficam;
+    reenviar o arquivo com o id da importação retoma de onde parou.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[HabitCache] = None,
+        bitmaps_enabled: bool = True,
+        batch_size: int = 1000,
+        stale_after: timedelta = timedelta(minutes=5),
+    ):
+        self.cache = cache
+        self.bitmaps_enabled = bitmaps_enabled
+        self.batch_size = batch_size
+        self.stale_after = stale_after
+
+    async def get(self, import_id: int) -> HabitImportRead:
+        async with SessionLocal() as db:
+            habit_import = await TransferRepository(db).get_import(import_id)
+        if habit_import is None:
+            raise HTTPException(status_code=404, detail="Importação não encontrada")
+        return HabitImportRead.model_validate(habit_import)
+
+    async def _start(self, format: str, import_id: Optional[int]) -> Tuple[HabitImport, Dict[int, int]]:
+        async with SessionLocal() as db:
+            repository = TransferRepository(db)
+            if import_id is None:
+                habit_import = await repository.create_import(format)
+                id_map: Dict[int, int] = {}
+            else:
+                habit_import = await repository.claim_import(import_id, self.stale_after)
+                if habit_import is None:
+                    existing = await repository.get_import(import_id)
+                    if existing is None:
+                        raise HTTPException(status_code=404, detail="Importação não encontrada")
+                    raise HTTPException(status_code=409, detail=f"Importação {import_id} está '{existing.status}' e não pode ser retomada")
+                if habit_import.format != format:
+                    raise HTTPException(status_code=400, detail=f"A importação {import_id} foi iniciada em {habit_import.format}")
+                id_map = await repository.get_id_map(import_id)
+            await db.commit()
+        return habit_import, id_map
+
+    async def run(self, chunks: AsyncIterator[bytes], format: str, import_id: Optional[int] = None) -> HabitImportRead:
+        habit_import, id_map = await self._start(format, import_id)
+        skip = habit_import.records_done # Retomada: registros já gravados são pulados
+        started = time.perf_counter()
+        processed = 0
+        batch: List[Any] = []
+        error: Optional[str] = None
+
+        try:
+            async for number, raw in parse_records(chunks, format):
+                if number <= skip:
+                    continue
+                try:
+                    batch.append(_record_adapter.validate_python(raw))
+                except ValidationError as e:
+                    first = e.errors()[0]
+                    raise ValueError(f"Registro {number}: {'.'.join(map(str, first['loc']))}: {first['msg']}")
+                if len(batch) >= self.batch_size:
+                    await self._write(habit_import.id, batch, id_map)
+                    processed += len(batch)
+                    batch = []
+            if batch:
+                await self._write(habit_import.id, batch, id_map)
+                processed += len(batch)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+
+        async with SessionLocal() as db:
+            finished = await TransferRepository(db).finish(habit_import.id, "failed" if error else "completed", error)
+            await db.commit()
+
+        seconds = time.perf_counter() - started
+        result = HabitImportRead.model_validate(finished).model_copy(update={
+            "records_this_run": processed,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(processed / seconds, 1) if seconds > 0 else None,
+        })
+        if error:
+            # Os lotes já gravados ficam; o corpo traz o id para retomar
+            raise HTTPException(status_code=422, detail=result.model_dump(mode="json"))
+        return result
+
+    async def _write(self, import_id: int, batch: List[Any], id_map: Dict[int, int]) -> None:
+        habits = [r for r in batch if isinstance(r, HabitExportHabit)]
+        logs = [r for r in batch if isinstance(r, HabitExportLog)]
+        skipped = 0
+
+        async with SessionLocal() as db:
+            repository = TransferRepository(db)
+            batch_map: Dict[int, int] = {}
+            if habits:
+                now = datetime.now(timezone.utc)
+                # Id repetido no arquivo: vale o primeiro
+                new_habits = {h.id: h for h in reversed(habits) if h.id not in id_map}
+                if new_habits:
+                    batch_map = await repository.insert_habits(import_id, [
+                        {"id": h.id, "name": h.name, "description": h.description,
+                         "created_at": h.created_at or now, "is_active": h.is_active}
+                        for h in reversed(new_habits.values())
+                    ])
+                skipped += len(habits) - len(batch_map)
+
+            known = {**id_map, **batch_map}
+            rows = [(known[log.habit_id], log.completed_date) for log in logs if log.habit_id in known]
+            inserted = await repository.insert_logs(rows) if rows else []
+            skipped += len(logs) - len(inserted) # Sem hábito de origem ou dia já existente
+
+            changes = [("habit", i, i, "upsert") for i in batch_map.values()]
+            changes += [("log", log_id, habit_id, "upsert") for log_id, habit_id in inserted]
+            habits_repository = HabitRepository(db)
+            if changes:
+                await habits_repository.record_changes(changes)
+            logged = sorted({habit_id for _, habit_id in inserted})
+            if logged:
+                # Resumo de conclusões (último dia, sequência, total) a partir dos logs importados
+                await habits_repository.refresh_summaries(logged)
+            touched = sorted(set(batch_map.values()) | set(logged))
+            if touched and self.bitmaps_enabled:
+                await BitmapRepository(db).rebuild(touched)
+
+            await repository.advance(import_id, len(batch), len(batch_map), len(inserted), skipped)
+            await db.commit()
+
+        id_map.update(batch_map)
+        if self.cache is not None and touched:
+            await self.cache.invalidate(touched)
+
+def create_habit_importer(cache: Optional[HabitCache] = None) -> HabitImporter:
+    return HabitImporter(
+        cache,
+        bitmaps_enabled=settings.HABIT_BITMAPS_ENABLED,
+        batch_size=settings.HABIT_IMPORT_BATCH_SIZE,
+    )
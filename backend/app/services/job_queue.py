@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.ai import AIJob
+from app.repositories.job_repository import JobRepository
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+class QueueFullError(Exception):
+    """A fila atingiu o limite de jobs pendentes."""
+    pass
+
+class AIJobQueue:
+    """
+    Pool de workers in-process sobre a fila durável 'ai_jobs'.
+    Os jobs sobrevivem a reinícios; cada worker executa um job por vez,
+    com timeout por job e novas tentativas com backoff exponencial.
+    Jobs "running" de um processo que morreu voltam para a fila periodicamente
+    (a cada 'timeout' segundos, pelo primeiro worker que passar pelo loop), com
+    backoff, ou falham se já esgotaram as tentativas.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        workers: int = 4,
+        timeout: float = 60.0,
+        max_attempts: int = 3,
+        retry_base: float = 2.0,
+        poll_interval: float = 1.0,
+        max_queued: int = 1000,
+    ):
+        self.handlers = handlers
+        self.workers = workers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.max_queued = max_queued
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.requeued = 0
+        self._next_requeue = 0.0 # Primeira verificação logo no início
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any], priority: int = 0) -> AIJob:
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+
+        async with SessionLocal() as db:
+            repository = JobRepository(db)
+            if await repository.count_queued() >= self.max_queued:
+                raise QueueFullError("Fila de IA cheia, tente novamente em instantes")
+            job = await repository.enqueue(kind, payload, priority, self.max_attempts)
+            await db.commit()
+
+        # Commit feito: acorda um worker em vez de esperar o próximo poll
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: int) -> Optional[AIJob]:
+        async with SessionLocal() as db:
+            return await JobRepository(db).get(job_id)
+
+    async def metrics(self) -> Dict[str, Any]:
+        async with SessionLocal() as db:
+            by_status = await JobRepository(db).counts_by_status()
+        return {
+            "queue_depth": by_status.get("queued", 0),
+            "by_status": by_status,
+            "workers": self.workers,
+            "running_here": self.running,
+            "processed_here": self.processed,
+            "failed_here": self.failed,
+            "retried_here": self.retried,
+            "requeued_here": self.requeued,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                await self._requeue_stale()
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro na fila de jobs")
+                job = None
+
+            if job is None:
+                await self._wait()
+                continue
+
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao finalizar job %s", job.id)
+
+    async def _wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _requeue_stale(self) -> None:
+        # Jobs "running" há mais de 2x o timeout: o worker que os pegou morreu ou travou
+        now = time.monotonic()
+        if now < self._next_requeue:
+            return
+        self._next_requeue = now + self.timeout # Antes do await: os outros workers não repetem
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.timeout * 2)
+        async with SessionLocal() as db:
+            requeued, failed = await JobRepository(db).requeue_stale(stale_before, self.retry_base)
+            await db.commit()
+        self.failed += failed
+        if requeued:
+            self.requeued += requeued
+            self._wakeup.set()
+
+    async def _claim(self) -> Optional[AIJob]:
+        async with SessionLocal() as db:
+            job = await JobRepository(db).claim_next()
+            await db.commit()
+            return job
+
+    async def _run(self, job: AIJob) -> None:
+        self.running += 1
+        try:
+            result = await asyncio.wait_for(self.handlers[job.kind](job.payload), self.timeout)
+        except asyncio.CancelledError:
+            await asyncio.shield(self._update(lambda repo: repo.release(job.id)))
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if job.attempts < job.max_attempts:
+                self.retried += 1
+                delay = self.retry_base * 2 ** (job.attempts - 1)
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            else:
+                self.failed += 1
+                retry_at = None
+            await self._update(lambda repo: repo.mark_failed(job.id, error, retry_at))
+        else:
+            self.processed += 1
+            await self._update(lambda repo: repo.mark_succeeded(job.id, result))
+        finally:
+            self.running -= 1
+
+    async def _update(self, operation: Callable[[JobRepository], Awaitable[None]]) -> None:
+        async with SessionLocal() as db:
+            await operation(JobRepository(db))
+            await db.commit()
+
+def create_job_queue(handlers: Dict[str, JobHandler]) -> AIJobQueue:
+    return AIJobQueue(
+        handlers,
+        workers=settings.AI_JOB_WORKERS,
+        timeout=settings.AI_JOB_TIMEOUT_SECONDS,
+        max_attempts=settings.AI_JOB_MAX_ATTEMPTS,
+        retry_base=settings.AI_JOB_RETRY_BASE_SECONDS,
+        poll_interval=settings.AI_JOB_POLL_SECONDS,
+        max_queued=settings.AI_JOB_MAX_QUEUED,
+    )
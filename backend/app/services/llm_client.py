@@ -0,0 +1,219 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import record_llm_call
+
+class LLMUnavailableError(Exception):
+    """Provedor de IA indisponível: circuito aberto, fila cheia ou timeout."""
+    pass
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples (closed -> open -> half-open).
+    Após N falhas seguidas, rejeita chamadas imediatamente por 'reset_timeout'
+    segundos; depois libera uma única chamada de teste.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """ O teste do half-open terminou sem resultado (cancelado, abandonado): a próxima chamada testa. """
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class LLMClient:
+    """
+    Cliente de LLM de longa duração (um por processo, criado no lifespan da app).
+    Reaproveita o mesmo modelo/conexões HTTP e protege o event loop com:
+    limite de chamadas simultâneas, timeout por chamada e circuit breaker.
+    Aceita o modelo pronto ou uma factory; com factory, o modelo só é criado
+    na primeira chamada (a app sobe mesmo sem credenciais do provedor).
+    """
+
+    def __init__(
+        self,
+        llm: Any = None,
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        queue_timeout: float = 10.0,
+        breaker: Optional[CircuitBreaker] = None,
+        llm_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self._llm = llm
+        self._llm_factory = llm_factory
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+    @property
+    def llm(self) -> Any:
+        if self._llm is None:
+            self._llm = self._llm_factory()
+        return self._llm
+
+    async def _acquire(self) -> bool:
+        """
+        Reserva uma vaga. A vaga de teste do half-open só é tomada depois do
+        semáforo, então um timeout na fila não a prende. Retorna True se esta
+        chamada é o teste (quem chamou devolve em _release).
+        """
+        if self.breaker.state == "open":
+            raise LLMUnavailableError("Serviço de IA temporariamente indisponível")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError("Muitas requisições à IA em andamento")
+        probe = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            self._semaphore.release()
+            raise LLMUnavailableError("Serviço de IA temporariamente indisponível")
+        self.in_flight += 1
+        return probe
+
+    def _release(self, probe: bool) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+        if probe:
+            # Sem record_success/record_failure antes (cancelamento, stream abandonado): libera o teste
+            self.breaker.release_probe()
+
+    async def _acquire_measured(self, call: str) -> bool:
+        try:
+            return await self._acquire()
+        except LLMUnavailableError:
+            record_llm_call(call, "rejected", 0.0)
+            raise
+
+    async def ainvoke(self, messages: Any) -> Any:
+        probe = await self._acquire_measured("invoke")
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.llm.ainvoke(messages), self.timeout)
+            self.breaker.record_success()
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            record_llm_call("invoke", "timeout", time.perf_counter() - start)
+            raise LLMUnavailableError("Tempo limite da IA excedido")
+        except asyncio.CancelledError:
+            record_llm_call("invoke", "cancelled", time.perf_counter() - start)
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            record_llm_call("invoke", "error", time.perf_counter() - start)
+            raise
+        finally:
+            self._release(probe)
+
+        record_llm_call("invoke", "ok", time.perf_counter() - start, getattr(response, "usage_metadata", None))
+        return response
+
+    async def astream(self, messages: Any, usage: Optional[dict] = None) -> AsyncIterator[Any]:
+        """
+        Repassa os chunks do modelo à medida que chegam. O timeout vale para
+        cada chunk (inclusive o primeiro). Se o consumidor parar de iterar
+        (ex: cliente desconectou), o stream do provedor é fechado e a vaga liberada.
+        O uso informado pelo provedor é somado em 'usage' (se passado) durante o stream.
+        """
+        probe = await self._acquire_measured("stream")
+        start = time.perf_counter()
+        outcome = "cancelled" # Consumidor parou antes do fim
+        usage = {} if usage is None else usage
+        try:
+            stream = self.llm.astream(messages)
+        except Exception:
+            self.breaker.record_failure()
+            self._release(probe)
+            record_llm_call("stream", "error", time.perf_counter() - start)
+            raise
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self.breaker.record_failure()
+                    outcome = "timeout"
+                    raise LLMUnavailableError("Tempo limite da IA excedido")
+                except Exception:
+                    self.breaker.record_failure()
+                    outcome = "error"
+                    raise
+                # Provedores informam o uso no último chunk ou somado ao longo do stream
+                for kind, count in (getattr(chunk, "usage_metadata", None) or {}).items():
+                    if isinstance(count, int):
+                        usage[kind] = usage.get(kind, 0) + count
+                yield chunk
+            self.breaker.record_success()
+            outcome = "ok"
+        finally:
+            await stream.aclose()
+            self._release(probe)
+            record_llm_call("stream", outcome, time.perf_counter() - start, usage)
+
+    async def aclose(self) -> None:
+        close = getattr(self._llm, "aclose", None)
+        if close is not None:
+            await close()
+
+def build_chat_model() -> Any:
+    """Instancia o modelo configurado em LLM_PROVIDER ("gemini" ou "fake")."""
+    if settings.LLM_PROVIDER == "fake":
+        from app.services.fake_llm import FakeChatModel
+        return FakeChatModel(latency=settings.FAKE_LLM_LATENCY_SECONDS)
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=settings.LLM_MODEL,
+        google_api_key=settings.GEMINI_API_KEY,
+        temperature=settings.LLM_TEMPERATURE
+    )
+
+def create_llm_client(llm: Any = None) -> LLMClient:
+    return LLMClient(
+        llm,
+        llm_factory=build_chat_model,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS,
+        ),
+    )
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.habit_repository import HabitRepository
+from app.repositories.partition_repository import PartitionRepository
+from app.services.habit_cache import HabitCache
+
+logger = logging.getLogger(__name__)
+
+class LogPartitionManager:
+    """
+    Manutenção periódica das partições anuais de 'habit_logs':
+    cria as partições dos próximos anos (e dos anos que caíram na DEFAULT)
+    e, se houver retenção configurada, arquiva os anos antigos.
+    Com vários workers, só um executa por vez (advisory lock).
+
+    O arquivamento tira logs das leituras de hábitos: os hábitos afetados entram
+    no change log (versão/ETag) na mesma transação e saem do cache.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[HabitCache] = None,
+        years_ahead: int = 1,
+        retention_years: Optional[int] = None,
+        interval: float = 86400.0,
+    ):
+        self.cache = cache
+        self.years_ahead = years_ahead
+        self.retention_years = retention_years
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Dict[str, Any] = {}
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro na manutenção das partições de habit_logs")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        current = (today or date.today()).year
+        report: Dict[str, Any] = {"created": [], "archived_years": [], "archived_logs": 0, "archived_habits": 0}
+        affected = set()
+
+        async with SessionLocal() as db:
+            repository = PartitionRepository(db)
+            if not await repository.try_lock():
+                return {"skipped": "manutenção em andamento em outro processo"}
+
+            existing = await repository.list_partitions()
+            wanted = set(range(current, current + self.years_ahead + 1))
+            wanted.update(await repository.default_years())
+
+            if self.retention_years is not None:
+                cutoff = current - self.retention_years + 1 # Primeiro ano mantido "quente"
+                wanted = {y for y in wanted if y >= cutoff}
+                for year in sorted(y for y in existing if y < cutoff):
+                    archived, habit_ids = await repository.archive_partition(year, existing[year])
+                    report["archived_logs"] += archived
+                    report["archived_years"].append(year)
+                    affected.update(habit_ids)
+                archived, habit_ids = await repository.archive_default_before(cutoff)
+                report["archived_logs"] += archived
+                affected.update(habit_ids)
+
+            for year in sorted(wanted - set(existing)):
+                await repository.create_partition(year)
+                report["created"].append(year)
+
+            if affected:
+                await HabitRepository(db).record_changes([("habit", i, i, "upsert") for i in sorted(affected)])
+                report["archived_habits"] = len(affected)
+            await db.commit()
+
+        if affected and self.cache is not None:
+            await self.cache.invalidate(affected)
+
+        self.last_run = report
+        return report
+
+def create_partition_manager(cache: Optional[HabitCache] = None) -> LogPartitionManager:
+    return LogPartitionManager(
+        cache,
+        years_ahead=settings.HABIT_LOGS_PARTITIONS_AHEAD_YEARS,
+        retention_years=settings.HABIT_LOGS_RETENTION_YEARS,
+        interval=settings.HABIT_LOGS_MAINTENANCE_INTERVAL_SECONDS,
+    )
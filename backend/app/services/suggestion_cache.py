@@ -0,0 +1,99 @@
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.cache import LRUCache, SingleFlight
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.ai_cache_repository import AICacheRepository
+from app.schemas.ai import AIResponse
+
+def normalize_goal(goal: str) -> str:
+    """
+    Gera a chave do cache: sem acentos, minúsculas, espaços e pontuação final normalizados.
+    Ex: "  Correr uma MARATONA! " -> "correr uma maratona"
+    """
+    text = unicodedata.normalize("NFKD", goal)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.strip(" .!?;,")[:500]
+
+class SuggestionCache:
+    """
+    Cache de sugestões da IA em duas camadas: LRU em memória (com TTL) e,
+    opcionalmente, uma tabela no Postgres. Requisições concorrentes para a
+    mesma meta são coalescidas em uma única chamada ao LLM.
+    Apenas respostas válidas chegam aqui; erros são propagados e nunca cacheados.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400.0, persistent: bool = False):
+        self.ttl = ttl
+        self.persistent = persistent
+        self._memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, goal: str, compute: Callable[[], Awaitable[AIResponse]]) -> AIResponse:
+        key = normalize_goal(goal)
+
+        habits = self._memory.get(key)
+        if habits is not None:
+            self.hits += 1
+            return AIResponse(habits=list(habits))
+
+        if self._flight.is_inflight(key):
+            self.coalesced += 1
+
+        habits = await self._flight.do(key, lambda: self._load(key, goal, compute))
+        return AIResponse(habits=list(habits))
+
+    async def _load(self, key: str, goal: str, compute: Callable[[], Awaitable[AIResponse]]) -> tuple:
+        if self.persistent:
+            stored = await self._read_persistent(key)
+            if stored is not None:
+                self.persistent_hits += 1
+                self._memory.set(key, tuple(stored))
+                return tuple(stored)
+
+        self.misses += 1
+        response = await compute()
+        habits = tuple(response.habits)
+        self._memory.set(key, habits)
+        if self.persistent:
+            await self._write_persistent(key, goal, list(habits))
+        return habits
+
+    async def _read_persistent(self, key: str):
+        newer_than = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        async with SessionLocal() as session:
+            return await AICacheRepository(session).get(key, newer_than)
+
+    async def _write_persistent(self, key: str, goal: str, habits: List[str]) -> None:
+        async with SessionLocal() as session:
+            await AICacheRepository(session).save(key, goal, habits)
+            await session.commit()
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._memory),
+            "hit_ratio": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+def create_suggestion_cache() -> SuggestionCache:
+    return SuggestionCache(
+        maxsize=settings.AI_CACHE_MAX_ENTRIES,
+        ttl=settings.AI_CACHE_TTL_SECONDS,
+        persistent=settings.AI_CACHE_PERSISTENT,
+    )
@@ -0,0 +1,187 @@
+"""
+Teste de carga dos endpoints principais com LLM falso e latência controlada.
+
+Para cada endpoint e nível de concorrência, dispara --requests requisições com
+--concurrency clientes simultâneos e mede p50/p95/p99, vazão, erros e SQLs por
+requisição (diferença do db_queries_total de /metrics antes e depois da fase).
+O resultado sai em JSON; com --compare, compara com uma execução anterior e
+termina com código 1 se algum endpoint piorou além de --tolerance.
+
+Sem --url, a app roda no próprio processo (httpx + ASGITransport, com o
+lifespan) usando LLM_PROVIDER=fake. Com --url, mira um servidor já no ar
+(que deve estar com LLM_PROVIDER=fake para medir só a app).
+
+Uso (na pasta backend, com o banco populado por benchmarks.seed):
+    python -m benchmarks.load --concurrency 1,8,32 --requests 200 --llm-latency 0.2 --output run.json
+    python -m benchmarks.load --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# (método, path de exemplo, rota em /metrics, corpo)
+ENDPOINTS: Dict[str, Tuple[str, Callable[[random.Random, List[int]], str], str, Callable[[random.Random], Any]]] = {
+    "list": ("GET", lambda rng, ids: "/api/habits/", "/api/habits/", lambda rng: None),
+    "toggle": ("POST", lambda rng, ids: f"/api/habits/{rng.choice(ids)}/toggle", "/api/habits/{habit_id}/toggle", lambda rng: None),
+    # use_cache=false: toda sugestão passa pelo LLM (o cache mediria só o Postgres)
+    "suggest": ("POST", lambda rng, ids: "/api/ai/suggest?use_cache=false", "/api/ai/suggest", lambda rng: {"goal": f"Meta {rng.randint(1, 10_000)}"}),
+    "chat": ("POST", lambda rng, ids: "/api/ai/chat", "/api/ai/chat", lambda rng: {"messages": [{"role": "user", "content": f"Dica {rng.randint(1, 10_000)}"}]}),
+}
+
+METRIC_LINE = re.compile(r'^db_queries_total\{route="(?P<route>[^"]*)"\} (?P<value>\S+)$', re.MULTILINE)
+
+def percentile(samples: List[float], p: int) -> Optional[float]:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[p - 1]
+
+async def query_counts(client: httpx.AsyncClient) -> Optional[Dict[str, float]]:
+    """ db_queries_total por rota; None se /metrics estiver desligado. """
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return None
+    return {m["route"]: float(m["value"]) for m in METRIC_LINE.finditer(response.text)}
+
+async def run_phase(client: httpx.AsyncClient, endpoint: str, concurrency: int, requests: int, habit_ids: List[int], seed: int) -> Dict[str, Any]:
+    method, path, route, body = ENDPOINTS[endpoint]
+    rng = random.Random(f"{seed}-{endpoint}-{concurrency}")
+    plan = [(path(rng, habit_ids), body(rng)) for _ in range(requests)]
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def worker() -> None:
+        while plan:
+            url, payload = plan.pop()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=payload)
+                outcome = None if response.status_code < 400 else str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = e.__class__.__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            if outcome:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    before = await query_counts(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await query_counts(client)
+
+    queries = None
+    if before is not None and after is not None:
+        queries = round((after.get(route, 0) - before.get(route, 0)) / requests, 2)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        },
+        "queries_per_request": queries,
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """ Regressões em relação à execução base: p95 maior, vazão menor ou mais SQLs por requisição. """
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get((result["endpoint"], result["concurrency"]))
+        if base is None:
+            continue
+        name = f"{result['endpoint']} c={result['concurrency']}"
+        if result["latency_ms"]["p95"] > base["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['latency_ms']['p95']} -> {result['latency_ms']['p95']} ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: vazão {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if None not in (result["queries_per_request"], base["queries_per_request"]) and result["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(f"{name}: SQLs/req {base['queries_per_request']} -> {result['queries_per_request']}")
+    return regressions
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, timeout=args.timeout))
+        else:
+            from app.main import app # Importado aqui: as variáveis do LLM falso precisam vir antes
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            client = await stack.enter_async_context(httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout))
+
+        habits = (await client.get("/api/habits/", params={"limit": 500, "fields": "id"})).json()
+        habit_ids = [h["id"] for h in habits]
+        if not habit_ids and "toggle" in args.endpoints:
+            raise SystemExit("Nenhum hábito no banco: rode antes python -m benchmarks.seed")
+
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                await run_phase(client, endpoint, concurrency, min(args.warmup, args.requests), habit_ids, args.seed) # Aquecimento
+                results.append(await run_phase(client, endpoint, concurrency, args.requests, habit_ids, args.seed))
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+    return {
+        "config": {
+            "target": args.url or "in-process",
+            "llm_latency_seconds": None if args.url else args.llm_latency,
+            "requests": args.requests,
+            "habits": len(habit_ids),
+        },
+        "results": results,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor já no ar (ex: http://localhost:8000); sem ele, a app roda no processo")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=list(ENDPOINTS), help=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requisições por endpoint e nível de concorrência")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="latência do LLM falso, em segundos")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="grava o JSON neste arquivo")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora relativa aceita na comparação")
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"endpoints desconhecidos: {', '.join(sorted(unknown))}")
+    if not args.url:
+        os.environ["LLM_PROVIDER"] = "fake"
+        os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+        os.environ["AI_JOBS_ENABLED"] = "false"
+
+    report = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report["results"], json.load(f)["results"], args.tolerance)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
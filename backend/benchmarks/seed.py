@@ -0,0 +1,97 @@
+"""
+Massa de dados determinística para os benchmarks: N hábitos com X anos de
+histórico em habit_logs (cada dia concluído com probabilidade --rate).
+
+APAGA os hábitos, logs, bitmaps e o feed de mudanças do banco configurado
+(POSTGRES_*). Use só em banco de teste.
+
+Uso (na pasta backend):
+    python -m benchmarks.seed --habits 200 --years 3 --rate 0.6 --seed 42
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Date, Integer, bindparam, func, insert, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db.session import SessionLocal, close_database
+from app.models.habit import Habit, HabitLog
+from app.repositories.bitmap_repository import BitmapRepository
+from app.repositories.habit_repository import HabitRepository
+from app.services.log_partitions import LogPartitionManager
+
+RESET_SQL = "TRUNCATE habits, habit_logs, habit_logs_archive, habit_bitmaps, habit_changes, table_versions RESTART IDENTITY CASCADE"
+
+def build_logs(habit_ids: List[int], years: int, rate: float, rng: random.Random, today: date) -> List[tuple]:
+    """ (habit_id, dia) concluídos nos últimos 'years' anos; a ordem das chamadas ao rng fixa o resultado. """
+    start = today - timedelta(days=365 * years - 1)
+    days = [start + timedelta(days=i) for i in range((today - start).days + 1)]
+    return [(habit_id, day) for habit_id in habit_ids for day in days if rng.random() < rate]
+
+async def seed(habits: int, years: int, rate: float, seed: int = 42, chunk_size: int = 50_000, today: Optional[date] = None) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    today = today or date.today()
+    started = time.perf_counter()
+
+    async with SessionLocal() as db:
+        await db.execute(text(RESET_SQL))
+        result = await db.execute(
+            insert(Habit).returning(Habit.id, sort_by_parameter_order=True),
+            [{"name": f"Hábito {i}", "description": f"Hábito de benchmark {i}", "is_active": True} for i in range(1, habits + 1)],
+        )
+        habit_ids = list(result.scalars())
+
+        logs = build_logs(habit_ids, years, rate, rng, today)
+        rows = select(
+            func.unnest(bindparam("habit_ids", type_=ARRAY(Integer))),
+            func.unnest(bindparam("dates", type_=ARRAY(Date))),
+        )
+        stmt = insert(HabitLog.__table__).from_select(["habit_id", "completed_date"], rows)
+        for i in range(0, len(logs), chunk_size):
+            chunk = logs[i:i + chunk_size]
+            await db.execute(stmt, {"habit_ids": [h for h, _ in chunk], "dates": [d for _, d in chunk]})
+        await db.commit()
+
+    # Anos antigos caem na partição DEFAULT: a manutenção cria as partições anuais e move as linhas
+    partitions = await LogPartitionManager().run_once(today)
+
+    async with SessionLocal() as db:
+        bitmaps = await BitmapRepository(db).rebuild()
+        await HabitRepository(db).refresh_summaries(habit_ids) # Resumo de conclusões (logs gravados direto)
+        await db.execute(text("ANALYZE habits, habit_logs, habit_bitmaps"))
+        await db.commit()
+
+    return {
+        "habits": len(habit_ids),
+        "logs": len(logs),
+        "years": years,
+        "rate": rate,
+        "seed": seed,
+        "bitmaps": bitmaps,
+        "partitions_created": partitions.get("created", []),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--habits", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3, help="anos de histórico por hábito")
+    parser.add_argument("--rate", type=float, default=0.6, help="probabilidade de um dia estar concluído")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    async def run() -> Dict[str, Any]:
+        try:
+            return await seed(args.habits, args.years, args.rate, args.seed)
+        finally:
+            await close_database()
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark da serialização de GET /api/habits/ (sem banco).
+
+Compara o caminho antigo (objetos ORM -> HabitRead via from_attributes ->
+dump em modo JSON -> json.dumps, como o FastAPI faz com response_model)
+com o caminho rápido (tuplas do Core -> dicts -> TypeAdapter.dump_json).
+
+Uso (na pasta backend):
+    python -m benchmarks.serialization --habits 50 --logs 1000 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.models.habit import Habit, HabitLog
+from app.repositories.habit_repository import group_logs
+from app.schemas.habit import HabitRead, HabitRow, completion_summary
+
+def build_data(habits: int, logs: int):
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    today = date.today()
+    # Resumo guardado: 'logs' dias seguidos terminando hoje
+    summary = (today if logs else None, logs, logs, (1 << min(logs, 7)) - 1)
+    habit_tuples = [(f"Hábito {i}", None, i, created, True, *summary) for i in range(1, habits + 1)]
+    log_tuples = [
+        (habit_id, habit_id * logs + d, today - timedelta(days=d))
+        for habit_id in range(1, habits + 1) for d in range(logs)
+    ]
+
+    orm = {
+        habit_id: Habit(
+            id=habit_id, name=name, description=description, created_at=created_at, is_active=is_active,
+            last_completed_date=last, current_streak=streak, total_completions=total, recent_days=recent, logs=[],
+        )
+        for name, description, habit_id, created_at, is_active, last, streak, total, recent in habit_tuples
+    }
+    for habit_id, log_id, day in log_tuples:
+        orm[habit_id].logs.append(HabitLog(id=log_id, habit_id=habit_id, completed_date=day))
+    return list(orm.values()), habit_tuples, log_tuples
+
+def timed(fn: Callable[[], bytes], repeat: int) -> List[float]:
+    fn() # Aquecimento
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--logs", type=int, default=1000, help="logs por hábito")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    orm, habit_tuples, log_tuples = build_data(args.habits, args.logs)
+    read_adapter = TypeAdapter(List[HabitRead])
+    rows_adapter = TypeAdapter(List[HabitRow])
+    fields = ("name", "description", "id", "created_at", "is_active")
+    today = date.today()
+
+    def orm_path() -> bytes:
+        models = read_adapter.validate_python(orm, from_attributes=True)
+        content = read_adapter.dump_python(models, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def rows_path() -> bytes:
+        rows = [{**dict(zip(fields, row)), **completion_summary(*row[len(fields):], today)} for row in habit_tuples]
+        group_logs(rows, log_tuples)
+        return rows_adapter.dump_json(rows)
+
+    assert json.loads(orm_path()) == json.loads(rows_path()), "Os dois caminhos devem gerar o mesmo JSON"
+
+    result = {"habits": args.habits, "logs_per_habit": args.logs, "bytes": len(rows_path())}
+    for name, fn in (("orm_pydantic", orm_path), ("core_dump_json", rows_path)):
+        samples = timed(fn, args.repeat)
+        result[name] = {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2)}
+    result["speedup"] = round(result["orm_pydantic"]["median_ms"] / result["core_dump_json"]["median_ms"], 2)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
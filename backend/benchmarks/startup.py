@@ -0,0 +1,145 @@
+"""
+Tempo de startup da API: importação de app.main + create_app() (o que o
+"uvicorn app.main:create_app --factory" faz antes do lifespan) em processos
+novos, sem módulos já carregados.
+
+Cenários:
+    habits_only  AI_ENABLED=false (só a API de hábitos)
+    ai_lazy      AI_ENABLED=true (o LangChain fica para o primeiro uso da IA)
+    ai_warm      ai_lazy + o que o primeiro uso da IA importa (o mesmo do AI_WARMUP)
+
+Para cada cenário: tempo do processo (mediana de --repeat execuções, com o
+interpretador), custo da importação pelo -X importtime (total e pacotes mais
+caros) e se o LangChain foi carregado. O resultado sai em JSON; com --compare,
+compara com uma execução anterior e termina com código 1 se algum cenário
+piorou além de --tolerance.
+
+Não conecta no banco (os engines só são criados no lifespan), mas as
+variáveis POSTGRES_* precisam existir, como para subir a app.
+
+Uso (na pasta backend):
+    python -m benchmarks.startup --repeat 5 --output startup.json
+    python -m benchmarks.startup --compare startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+# O que o primeiro uso da IA importa, por provedor (ver AIService.warm_up e build_chat_model)
+PROVIDER_MODULES = {"gemini": "langchain_google_genai", "fake": "app.services.fake_llm"}
+
+IMPORT_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \| (?P<indent>\s*)(?P<module>\S+)$")
+
+def scenarios(provider: str) -> Dict[str, Tuple[Dict[str, str], str]]:
+    factory = "from app.main import create_app; create_app()"
+    warm = f"import langchain_core.messages, langchain_core.prompts, {PROVIDER_MODULES[provider]}; {factory}"
+    return {
+        "habits_only": ({"AI_ENABLED": "false"}, factory),
+        "ai_lazy": ({"AI_ENABLED": "true"}, factory),
+        "ai_warm": ({"AI_ENABLED": "true", "LLM_PROVIDER": provider}, warm),
+    }
+
+def run_python(code: str, env: Dict[str, str], importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    result = subprocess.run(args, env={**os.environ, **env}, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Falha ao rodar {code!r}:\n{result.stderr[-2000:]}")
+    return result
+
+def parse_importtime(stderr: str, top: int) -> Dict[str, Any]:
+    """ Total (soma dos imports de primeiro nível), pacotes com mais tempo próprio e se o LangChain entrou. """
+    total_us = 0
+    by_package: Dict[str, int] = {}
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        module = match["module"]
+        modules.append(module)
+        if not match["indent"]:
+            total_us += int(match["cumulative"])
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + int(match["self"])
+
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "import_ms": round(total_us / 1000, 1),
+        "modules": len(modules),
+        "langchain_loaded": any(m.startswith("langchain") for m in modules),
+        "top_packages_ms": {package: round(us / 1000, 1) for package, us in heaviest},
+    }
+
+def measure(name: str, env: Dict[str, str], code: str, repeat: int, top: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_python(code, env)
+        samples.append((time.perf_counter() - start) * 1000)
+    breakdown = parse_importtime(run_python(code, env, importtime=True).stderr, top)
+    return {
+        "scenario": name,
+        "process_ms": {"median": round(statistics.median(samples), 1), "min": round(min(samples), 1)},
+        **breakdown,
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """ Regressões em relação à execução base: processo ou importação mais lentos, LangChain no startup. """
+    previous = {r["scenario"]: r for r in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result["scenario"])
+        if base is None:
+            continue
+        name = result["scenario"]
+        if result["process_ms"]["median"] > base["process_ms"]["median"] * (1 + tolerance):
+            regressions.append(f"{name}: processo {base['process_ms']['median']} -> {result['process_ms']['median']} ms")
+        if result["import_ms"] > base["import_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: importação {base['import_ms']} -> {result['import_ms']} ms")
+        if result["langchain_loaded"] and not base["langchain_loaded"]:
+            regressions.append(f"{name}: LangChain voltou a ser importado no startup")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=["habits_only", "ai_lazy", "ai_warm"])
+    parser.add_argument("--provider", choices=sorted(PROVIDER_MODULES), default="gemini", help="provedor do cenário ai_warm")
+    parser.add_argument("--repeat", type=int, default=5, help="execuções por cenário (mediana)")
+    parser.add_argument("--top", type=int, default=10, help="pacotes mais caros no relatório")
+    parser.add_argument("--output", help="grava o JSON neste arquivo")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora relativa aceita na comparação")
+    args = parser.parse_args()
+
+    available = scenarios(args.provider)
+    unknown = set(args.scenarios) - set(available)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in args.scenarios:
+        env, code = available[name]
+        results.append(measure(name, env, code, args.repeat, args.top))
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    report: Dict[str, Any] = {"config": {"python": sys.version.split()[0], "repeat": args.repeat}, "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(results, json.load(f)["results"], args.tolerance)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import socket
+
+# Settings exige as credenciais do banco; só os testes de rotas (fixture client) conectam
+for name, value in {
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_DB": "habits",
+    "LLM_PROVIDER": "fake",
+    "AI_JOBS_ENABLED": "false",
+    "QUERY_BUDGET_MODE": "raise", # Rota acima do orçamento de SQL falha o teste
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio" # A app só roda em asyncio
+
+def require_postgres() -> None:
+    """ Pula o teste sem o Postgres configurado acessível (ele precisa estar migrado com alembic). """
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    try:
+        socket.create_connection((settings.POSTGRES_SERVER, settings.POSTGRES_PORT), timeout=1).close()
+    except OSError as e:
+        pytest.skip(f"Postgres indisponível: {e}")
+
+@pytest.fixture(scope="module")
+def client():
+    """ App só com a API de hábitos, no Postgres configurado. """
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+
+    require_postgres()
+    with TestClient(create_app(ai_enabled=False)) as client:
+        yield client
+
+@pytest.fixture
+async def database(anyio_backend):
+    """ Engines próprios no event loop do teste (repositórios e serviços sem a app). """
+    from app.core.config import get_settings
+    from app.db.session import Database
+
+    require_postgres()
+    database = Database(get_settings())
+    yield database
+    await database.dispose()
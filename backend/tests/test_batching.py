@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.core.batching import MicroBatcher
+
+pytestmark = pytest.mark.anyio
+
+class Recorder:
+    """ fn do batcher: guarda os lotes recebidos e devolve um resultado por item. """
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        return [item * 2 if item >= 0 else ValueError(f"item {item}") for item in items]
+
+async def test_concurrent_submits_become_one_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window=0.01, max_size=8)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+    assert results == [0, 2, 4]
+    assert fn.batches == [[0, 1, 2]]
+    assert (batcher.batches, batcher.items) == (1, 3)
+
+async def test_max_size_flushes_without_waiting_window():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window=60.0, max_size=2)
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1)
+    assert results == [0, 2, 4, 6]
+    assert fn.batches == [[0, 1], [2, 3]]
+
+async def test_per_item_exception():
+    batcher = MicroBatcher(Recorder(), window=0.01)
+    ok, failed = await asyncio.gather(batcher.submit(1), batcher.submit(-1), return_exceptions=True)
+    assert ok == 2
+    assert isinstance(failed, ValueError)
+
+async def test_batch_failure_reaches_every_caller():
+    async def broken(items):
+        raise RuntimeError("provedor fora")
+
+    batcher = MicroBatcher(broken, window=0.01)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+async def test_cancelled_caller_does_not_break_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window=0.05)
+    gone = asyncio.create_task(batcher.submit(1))
+    kept = asyncio.create_task(batcher.submit(2))
+    await asyncio.sleep(0)
+    gone.cancel() # Cliente desconectou antes do lote sair
+    assert await kept == 4
+    assert gone.cancelled()
+    assert fn.batches == [[1, 2]]
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import FakeRedis, RedisCacheBackend, SingleFlight
+from app.services.habit_cache import HabitCache
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "valor"
+
+    tasks = [asyncio.create_task(flight.do("chave", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flight.is_inflight("chave")
+    release.set()
+    assert await asyncio.gather(*tasks) == ["valor"] * 5
+    assert calls == 1
+    assert not flight.is_inflight("chave")
+
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def load(value):
+        await asyncio.sleep(0)
+        return value
+
+    assert await asyncio.gather(flight.do("a", lambda: load(1)), flight.do("b", lambda: load(2))) == [1, 2]
+
+async def test_exception_reaches_waiters_and_clears_key():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def broken():
+        await release.wait()
+        raise RuntimeError("falhou")
+
+    tasks = [asyncio.create_task(flight.do("chave", broken)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not flight.is_inflight("chave")
+
+    async def ok():
+        return "de novo"
+
+    assert await flight.do("chave", ok) == "de novo" # A falha não fica guardada
+
+async def test_cancelled_waiter_does_not_cancel_leader():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "valor"
+
+    leader = asyncio.create_task(flight.do("chave", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("chave", load))
+    await asyncio.sleep(0)
+    waiter.cancel() # asyncio.shield: quem esperava desiste, a execução continua
+    await asyncio.sleep(0)
+    release.set()
+    assert await leader == "valor"
+    assert waiter.cancelled()
+
+async def test_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "valor"
+
+    leader = asyncio.create_task(flight.do("chave", load))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("chave", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel() # O cliente de quem iniciou desconectou
+    await asyncio.sleep(0)
+    assert leader.cancelled()
+    assert flight.is_inflight("chave")
+    release.set()
+    assert await asyncio.gather(*followers) == ["valor"] * 3
+    assert calls == 1
+    assert not flight.is_inflight("chave")
+
+async def test_redis_backend_closes_client():
+    class ClosingRedis(FakeRedis):
+        closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    client = ClosingRedis()
+    cache = HabitCache(RedisCacheBackend(client))
+    assert await cache.get_or_load("list", "p", lambda: asyncio.sleep(0, (b"[]", ""))) == (b"[]", "")
+    await cache.aclose()
+    assert client.closed
+    await HabitCache(RedisCacheBackend(FakeRedis())).aclose() # Cliente sem aclose
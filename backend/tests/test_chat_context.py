@@ -0,0 +1,40 @@
+from app.models.ai import ChatMessageLog
+from app.services.chat_context import ChatContextManager, estimate_tokens
+
+def messages(*tokens: int):
+    return [ChatMessageLog(id=i, role="user", content=f"m{i}", tokens=t) for i, t in enumerate(tokens, 1)]
+
+def ids(logs):
+    return [m.id for m in logs]
+
+def test_estimate_tokens():
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 3
+
+def test_everything_fits():
+    pending = messages(10, 10, 10)
+    window = ChatContextManager(max_messages=12, token_budget=100).split(pending)
+    assert ids(window.recent) == [1, 2, 3]
+    assert window.to_summarize == []
+
+def test_overflow_keeps_half_window_in_order():
+    pending = messages(*[10] * 10)
+    window = ChatContextManager(max_messages=6, token_budget=1000).split(pending)
+    # Estourou a janela: resume de uma vez e mantém só as max_messages // 2 mais recentes
+    assert ids(window.recent) == [8, 9, 10]
+    assert ids(window.to_summarize) == [1, 2, 3, 4, 5, 6, 7]
+
+def test_token_budget_counts_summary():
+    pending = messages(40, 40, 40)
+    manager = ChatContextManager(max_messages=12, token_budget=100)
+    assert ids(manager.split(pending).recent) == [2, 3]
+    window = manager.split(pending, summary_tokens=30)
+    assert ids(window.recent) == [3]
+    assert ids(window.to_summarize) == [1, 2]
+
+def test_latest_message_always_kept():
+    pending = messages(10, 500)
+    window = ChatContextManager(max_messages=12, token_budget=100).split(pending)
+    assert ids(window.recent) == [2]
+    assert ids(window.to_summarize) == [1]
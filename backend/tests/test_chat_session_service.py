@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+from app.services.chat_context import ChatContextManager, estimate_tokens
+from app.services.chat_session_service import ChatSessionService, ChatTurn
+
+PROMPT = [SimpleNamespace(content="a" * 40), SimpleNamespace(content="b" * 80)]
+REPLY = "c" * 20
+
+def record(usage):
+    turn = ChatTurn(session_id=1, summary=None, summarized_until_id=0, pending=[])
+    ChatSessionService(ai=None, context=ChatContextManager())._record_usage(turn, PROMPT, REPLY, usage)
+    return turn.prompt_tokens, turn.completion_tokens
+
+def test_provider_usage():
+    assert record({"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}) == (7, 3)
+
+def test_missing_usage_falls_back_to_estimate():
+    estimate = (estimate_tokens("a" * 40) + estimate_tokens("b" * 80), estimate_tokens(REPLY))
+    assert record(None) == estimate
+    assert record({}) == estimate
+
+def test_partial_usage_estimates_missing_fields():
+    # Ex: chunk final do stream só com a saída
+    assert record({"output_tokens": 3}) == (estimate_tokens("a" * 40) + estimate_tokens("b" * 80), 3)
+    assert record({"input_tokens": 7}) == (7, estimate_tokens(REPLY))
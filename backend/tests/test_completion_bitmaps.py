@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.completion_bitmaps import (
+    BITMAP_BYTES, day_index, pack_days, rolling_rate, streaks, summarize, timeline, unpack, weekday_histogram,
+)
+
+def test_pack_and_unpack_round_trip():
+    days = [date(2024, 1, 1), date(2024, 2, 29), date(2024, 12, 31)]
+    bitmap = pack_days(days + [date(2023, 5, 5)], 2024) # Dias de outro ano ficam de fora
+    assert len(bitmap) == BITMAP_BYTES
+    bits = unpack(bitmap, 2024)
+    assert len(bits) == 366
+    assert np.flatnonzero(bits).tolist() == [day_index(d) for d in days]
+
+def test_bit_order_matches_postgres_set_bit():
+    # set_bit(bits, 0, 1) liga o bit menos significativo do primeiro byte
+    assert pack_days([date(2023, 1, 1)], 2023)[0] == 0b1
+    assert pack_days([date(2023, 1, 9)], 2023)[1] == 0b1
+
+def test_unpack_accepts_short_bitmap():
+    assert not unpack(b"", 2023).any()
+    assert len(unpack(b"\x01", 2023)) == 365
+
+def test_timeline_joins_years_and_fills_missing():
+    bitmaps = {2023: pack_days([date(2023, 12, 31)], 2023), 2025: pack_days([date(2025, 1, 1)], 2025)}
+    days = timeline(bitmaps, date(2023, 12, 30), date(2025, 1, 2))
+    assert len(days) == (date(2025, 1, 2) - date(2023, 12, 30)).days + 1
+    assert np.flatnonzero(days).tolist() == [1, 1 + 366 + 1] # 2024 sem bitmap: dias não concluídos
+
+def test_streaks_current_until_yesterday():
+    assert streaks(np.array([1, 1, 0, 1, 1, 1], dtype=bool)) == (3, 3)
+    assert streaks(np.array([1, 1, 1, 0, 1, 0], dtype=bool)) == (1, 3) # Terminou ontem: ainda vale
+    assert streaks(np.array([1, 1, 0, 0], dtype=bool)) == (0, 2)
+    assert streaks(np.zeros(5, dtype=bool)) == (0, 0)
+
+def test_rolling_rate_and_weekday_histogram():
+    days = np.array([1, 0, 1, 1], dtype=bool)
+    assert rolling_rate(days, 2).tolist() == [0.5, 0.5, 1.0]
+    assert len(rolling_rate(days, 5)) == 0
+    # 2024-01-01 é segunda-feira
+    assert weekday_histogram(days, date(2024, 1, 1)) == [1, 0, 1, 1, 0, 0, 0]
+
+def test_summarize():
+    today = date(2024, 3, 10)
+    done = [today - timedelta(days=i) for i in (0, 1, 2, 5)]
+    summary = summarize({2024: pack_days(done, 2024)}, today, window=7)
+    assert summary["current_streak"] == 3
+    assert summary["longest_streak"] == 3
+    assert summary["total_completions"] == 4
+    assert summary["completion_rate"] == 4 / 7
+    assert len(summary["rolling_rate"]) == 7
+    assert sum(summary["weekday_histogram"]) == 4
+
+def test_summarize_without_days():
+    empty = {"current_streak": 0, "longest_streak": 0, "total_completions": 0,
+             "completion_rate": 0.0, "rolling_rate": [], "weekday_histogram": [0] * 7}
+    assert summarize({}, date(2024, 3, 10)) == empty
+    # Só um bitmap de ano futuro: nenhum dia até hoje
+    assert summarize({2025: pack_days([date(2025, 1, 1)], 2025)}, date(2024, 3, 10)) == empty
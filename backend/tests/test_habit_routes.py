@@ -0,0 +1,136 @@
+"""
+Rotas de hábitos contra o Postgres, com QUERY_BUDGET_MODE="raise": cada rota
+declara QueryBudget(n) e uma requisição acima do orçamento falha o teste
+(QueryBudgetExceeded sai pelo TestClient). Os testes criam os próprios hábitos
+e não dependem do que já existe no banco.
+"""
+from datetime import date, timedelta
+
+import pytest
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.query_budget import QueryBudget, QueryBudgetExceeded
+from app.db.session import get_read_db
+
+def create(client, name: str) -> dict:
+    response = client.post("/api/habits/", json={"name": name})
+    assert response.status_code == 201
+    return response.json()
+
+def toggle(client, habit_id: int, day: date) -> dict:
+    response = client.post("/api/habits/bulk/toggle", json={"habit_ids": [habit_id], "completed_date": day.isoformat()})
+    assert response.status_code == 200
+    return response.json()["results"][0]
+
+def assert_summary_matches_logs(client, habit_id: int) -> None:
+    # Recalcula o resumo a partir dos logs: nada a corrigir = o UPDATE O(1) do toggle acertou
+    response = client.post("/api/habits/summaries/repair", json={"habit_ids": [habit_id]})
+    assert response.json()["fixed"] == 0
+
+def test_budget_violation_fails_request(client):
+    async def two_queries(db: AsyncSession = Depends(get_read_db)):
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+        return {}
+
+    client.app.add_api_route("/test/query-budget", two_queries, dependencies=[Depends(QueryBudget(1))])
+    with pytest.raises(QueryBudgetExceeded, match="GET /test/query-budget: 2 comandos SQL"):
+        client.get("/test/query-budget")
+
+def test_write_routes_within_budget(client):
+    habit = create(client, "Ler")
+    other = create(client, "Correr")
+    assert client.post("/api/habits/bulk", json={"habits": [{"name": "a"}, {"name": "b"}]}).status_code == 201
+
+    assert client.post(f"/api/habits/{habit['id']}/toggle").json()["completed"]
+    assert client.post(f"/api/habits/{habit['id']}/toggle?full=true").json()["completed_today"] is False
+    results = client.post("/api/habits/bulk/toggle", json={"habit_ids": [habit["id"], other["id"], 0]}).json()
+    assert results["not_found"] == [0]
+
+    assert client.post(f"/api/habits/{other['id']}/archive").status_code == 204
+    assert client.post(f"/api/habits/{other['id']}/restore").status_code == 204
+    assert client.delete(f"/api/habits/{other['id']}").status_code == 204
+    assert client.post("/api/habits/bulk/delete", json={"habit_ids": [habit["id"]]}).json()["deleted"] == [habit["id"]]
+
+def test_read_routes_within_budget(client):
+    habit = create(client, "Meditar")
+    today = date.today()
+    for days_ago in range(10): # Mais logs não podem virar mais comandos (N+1)
+        toggle(client, habit["id"], today - timedelta(days=days_ago))
+
+    assert client.get("/api/habits/").status_code == 200
+    assert client.get(f"/api/habits/{habit['id']}").json()["current_streak"] == 10
+    assert client.get("/api/habits/changes?since=0").status_code == 200
+    assert client.get("/api/habits/stats").status_code == 200
+    assert client.get(f"/api/habits/{habit['id']}/stats").status_code == 200
+    assert client.get(f"/api/habits/{habit['id']}/heatmap").status_code == 200
+    assert client.get(f"/api/habits/{habit['id']}/insights").status_code == 200
+
+def test_conditional_get_skips_body(client):
+    habit = create(client, "Beber água")
+    first = client.get(f"/api/habits/{habit['id']}")
+    cached = client.get(f"/api/habits/{habit['id']}", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+def test_toggle_summary(client):
+    habit_id = create(client, "Alongar")["id"]
+    today = date.today()
+
+    def summary() -> dict:
+        body = client.get(f"/api/habits/{habit_id}").json()
+        return {k: body[k] for k in ("current_streak", "total_completions", "completions_last_7_days", "completed_today")}
+
+    for days_ago in (2, 1, 0):
+        toggle(client, habit_id, today - timedelta(days=days_ago))
+    assert summary() == {"current_streak": 3, "total_completions": 3, "completions_last_7_days": 3, "completed_today": True}
+
+    toggle(client, habit_id, today - timedelta(days=1)) # Quebra a sequência no meio
+    assert summary() == {"current_streak": 1, "total_completions": 2, "completions_last_7_days": 2, "completed_today": True}
+
+    toggle(client, habit_id, today) # Desmarca o último dia: a sequência vem dos logs
+    assert summary() == {"current_streak": 0, "total_completions": 1, "completions_last_7_days": 1, "completed_today": False}
+    assert client.get(f"/api/habits/{habit_id}").json()["last_completed_date"] == (today - timedelta(days=2)).isoformat()
+    assert_summary_matches_logs(client, habit_id)
+
+@pytest.mark.parametrize("days_ago", [
+    [0, 1, 2, 3],          # Sequência crescendo para trás
+    [3, 1, 2],             # Dia do meio liga duas sequências
+    [0, 1, 2, 1, 0, 2],    # Desmarca no meio e o último dia
+    [10, 9, 0, 8, 20, 9],  # Dias fora dos 7 bits recentes
+    [0, 0, 4, 4, 3],       # Toggles repetidos
+])
+def test_toggle_summary_matches_logs(client, days_ago):
+    habit_id = create(client, "Sequência")["id"]
+    today = date.today()
+    for offset in days_ago:
+        toggle(client, habit_id, today - timedelta(days=offset))
+        assert_summary_matches_logs(client, habit_id)
+
+def test_toggle_and_change_feed_carry_summary(client):
+    habit_id = create(client, "Escrever")["id"]
+    cursor = int(client.get("/api/habits/").headers["X-Change-Cursor"])
+    today = date.today()
+
+    toggle(client, habit_id, today - timedelta(days=1))
+    result = client.post(f"/api/habits/{habit_id}/toggle").json()
+    assert result["completed"]
+    assert result["current_streak"] == 2
+    assert result["total_completions"] == 2
+    assert result["completed_today"] is True
+    assert result["last_completed_date"] == today.isoformat()
+
+    # O toggle registra o hábito no change log: o delta-sync leva o resumo novo
+    feed = client.get(f"/api/habits/changes?since={cursor}").json()
+    habit = next(h for h in feed["habits"] if h["id"] == habit_id)
+    assert habit["current_streak"] == 2
+    assert habit["completions_last_7_days"] == 2
+    assert habit["completed_today"] is True
+
+def test_bulk_toggle_rejects_future_date(client):
+    habit_id = create(client, "Amanhã")["id"]
+    tomorrow = date.today() + timedelta(days=1)
+    response = client.post("/api/habits/bulk/toggle", json={"habit_ids": [habit_id], "completed_date": tomorrow.isoformat()})
+    assert response.status_code == 422
+    assert client.get(f"/api/habits/{habit_id}").json()["total_completions"] == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.habit_transfer import parse_records
+
+pytestmark = pytest.mark.anyio
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+async def records(format: str, *chunks: bytes):
+    return [record async for record in parse_records(body(*chunks), format)]
+
+async def test_ndjson_across_chunks():
+    data = b'{"name": "Ler"}\n\n{"name": "Correr", "is_active": false}\n{"name": "Sem quebra"}'
+    parsed = await records("ndjson", data[:7], data[7:20], data[20:])
+    assert parsed == [
+        (1, {"name": "Ler"}),
+        (2, {"name": "Correr", "is_active": False}),
+        (3, {"name": "Sem quebra"}),
+    ]
+
+async def test_ndjson_invalid_line_reports_record():
+    with pytest.raises(ValueError, match="Registro 2"):
+        await records("ndjson", b'{"name": "Ler"}\n{"name": \n')
+
+async def test_csv_with_header_bom_and_empty_fields():
+    data = "﻿name,description\r\nLer,10 páginas\r\nCorrer,\r\n".encode()
+    # Corta no meio do "á" (dois bytes em UTF-8)
+    cut = data.index("á".encode()) + 1
+    parsed = await records("csv", data[:cut], data[cut:])
+    assert parsed == [
+        (1, {"name": "Ler", "description": "10 páginas"}),
+        (2, {"name": "Correr"}), # Campo vazio fica de fora (vale o padrão do schema)
+    ]
+
+async def test_csv_quoted_field_with_line_break():
+    data = b'name,description\n"Ler","primeira linha\nsegunda, com virgula"\nCorrer,x\n'
+    parsed = await records("csv", data[:30], data[30:])
+    assert parsed == [
+        (1, {"name": "Ler", "description": "primeira linha\nsegunda, com virgula"}),
+        (2, {"name": "Correr", "description": "x"}),
+    ]
+
+async def test_csv_unclosed_quote():
+    with pytest.raises(ValueError, match="Registro 2"):
+        await records("csv", b'name\nLer\n"Correr\n')
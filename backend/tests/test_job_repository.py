@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.ai import AIJob
+from app.repositories.job_repository import JobRepository
+
+pytestmark = pytest.mark.anyio
+
+async def stale_job(db, attempts: int, max_attempts: int = 3) -> AIJob:
+    job = AIJob(
+        kind="suggest",
+        payload={"goal": "teste"},
+        status="running",
+        attempts=attempts,
+        max_attempts=max_attempts,
+        started_at=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+async def test_requeue_stale_retries_with_backoff_or_fails(database):
+    async with database.sessions() as db:
+        retry = await stale_job(db, attempts=1)
+        poison = await stale_job(db, attempts=3) # Derrubou o worker em todas as tentativas
+        try:
+            before = datetime.now(timezone.utc)
+            requeued, failed = await JobRepository(db).requeue_stale(before - timedelta(minutes=1), retry_base=30.0)
+            assert requeued >= 1 and failed >= 1
+
+            for job in (retry, poison):
+                await db.refresh(job)
+            assert retry.status == "queued"
+            assert retry.started_at is None
+            assert retry.run_after >= before + timedelta(seconds=29) # retry_base * 2 ** (attempts - 1)
+            assert poison.status == "failed"
+            assert poison.started_at is None
+            assert poison.finished_at is not None
+            assert poison.error
+        finally:
+            await db.rollback() # Nada fica no banco (nem os outros jobs que o UPDATE tocou)
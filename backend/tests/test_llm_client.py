@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_client import CircuitBreaker, LLMClient, LLMUnavailableError
+
+pytestmark = pytest.mark.anyio
+
+class Reply:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = None
+
+class SlowLLM:
+    """ Modelo falso: responde depois de 'delay' segundos, em streaming um chunk por vez. """
+
+    def __init__(self, delay: float = 0.0, chunks: int = 3):
+        self.delay = delay
+        self.chunks = chunks
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.delay)
+        return Reply("ok")
+
+    async def astream(self, messages):
+        for i in range(self.chunks):
+            await asyncio.sleep(self.delay)
+            yield Reply(str(i))
+
+def half_open_client(llm, max_concurrency: int = 1, queue_timeout: float = 1.0) -> LLMClient:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure() # Aberto, e com reset_timeout=0 já em half-open
+    assert breaker.state == "half-open"
+    return LLMClient(llm, max_concurrency=max_concurrency, queue_timeout=queue_timeout, breaker=breaker)
+
+def test_breaker_opens_and_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    breaker.reset_timeout = 0.0
+    assert breaker.allow() # Teste do half-open
+    assert not breaker.allow() # Só um por vez
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+async def test_success_in_half_open_closes_breaker():
+    client = half_open_client(SlowLLM())
+    assert (await client.ainvoke([])).content == "ok"
+    assert client.breaker.state == "closed"
+
+async def test_queue_timeout_does_not_take_probe():
+    client = half_open_client(SlowLLM(delay=0.2), queue_timeout=0.01)
+    # Ocupa a única vaga com uma chamada normal (o teste do half-open é ela)
+    busy = asyncio.create_task(client.ainvoke([]))
+    await asyncio.sleep(0)
+    with pytest.raises(LLMUnavailableError):
+        await client.ainvoke([])
+    await busy
+    assert client.breaker.state == "closed"
+    assert not client.breaker._probing
+
+async def test_queue_timeout_while_waiting_keeps_probe_free():
+    client = half_open_client(SlowLLM(), queue_timeout=0.01)
+    await client._semaphore.acquire() # Fila cheia, sem ninguém testando o provedor
+    with pytest.raises(LLMUnavailableError):
+        await client.ainvoke([])
+    assert not client.breaker._probing
+    client._semaphore.release()
+    assert (await client.ainvoke([])).content == "ok"
+    assert client.breaker.state == "closed"
+
+async def test_cancelled_probe_frees_half_open():
+    client = half_open_client(SlowLLM(delay=1.0))
+    task = asyncio.create_task(client.ainvoke([]))
+    await asyncio.sleep(0.01)
+    assert client.breaker._probing
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not client.breaker._probing
+    assert client.breaker.allow()
+    assert client.in_flight == 0
+
+async def test_abandoned_stream_frees_half_open():
+    client = half_open_client(SlowLLM(chunks=5))
+    stream = client.astream([])
+    assert (await stream.__anext__()).content == "0"
+    await stream.aclose() # Cliente desconectou no meio do stream
+    assert not client.breaker._probing
+    assert client.breaker.allow()
+    assert client.in_flight == 0
+
+async def test_failed_probe_reopens_breaker():
+    class Broken(SlowLLM):
+        async def ainvoke(self, messages):
+            raise RuntimeError("provedor fora")
+
+    client = half_open_client(Broken())
+    with pytest.raises(RuntimeError):
+        await client.ainvoke([])
+    client.breaker.reset_timeout = 60.0
+    assert client.breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        await client.ainvoke([])
+
+def test_breaker_counts_consecutive_failures_only():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    breaker.record_failure()
+    breaker.record_success() # Zera a contagem
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.failures == 1
+
+def test_breaker_release_probe_allows_next_test():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == "half-open" and breaker.allow()
+
+async def test_stream_reports_provider_usage():
+    class Metered(SlowLLM):
+        async def astream(self, messages):
+            yield Reply("a")
+            last = Reply("b")
+            last.usage_metadata = {"input_tokens": 12, "output_tokens": 2, "total_tokens": 14}
+            yield last
+
+    client = LLMClient(Metered(), max_concurrency=1, queue_timeout=1.0)
+    usage: dict = {}
+    assert [chunk.content async for chunk in client.astream([], usage)] == ["a", "b"]
+    assert usage == {"input_tokens": 12, "output_tokens": 2, "total_tokens": 14}
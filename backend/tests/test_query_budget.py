@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db.query_budget import QueryBudgetExceeded, assert_max_queries, count_queries
+
+@pytest.fixture
+def connection():
+    # O contador escuta todos os engines: um SQLite em memória basta para os testes unitários
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+def test_counts_only_inside_block(connection):
+    connection.execute(text("SELECT 1"))
+    with count_queries() as counter:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+    connection.execute(text("SELECT 3"))
+    assert counter.count == 2
+
+def test_assert_max_queries_lists_statements(connection):
+    with assert_max_queries(2):
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+
+    with pytest.raises(QueryBudgetExceeded, match="Repositório: 2 comandos SQL \\(orçamento: 1\\)") as error:
+        with assert_max_queries(1, "Repositório"):
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT   2"))
+    assert "2. SELECT 2" in str(error.value)
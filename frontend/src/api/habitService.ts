@@ -1,9 +1,16 @@
 import apiClient from './axiosInstance';
-import type { Habit, CreateHabitDTO } from '@/types/habit';
+import type { Habit, CreateHabitDTO, HabitToggle, HabitChangeFeed } from '@/types/habit';
 
 export default {
-    async getHabits(): Promise<Habit[]> {
+    // Lista completa + cursor para os próximos delta-syncs
+    async getHabits(): Promise<{ habits: Habit[]; cursor: number | null }> {
         const response = await apiClient.get<Habit[]>('/habits/');
+        const cursor = response.headers['x-change-cursor'];
+        return { habits: response.data, cursor: cursor ? Number(cursor) : null };
+    },
+
+    async getChanges(since: number): Promise<HabitChangeFeed> {
+        const response = await apiClient.get<HabitChangeFeed>('/habits/changes', { params: { since } });
         return response.data;
     },
 
@@ -12,6 +19,11 @@ export default {
         return response.data;
     },
 
+    async createHabitsBulk(habits: CreateHabitDTO[]): Promise<Habit[]> {
+        const response = await apiClient.post<Habit[]>('/habits/bulk', { habits });
+        return response.data;
+    },
+
     async suggestHabits(goal: string): Promise<string[]> {
         const response = await apiClient.post<AIResponse>('/ai/suggest', { goal });
         return response.data.habits;
@@ -21,8 +33,8 @@ export default {
         await apiClient.delete(`/habits/${id}`);
     },
 
-    async toggleHabit(id: number): Promise<Habit> {
-        const response = await apiClient.post<Habit>(`/habits/${id}/toggle`);
+    async toggleHabit(id: number): Promise<HabitToggle> {
+        const response = await apiClient.post<HabitToggle>(`/habits/${id}/toggle`);
         return response.data;
     }
 };
\ No newline at end of file
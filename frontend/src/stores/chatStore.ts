@@ -13,23 +13,56 @@ export const useChatStore = defineStore('chat', () => {
     ]);
     const isLoading = ref(false);
     const isOpen = ref(false); // Controla se a janelinha está aberta
+    const sessionId = ref<number | null>(null);
 
     async function sendMessage(text: string) {
         // Adiciona a mensagem do usuário na UI imediatamente
         messages.value.push({ role: 'user', content: text });
         isLoading.value = true;
 
+        messages.value.push({ role: 'model', content: '' });
+        const reply = messages.value[messages.value.length - 1];
+
         try {
-            // Envia histórico para o backend
-            const response = await apiClient.post('/ai/chat', { 
-                messages: messages.value 
+            // O histórico fica no servidor: criamos a sessão uma vez e enviamos só a nova mensagem
+            if (sessionId.value === null) {
+                const session = await apiClient.post('/ai/chat/sessions');
+                sessionId.value = session.data.id;
+            }
+
+            // Streaming (SSE): os tokens aparecem conforme a IA gera
+            const response = await fetch(`/api/ai/chat/sessions/${sessionId.value}/messages/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ content: text })
             });
+            if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
 
-            // Adiciona resposta da IA
-            messages.value.push({ role: 'model', content: response.data.response });
+                // Eventos SSE são separados por linha em branco
+                const events = buffer.split('\n\n');
+                buffer = events.pop() ?? '';
+                for (const raw of events) {
+                    const event = raw.match(/^event: (.*)$/m)?.[1] ?? 'message';
+                    const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? '{}');
+                    if (event === 'error') throw new Error(data.detail);
+                    if (data.token) {
+                        reply.content += data.token;
+                        isLoading.value = false;
+                    }
+                }
+            }
         } catch (error) {
             console.error(error);
-            messages.value.push({ role: 'model', content: 'Ops, tive um erro ao processar. Tente novamente.' });
+            reply.content = reply.content || 'Ops, tive um erro ao processar. Tente novamente.';
         } finally {
             isLoading.value = false;
         }
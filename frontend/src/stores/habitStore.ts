@@ -1,6 +1,6 @@
 import { defineStore } from 'pinia';
 import { ref } from 'vue';
-import type { Habit, CreateHabitDTO } from '@/types/habit';
+import type { Habit, CreateHabitDTO, HabitChangeFeed, HabitToggle, HabitEvent } from '@/types/habit';
 import habitService from '@/api/habitService';
 
 export const useHabitStore = defineStore('habit', () => {
@@ -9,13 +9,95 @@ export const useHabitStore = defineStore('habit', () => {
     const isLoading = ref(false);
     const error = ref<string | null>(null);
     const isGenerating = ref(false);
+    const changeCursor = ref<number | null>(null);
 
     // Ações
+    // Aplica o delta do servidor na lista local
+    function applyChanges(feed: HabitChangeFeed) {
+        const deletedHabits = new Set(feed.deleted_habits);
+        const deletedLogs = new Set(feed.deleted_logs);
+        habits.value = habits.value.filter(h => !deletedHabits.has(h.id));
+
+        // Hábitos do feed já trazem o resumo atual (inclusive depois de toggles)
+        for (const changed of feed.habits) {
+            const habit = habits.value.find(h => h.id === changed.id);
+            if (habit) Object.assign(habit, changed);
+            else habits.value.push({ ...changed, logs: [] });
+        }
+        for (const habit of habits.value) {
+            habit.logs = habit.logs.filter(log => !deletedLogs.has(log.id));
+        }
+        for (const log of feed.logs) {
+            const habit = habits.value.find(h => h.id === log.habit_id);
+            if (habit && !habit.logs.some(l => l.id === log.id)) {
+                habit.logs.push({ id: log.id, completed_date: log.completed_date });
+            }
+        }
+    }
+
+    // Aplica o novo estado do dia e o resumo do servidor, sem recarregar o histórico
+    function applyToggle(result: HabitToggle) {
+        const habit = habits.value.find(h => h.id === result.habit_id);
+        if (habit) {
+            habit.last_completed_date = result.last_completed_date;
+            habit.current_streak = result.current_streak;
+            habit.total_completions = result.total_completions;
+            habit.completions_last_7_days = result.completions_last_7_days;
+            habit.completed_today = result.completed_today;
+            // Logs carregados (gráfico) acompanham o toggle
+            habit.logs = habit.logs.filter(log => log.completed_date !== result.completed_date);
+            if (result.completed && result.log_id !== null) {
+                habit.logs.push({ id: result.log_id, completed_date: result.completed_date });
+            }
+        }
+    }
+
+    // Eventos em tempo real (outras abas/dispositivos). Ao reconectar,
+    // o delta-sync recupera o que foi perdido enquanto o socket estava fechado.
+    function connectEvents() {
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${protocol}://${window.location.host}/api/habits/events`);
+
+        socket.onmessage = (message) => {
+            const event: HabitEvent = JSON.parse(message.data);
+            if (event.type === 'habit.created') {
+                if (!habits.value.some(h => h.id === event.habit.id)) {
+                    habits.value.push({ ...event.habit, logs: [] });
+                }
+            } else if (event.type === 'habit.toggled') {
+                applyToggle(event);
+            } else if (event.type === 'habit.deleted') {
+                habits.value = habits.value.filter(h => h.id !== event.habit_id);
+            } else if (event.type === 'habit.restored') {
+                // Hábito desarquivado volta com o histórico: busca pelo delta-sync
+                fetchHabits();
+            }
+        };
+        socket.onclose = () => {
+            setTimeout(() => {
+                fetchHabits();
+                connectEvents();
+            }, 2000);
+        };
+    }
+
     async function fetchHabits() {
         isLoading.value = true;
         error.value = null;
         try {
-            habits.value = await habitService.getHabits();
+            if (changeCursor.value === null) {
+                const { habits: list, cursor } = await habitService.getHabits();
+                habits.value = list;
+                changeCursor.value = cursor;
+            } else {
+                // Já temos a lista: busca só o que mudou desde o último cursor
+                let feed: HabitChangeFeed;
+                do {
+                    feed = await habitService.getChanges(changeCursor.value);
+                    applyChanges(feed);
+                    changeCursor.value = feed.cursor;
+                } while (feed.has_more);
+            }
         } catch (err) {
             console.error(err);
             error.value = 'Erro ao carregar hábitos.';
@@ -44,10 +126,9 @@ export const useHabitStore = defineStore('habit', () => {
         try {
             const suggestions = await habitService.suggestHabits(goal);
             
-            // Adiciona cada sugestão como um novo hábito automaticamente
-            for (const habitName of suggestions) {
-                await addHabit({ name: habitName });
-            }
+            // Cria todas as sugestões de uma vez (uma única requisição)
+            const created = await habitService.createHabitsBulk(suggestions.map(name => ({ name })));
+            habits.value.push(...created);
         } catch (err) {
             console.error(err);
             error.value = 'Erro ao gerar sugestões com IA.';
@@ -58,12 +139,7 @@ export const useHabitStore = defineStore('habit', () => {
 
     async function toggleHabitCompletion(id: number) {
         try {
-            const updateHabit = await habitService.toggleHabit(id);
-
-            const index = habits.value.findIndex(h => h.id === id);
-            if (index !== -1) {
-                habits.value[index] = updateHabit;
-            }
+            applyToggle(await habitService.toggleHabit(id));
         } catch (err) {
             console.error(err);
             error.value = 'Erro ao atualizar hábito.';
@@ -88,6 +164,7 @@ export const useHabitStore = defineStore('habit', () => {
         isGenerating,
         error,
         fetchHabits,
+        connectEvents,
         addHabit,
         generateHabitsFromGoal,
         toggleHabitCompletion,
@@ -1,4 +1,14 @@
-export interface Habit {
+// Resumo das conclusões calculado no servidor. Vem na listagem, no toggle, nos
+// eventos e no delta-sync: a lista não precisa dos logs para mostrá-lo
+export interface HabitSummary {
+    last_completed_date: string | null;
+    current_streak: number;
+    total_completions: number;
+    completions_last_7_days: number;
+    completed_today: boolean;
+}
+
+export interface Habit extends HabitSummary {
     id: number;
     name: string;
     description?: string | null;
@@ -18,3 +28,29 @@ export interface HabitLog {
     completed_date: String;
 }
 
+
+
+// Resposta enxuta do toggle (novo estado do dia e o resumo atualizado)
+export interface HabitToggle extends HabitSummary {
+    habit_id: number;
+    completed_date: string;
+    completed: boolean;
+    log_id: number | null;
+}
+
+// Delta-sync (GET /habits/changes)
+export interface HabitChangeFeed {
+    cursor: number;
+    has_more: boolean;
+    habits: Omit<Habit, 'logs'>[];
+    logs: (HabitLog & { habit_id: number })[];
+    deleted_habits: number[];
+    deleted_logs: number[];
+}
+
+// Eventos do WebSocket /habits/events
+export type HabitEvent =
+    | { type: 'habit.created'; habit: Omit<Habit, 'logs'> }
+    | ({ type: 'habit.toggled' } & HabitToggle)
+    | { type: 'habit.deleted'; habit_id: number }
+    | { type: 'habit.restored'; habit_id: number };
@@ -19,6 +19,7 @@ export default defineConfig({
       '/api': {
         target: 'http://habits_backend:8000',
         changeOrigin: true,
+        ws: true, // WebSocket de eventos (/api/habits/events)
       }
     }
   }